@@ -2,7 +2,10 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from django.contrib.auth.models import User
 
-from .models import Department, KPIFile, UserProfile
+from .models import (
+    ArchivedKPI, AuditEvent, ChangeLogEntry, CompanyKPIStanding, DeletionJob, Department, KPIFile, KPIQuarterSnapshot,
+    KPIStanding, UserProfile,
+)
 
 
 class UserProfileInline(admin.StackedInline):
@@ -27,5 +30,72 @@ class KPIFileAdmin(admin.ModelAdmin):
     search_fields = ('employee__username', 'employee__first_name', 'title')
 
 
+@admin.register(ArchivedKPI)
+class ArchivedKPIAdmin(admin.ModelAdmin):
+    list_display = ('employee', 'title', 'year', 'quarter', 'kpi_score', 'archive')
+    list_filter = ('year',)
+    search_fields = ('employee__username', 'employee__first_name', 'title')
+
+
+@admin.register(KPIStanding)
+class KPIStandingAdmin(admin.ModelAdmin):
+    list_display = ('employee', 'department', 'year', 'quarter', 'score', 'percentile', 'rank', 'trend')
+    list_filter = ('year', 'quarter', 'department')
+    search_fields = ('employee__username', 'employee__first_name')
+
+
+@admin.register(CompanyKPIStanding)
+class CompanyKPIStandingAdmin(admin.ModelAdmin):
+    list_display = ('department', 'year', 'quarter', 'rank', 'mean', 'median', 'headcount')
+    list_filter = ('year', 'quarter')
+
+
+@admin.register(KPIQuarterSnapshot)
+class KPIQuarterSnapshotAdmin(admin.ModelAdmin):
+    list_display = ('year', 'quarter', 'computed_at')
+
+
+@admin.register(ChangeLogEntry)
+class ChangeLogEntryAdmin(admin.ModelAdmin):
+    list_display = ('id', 'seq', 'action', 'model', 'object_id', 'department_id', 'changed_at')
+    list_filter = ('model', 'action')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(AuditEvent)
+class AuditEventAdmin(admin.ModelAdmin):
+    list_display = ('at', 'action', 'actor_name', 'employee_id', 'department_id')
+    list_filter = ('action',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(DeletionJob)
+class DeletionJobAdmin(admin.ModelAdmin):
+    list_display = ('label', 'kind', 'status', 'done', 'total', 'files_removed', 'requested_by', 'created_at')
+    list_filter = ('kind', 'status')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
 admin.site.unregister(User)
 admin.site.register(User, UserAdmin)
@@ -0,0 +1,171 @@
+import os
+import shutil
+import zipfile
+from collections import defaultdict
+from tempfile import TemporaryFile
+
+from django.core.files import File
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from . import audit
+from .models import ArchivedKPI, KPIFile, KPIYearSummary, UserProfile
+
+ARCHIVE_DIR = 'kpi_archive'
+# The current and previous year stay online; anything older is closed
+ONLINE_YEARS = 2
+
+
+def online_cutoff():
+    """The earliest year that stays online; older years are closed."""
+    return timezone.now().year - ONLINE_YEARS + 1
+
+
+def closed_years():
+    """Years that still have live KPI rows but are old enough to archive."""
+    return list(KPIFile.objects.filter(year__lt=online_cutoff()).order_by('year')
+                .values_list('year', flat=True).distinct())
+
+
+def _member(kpi):
+    return f"{kpi.pk}/{os.path.basename(kpi.file.name)}"
+
+
+def archive_year(year):
+    """Move a year's KPI rows to the archive table and their files into one
+    compressed bundle, leaving per-employee score summaries online.
+
+    Returns the number of rows archived.
+    """
+    kpis = list(KPIFile.objects.filter(year=year).order_by('pk'))
+    if not kpis:
+        return 0
+
+    members = {}
+    with TemporaryFile() as tmp:
+        with zipfile.ZipFile(tmp, 'w', compression=zipfile.ZIP_DEFLATED) as bundle:
+            for kpi in kpis:
+                if kpi.file and default_storage.exists(kpi.file.name):
+                    members[kpi.pk] = _member(kpi)
+                    with default_storage.open(kpi.file.name, 'rb') as src, bundle.open(members[kpi.pk], 'w') as dst:
+                        shutil.copyfileobj(src, dst)
+        tmp.seek(0)
+        archive = default_storage.save(f"{ARCHIVE_DIR}/kpi-{year}.zip", File(tmp))
+
+    rollups = defaultdict(lambda: {'file_count': 0, 'scored_count': 0, 'score_total': 0})
+    for kpi in kpis:
+        rollup = rollups[kpi.employee_id]
+        rollup['file_count'] += 1
+        if kpi.kpi_score is not None:
+            rollup['scored_count'] += 1
+            rollup['score_total'] += kpi.kpi_score
+
+    try:
+        with transaction.atomic():
+            ArchivedKPI.objects.bulk_create([ArchivedKPI(
+                employee_id=kpi.employee_id,
+                uploaded_by_id=kpi.uploaded_by_id,
+                title=kpi.title,
+                quarter=kpi.quarter,
+                year=kpi.year,
+                kpi_score=kpi.kpi_score,
+                uploaded_at=kpi.uploaded_at,
+                file_name=kpi.file.name,
+                archive=archive if kpi.pk in members else '',
+                member=members.get(kpi.pk, ''),
+            ) for kpi in kpis])
+            for employee_id, rollup in rollups.items():
+                summary, _ = KPIYearSummary.objects.select_for_update().get_or_create(
+                    employee_id=employee_id, year=year,
+                )
+                for field, value in rollup.items():
+                    setattr(summary, field, getattr(summary, field) + value)
+                summary.save()
+            KPIFile.objects.filter(pk__in=[kpi.pk for kpi in kpis]).delete()
+    except Exception:
+        default_storage.delete(archive)
+        raise
+
+    for kpi in kpis:
+        if kpi.pk in members:
+            default_storage.delete(kpi.file.name)
+    return len(kpis)
+
+
+def restore_year(employee, year, actor=None):
+    """Bring an employee's archived year back into the live KPI table.
+
+    Quarters that gained a live upload since archiving keep it, and their
+    archived rows are dropped; each drop is audited as a ``kpi_delete`` by
+    ``actor`` naming the bundle member that still holds the file. Runs in
+    its own transaction, so call it outside any atomic block: restored files
+    are removed again if that transaction rolls back.
+
+    Returns ``(restored, dropped)`` row counts.
+    """
+    archived = list(ArchivedKPI.objects.filter(employee=employee, year=year))
+    if not archived:
+        return 0, 0
+
+    restored, dropped = 0, 0
+    bundles = {}
+    written = []
+    try:
+        with transaction.atomic(durable=True):
+            live_quarters = set(KPIFile.objects.filter(employee=employee, year=year)
+                                .values_list('quarter', flat=True))
+            department_id = UserProfile.objects.filter(user=employee).values_list('department_id', flat=True).first()
+            for row in archived:
+                if row.quarter in live_quarters:
+                    audit.record(actor, 'kpi_delete', employee.pk, department_id,
+                                 quarter=row.quarter, year=row.year, score=row.kpi_score,
+                                 superseded=True, archive=row.archive, member=row.member)
+                    dropped += 1
+                    continue
+                kpi = KPIFile(
+                    employee_id=row.employee_id,
+                    uploaded_by_id=row.uploaded_by_id,
+                    title=row.title,
+                    quarter=row.quarter,
+                    year=row.year,
+                    kpi_score=row.kpi_score,
+                )
+                if row.member:
+                    if row.archive not in bundles:
+                        bundles[row.archive] = zipfile.ZipFile(default_storage.open(row.archive, 'rb'))
+                    content = bundles[row.archive].read(row.member)
+                    kpi.file.save(row.file_name.split('/')[-1], ContentFile(content), save=False)
+                    written.append(kpi.file.name)
+                kpi.save()
+                KPIFile.objects.filter(pk=kpi.pk).update(uploaded_at=row.uploaded_at)
+                restored += 1
+            ArchivedKPI.objects.filter(pk__in=[row.pk for row in archived]).delete()
+            KPIYearSummary.objects.filter(employee=employee, year=year).delete()
+    except Exception:
+        # The archived rows are still there, so the files would be restored twice
+        for name in written:
+            default_storage.delete(name)
+        raise
+    finally:
+        for bundle in bundles.values():
+            bundle.close()
+    return restored, dropped
+
+
+def kpi_averages(**filters):
+    """Rounded average KPI score per employee id across live and archived
+    years. ``filters`` apply to both tables, e.g. ``employee__profile__department``."""
+    totals = defaultdict(lambda: [0, 0])
+    live = KPIFile.objects.filter(kpi_score__isnull=False, **filters).values('employee_id').annotate(
+        total=Sum('kpi_score'), count=Count('id'),
+    )
+    archived = KPIYearSummary.objects.filter(scored_count__gt=0, **filters).values('employee_id').annotate(
+        total=Sum('score_total'), count=Sum('scored_count'),
+    )
+    for row in list(live) + list(archived):
+        totals[row['employee_id']][0] += row['total']
+        totals[row['employee_id']][1] += row['count']
+    return {employee_id: round(total / count) for employee_id, (total, count) in totals.items()}
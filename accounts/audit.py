@@ -0,0 +1,126 @@
+import atexit
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, transaction
+from django.utils import timezone
+
+from .models import AuditEvent, Department, UserProfile
+
+logger = logging.getLogger(__name__)
+
+# Events waiting to be written, shared by every thread in this process
+_pending = []
+_oldest = None
+_lock = threading.Lock()
+
+
+def record(actor, action, employee_id=None, department_id=None, **details):
+    """Queue an audit event for ``actor`` (a User or None for the system).
+
+    Nothing is written here: the event joins the in-process buffer once the
+    surrounding transaction commits, so rolled-back changes leave no trace,
+    and the buffer is written in one INSERT by :func:`flush`.
+    """
+    event = AuditEvent(
+        actor_id=actor.pk if actor else None,
+        actor_name=(actor.get_full_name() or actor.username) if actor else '',
+        action=action,
+        employee_id=employee_id,
+        department_id=department_id,
+        details=details,
+        at=timezone.now(),
+    )
+    transaction.on_commit(lambda: _enqueue(event))
+
+
+def _enqueue(event):
+    global _oldest
+    with _lock:
+        if not _pending:
+            _oldest = time.monotonic()
+        _pending.append(event)
+        due = (len(_pending) >= settings.AUDIT_BUFFER_SIZE
+               or time.monotonic() - _oldest >= settings.AUDIT_FLUSH_SECONDS)
+    if due:
+        flush()
+
+
+def pending():
+    return len(_pending)
+
+
+def flush():
+    """Write every buffered event in batched INSERTs. Returns how many."""
+    global _pending, _oldest
+    with _lock:
+        events, _pending = _pending, []
+    if not events:
+        return 0
+    try:
+        AuditEvent.objects.bulk_create(events, batch_size=500)
+    except DatabaseError:
+        logger.exception('Could not write %d audit events', len(events))
+        with _lock:
+            if not _pending:
+                _oldest = time.monotonic()
+            # Keep them for the next flush, but never let the buffer grow unbounded
+            _pending[:0] = events[-settings.AUDIT_BUFFER_SIZE * 10:]
+        return 0
+    return len(events)
+
+
+def _score(value):
+    return '—' if value is None else value
+
+
+def describe(events):
+    """Set ``summary`` on each event to a sentence for the history pages,
+    naming people and companies with one query each."""
+    profile_ids, dept_ids = set(), set()
+    for e in events:
+        d = e.details
+        if e.action in ('reports_to', 'move_team'):
+            profile_ids.update(v for v in (d.get('old'), d.get('new'), d.get('parent')) if v)
+        if e.action in ('department', 'move_team'):
+            dept_ids.update(v for v in (d.get('old'), d.get('new'), d.get('from_department'),
+                                        d.get('to_department')) if v)
+    people = {pk: f'{first} {last}'.strip() for pk, first, last in UserProfile.objects.filter(
+        pk__in=profile_ids).values_list('pk', 'user__first_name', 'user__last_name')}
+    companies = dict(Department.objects.filter(pk__in=dept_ids).values_list('pk', 'name'))
+
+    def person(pk):
+        return people.get(pk, 'a removed person') if pk else 'nobody'
+
+    def company(pk):
+        return companies.get(pk, 'a removed company') if pk else 'no company'
+
+    for e in events:
+        d = e.details
+        period = f"{d.get('quarter')} {d.get('year')}"
+        if e.action == 'kpi_upload':
+            e.summary = f"Uploaded the {period} KPI" + (' (replacing the previous file)' if d.get('replaced') else '')
+        elif e.action == 'kpi_score':
+            e.summary = f"{period} score {_score(d.get('old'))} → {_score(d.get('new'))}"
+        elif e.action == 'kpi_delete' and d.get('superseded'):
+            e.summary = f"Dropped the archived {period} KPI (score {_score(d.get('score'))}) for a newer upload"
+        elif e.action == 'kpi_delete':
+            e.summary = f"Deleted the {period} KPI (score {_score(d.get('score'))})"
+        elif e.action == 'reports_to':
+            e.summary = f"Reports to {person(d.get('new'))} instead of {person(d.get('old'))}"
+        elif e.action == 'reorder':
+            e.summary = f"Reordered {len(d.get('order', []))} people"
+        elif e.action == 'move_team':
+            e.summary = (f"Moved with {d.get('moved', 1) - 1} reports from {company(d.get('from_department'))} "
+                         f"to {company(d.get('to_department'))}, under {person(d.get('parent'))}")
+        elif e.action == 'department':
+            e.summary = f"Moved from {company(d.get('old'))} to {company(d.get('new'))}"
+        else:
+            e.summary = e.get_action_display()
+    return events
+
+
+# Management commands and worker shutdowns write what is left
+atexit.register(flush)
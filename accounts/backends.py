@@ -0,0 +1,23 @@
+from django.contrib.auth.backends import ModelBackend
+from django.contrib.auth.models import User
+
+from .caching import PRINCIPAL_TIMEOUT, principal_cache, principal_key
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend that loads the logged-in user from the cache.
+
+    The user is cached with ``profile`` and ``profile.department`` already
+    attached, so neither the auth middleware nor the access checks in the
+    views query the database for them.
+    """
+
+    def get_user(self, user_id):
+        key = principal_key(user_id)
+        user = principal_cache().get(key)
+        if user is None:
+            user = User._default_manager.select_related('profile__department').filter(pk=user_id).first()
+            if user is None:
+                return None
+            principal_cache().set(key, user, PRINCIPAL_TIMEOUT)
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,106 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache, caches
+from django.db import transaction
+
+# Rendered fragments and derived data are keyed on these counters, so they
+# never need an explicit expiry: any change bumps the counter and old keys
+# just age out.
+
+COMPANY_LIST_KEY = 'data-version:companies'
+PEOPLE_KEY = 'data-version:people'
+
+
+def _dept_key(dept_id):
+    return f"data-version:dept:{dept_id or 'none'}"
+
+
+def _kpi_key(dept_id):
+    return f"data-version:kpis:{dept_id or 'none'}"
+
+
+def _fresh_version():
+    # Counters start from the clock rather than 1, so one that gets evicted
+    # never comes back at a value an old page's ETag was built from
+    return time.time_ns() // 1000
+
+
+def _get_version(key):
+    return cache.get_or_set(key, _fresh_version, timeout=None)
+
+
+def _incr(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _fresh_version(), timeout=None)
+
+
+def _bump_version(key):
+    # Bumped after commit: a reader that saw the new version mid-transaction
+    # would still read the old rows and cache them under it
+    transaction.on_commit(lambda: _incr(key))
+
+
+def data_version(dept_id):
+    """Current data version for one department's members and branding."""
+    return _get_version(_dept_key(dept_id))
+
+
+def kpi_version(dept_id):
+    """Current version of one department's KPI scores."""
+    return _get_version(_kpi_key(dept_id))
+
+
+def company_list_version():
+    """Current version of the department list shown in navigation."""
+    return _get_version(COMPANY_LIST_KEY)
+
+
+def people_version():
+    """Current version of the searchable people directory."""
+    return _get_version(PEOPLE_KEY)
+
+
+def bump_data_version(*dept_ids):
+    for dept_id in set(dept_ids):
+        _bump_version(_dept_key(dept_id))
+
+
+def bump_kpi_version(*dept_ids):
+    for dept_id in set(dept_ids):
+        _bump_version(_kpi_key(dept_id))
+
+
+def bump_company_list_version():
+    _bump_version(COMPANY_LIST_KEY)
+
+
+def bump_people_version():
+    _bump_version(PEOPLE_KEY)
+
+
+# ─── Logged-in users ────────────────────────────────────────
+# The auth backend keeps each logged-in user, with profile and company
+# attached, next to the sessions. Signals forget an entry whenever any of
+# the three rows change.
+
+PRINCIPAL_TIMEOUT = 60 * 60
+
+
+def principal_key(user_id):
+    return f'principal:{user_id}'
+
+
+def principal_cache():
+    return caches[settings.SESSION_CACHE_ALIAS]
+
+
+def forget_principals(*user_ids):
+    """Drop cached users now and again after commit, so a request that read
+    the old rows mid-transaction can't leave them cached."""
+    keys = [principal_key(user_id) for user_id in set(user_ids) if user_id]
+    if keys:
+        principal_cache().delete_many(keys)
+        transaction.on_commit(lambda: principal_cache().delete_many(keys))
@@ -0,0 +1,119 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.contrib.auth.models import User
+from django.db import router, transaction
+from django.db.models import F, Max, Min
+from django.db.models.fields.files import FieldFile
+
+from .models import ChangeFeedSequence, ChangeLogEntry, Department, KPIFile, UserProfile
+
+# Fields published for each tracked model. Passwords never leave the server.
+FEED_FIELDS = {
+    User: ('username', 'first_name', 'last_name', 'email', 'is_staff', 'is_active', 'date_joined'),
+    UserProfile: ('user_id', 'department_id', 'phone_number', 'job_title', 'hierarchy_order',
+                  'reports_to_id', 'updated_at'),
+    Department: ('name', 'description', 'brand_primary', 'brand_hover', 'brand_accent', 'updated_at'),
+    KPIFile: ('employee_id', 'uploaded_by_id', 'title', 'quarter', 'year', 'kpi_score', 'file',
+              'updated_at'),
+}
+
+FEED_MODELS = {model._meta.model_name: model for model in FEED_FIELDS}
+
+_batch = ContextVar('changefeed_batch', default=None)
+
+
+def _department_id(instance):
+    """Company the changed row belongs to, used to scope the feed per manager."""
+    if isinstance(instance, Department):
+        return instance.pk
+    if isinstance(instance, UserProfile):
+        return instance.department_id
+    user_id = instance.pk if isinstance(instance, User) else instance.employee_id
+    batch = _batch.get()
+    if batch is not None and user_id in batch['departments']:
+        return batch['departments'][user_id]
+    return UserProfile.objects.filter(user_id=user_id).values_list('department_id', flat=True).first()
+
+
+def snapshot(instance):
+    data = {}
+    for field in FEED_FIELDS[type(instance)]:
+        value = getattr(instance, field)
+        data[field] = value.name if isinstance(value, FieldFile) else value
+    return data
+
+
+def _entry(instance, action):
+    return ChangeLogEntry(
+        model=instance._meta.model_name,
+        object_id=instance.pk,
+        action=action,
+        department_id=_department_id(instance),
+        data=snapshot(instance) if action != 'delete' else {},
+    )
+
+
+def record_change(instance, action):
+    """Append one change for ``instance``; call inside the writing transaction."""
+    batch = _batch.get()
+    if batch is not None:
+        batch['entries'].append(_entry(instance, action))
+    else:
+        _entry(instance, action).save()
+
+
+@contextmanager
+def batched_changes(departments=None):
+    """Buffer entries logged by signals and insert them in one query on exit.
+
+    ``departments`` maps user ids to their company, sparing a lookup per
+    row when many users and their KPI files change at once. Use inside the
+    transaction making the changes.
+    """
+    batch = {'entries': [], 'departments': departments or {}}
+    token = _batch.set(batch)
+    try:
+        yield
+    finally:
+        _batch.reset(token)
+    ChangeLogEntry.objects.bulk_create(batch['entries'])
+
+
+def record_updates(queryset):
+    """Log rows changed by a queryset ``update()``, which sends no signals."""
+    ChangeLogEntry.objects.bulk_create([_entry(obj, 'update') for obj in queryset])
+
+
+def record_deletes(model, rows):
+    """Log deletes done without signals; ``rows`` are ``(pk, department_id)``."""
+    ChangeLogEntry.objects.bulk_create([
+        ChangeLogEntry(model=model._meta.model_name, object_id=pk, action='delete', department_id=department_id)
+        for pk, department_id in rows
+    ])
+
+
+def sequence_changes():
+    """Give committed entries without a ``seq`` the next numbers in line.
+
+    Entries are written unnumbered by the transaction making the change and
+    only become visible when it commits, however long it ran. Numbering
+    them here, one sequencer at a time, makes ``seq`` follow commit order:
+    once a reader has seen a number, no entry will later get a lower one.
+    Call outside any transaction, before reading the feed.
+    """
+    db = router.db_for_write(ChangeLogEntry)
+    unnumbered = ChangeLogEntry.objects.using(db).filter(seq__isnull=True)
+    if not unnumbered.exists():
+        return
+    with transaction.atomic(using=db):
+        counter = ChangeFeedSequence.objects.using(db).select_for_update().get(pk=1)
+        ids = unnumbered.aggregate(lo=Min('id'), hi=Max('id'))
+        if ids['lo'] is None:
+            return
+        # Entries committing meanwhile inside the range are numbered with the
+        # rest; ones below it wait for the next round and get higher numbers
+        offset = counter.last + 1 - ids['lo']
+        unnumbered.filter(id__range=(ids['lo'], ids['hi'])).update(seq=F('id') + offset)
+        counter.last = ids['hi'] + offset
+        counter.save(update_fields=['last'])
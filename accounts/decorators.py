@@ -1,9 +1,28 @@
+import hashlib
+from datetime import datetime
 from functools import wraps
 
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.contrib import messages
 from django.shortcuts import redirect
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+
+from .routers import PIN_COOKIE, replica_reads
 
 
 def staff_required(view_func):
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs):
+            user = await request.auser()
+            if not user.is_authenticated:
+                return redirect('login')
+            if not user.is_staff:
+                return redirect('home')
+            return await view_func(request, *args, **kwargs)
+        return async_wrapper
+
     @wraps(view_func)
     def wrapper(request, *args, **kwargs):
         if not request.user.is_authenticated:
@@ -12,3 +31,65 @@ def staff_required(view_func):
             return redirect('home')
         return view_func(request, *args, **kwargs)
     return wrapper
+
+
+def replica_page(view_func):
+    """Serve a read-only view's queries from the read replica, unless the
+    browser wrote something moments ago and must see it. Apply inside
+    ``login_required`` so sessions and users still load from the primary."""
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs):
+            if PIN_COOKIE in request.COOKIES:
+                return await view_func(request, *args, **kwargs)
+            with replica_reads():
+                return await view_func(request, *args, **kwargs)
+        return async_wrapper
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if PIN_COOKIE in request.COOKIES:
+            return view_func(request, *args, **kwargs)
+        with replica_reads():
+            return view_func(request, *args, **kwargs)
+    return wrapper
+
+
+def conditional_page(version_func):
+    """Answer GETs with 304 when the page's data hasn't changed.
+
+    ``version_func(request, *args, **kwargs)`` returns a list of cheap values
+    (timestamps, counts, ids) that change whenever the rendered page would.
+    The validator also covers the viewer and their session, so each user and
+    login gets its own ETag. Must be applied inside ``login_required``.
+    """
+    def validators(request, *args, **kwargs):
+        if not hasattr(request, '_page_validators'):
+            if len(messages.get_messages(request)):
+                # Pending flash messages must be rendered, never skipped
+                request._page_validators = (None, None)
+            else:
+                parts = version_func(request, *args, **kwargs)
+                viewer = [request.user.pk, request.user.is_staff, request.session.session_key]
+                etag = hashlib.sha1(repr(viewer + parts).encode()).hexdigest()
+                timestamps = [p for p in parts if isinstance(p, datetime)]
+                request._page_validators = (etag, max(timestamps) if timestamps else None)
+        return request._page_validators
+
+    def decorator(view_func):
+        view = condition(
+            etag_func=lambda request, *a, **kw: validators(request, *a, **kw)[0],
+            last_modified_func=lambda request, *a, **kw: validators(request, *a, **kw)[1],
+        )(view_func)
+        # Browsers must revalidate every time rather than guess freshness
+        view = cache_control(private=True, no_cache=True)(view)
+        if iscoroutinefunction(view_func):
+            # condition() calls the validators synchronously, so compute them
+            # off the event loop first; the lambdas above then read the stash.
+            async def async_view(request, *args, **kwargs):
+                request.user = await request.auser()
+                await sync_to_async(validators)(request, *args, **kwargs)
+                return await view(request, *args, **kwargs)
+            return wraps(view_func)(async_view)
+        return wraps(view_func)(view)
+    return decorator
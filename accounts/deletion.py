@@ -0,0 +1,143 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.admin.models import LogEntry
+from django.contrib.auth.models import User
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Q
+
+from .caching import bump_data_version, bump_kpi_version, bump_people_version, forget_principals
+from .changefeed import record_deletes, record_updates
+from .models import ArchivedKPI, DeletionJob, Department, KPIFile, KPIStanding, KPIUpload, KPIYearSummary, UserProfile
+
+# Users deleted per transaction. Each batch reads what it removes once and
+# deletes it table by table with DELETE ... IN queries.
+DELETE_BATCH_SIZE = 200
+FILE_DELETE_WORKERS = 8
+
+
+def start_deletion(kind, target, requested_by):
+    """Queue deletion of a user or company and start it once the request
+    commits. An unfinished job for the same target is reused."""
+    job = DeletionJob.objects.filter(
+        kind=kind, target_id=target.pk, status__in=('pending', 'running'),
+    ).first()
+    if job is None:
+        label = target.name if kind == 'department' else target.get_full_name() or target.username
+        job = DeletionJob.objects.create(kind=kind, target_id=target.pk, label=label, requested_by=requested_by)
+        transaction.on_commit(lambda: _launch(job.pk))
+    return job
+
+
+def _launch(job_id):
+    threading.Thread(target=run_job, args=(job_id,), name=f'deletion-{job_id}', daemon=True).start()
+
+
+def _user_ids(job):
+    if job.kind == 'user':
+        return list(User.objects.filter(pk=job.target_id).values_list('pk', flat=True))
+    # The manager deleting a company keeps their own account
+    return list(User.objects.filter(profile__department_id=job.target_id)
+                .exclude(pk=job.requested_by_id).order_by('pk').values_list('pk', flat=True))
+
+
+def _raw_delete(queryset):
+    # One DELETE for the rows, skipping the collector and per-row signals
+    return queryset._raw_delete(queryset.db)
+
+
+def _delete_users(user_ids):
+    """Delete one batch of users with everything that cascades from them,
+    children first, then log and invalidate the lot once.
+
+    Returns the stored file names that belonged to them.
+    """
+    owned = Q(employee_id__in=user_ids) | Q(uploaded_by_id__in=user_ids)
+    with transaction.atomic():
+        profiles = list(UserProfile.objects.filter(user_id__in=user_ids)
+                        .values_list('pk', 'user_id', 'department_id', 'profile_picture'))
+        profile_ids = [pk for pk, _, _, _ in profiles]
+        kpis = list(KPIFile.objects.filter(owned).values_list('pk', 'employee_id', 'file'))
+        uploads = list(KPIUpload.objects.filter(owned).values_list('file', flat=True))
+        departments = {user_id: department_id for _, user_id, department_id, _ in profiles}
+        departments.update(UserProfile.objects.filter(
+            user_id__in={employee_id for _, employee_id, _ in kpis} - departments.keys(),
+        ).values_list('user_id', 'department_id'))
+
+        # Reporting lines into the batch are cut first (SET_NULL); only the
+        # people staying behind get a change entry
+        reports = UserProfile.objects.filter(reports_to_id__in=profile_ids)
+        kept = list(reports.exclude(user_id__in=user_ids).values_list('pk', 'user_id', 'department_id'))
+        reports.update(reports_to=None)
+        record_updates(UserProfile.objects.filter(pk__in=[pk for pk, _, _ in kept]))
+        DeletionJob.objects.filter(requested_by_id__in=user_ids).update(requested_by=None)
+
+        record_deletes(KPIFile, [(pk, departments.get(employee_id)) for pk, employee_id, _ in kpis])
+        record_deletes(UserProfile, [(pk, department_id) for pk, _, department_id, _ in profiles])
+        record_deletes(User, [(user_id, departments.get(user_id)) for user_id in user_ids])
+
+        for queryset in (
+            KPIFile.objects.filter(owned),
+            KPIUpload.objects.filter(owned),
+            ArchivedKPI.objects.filter(owned),
+            KPIYearSummary.objects.filter(employee_id__in=user_ids),
+            KPIStanding.objects.filter(employee_id__in=user_ids),
+            UserProfile.objects.filter(pk__in=profile_ids),
+            LogEntry.objects.filter(user_id__in=user_ids),
+            User.groups.through.objects.filter(user_id__in=user_ids),
+            User.user_permissions.through.objects.filter(user_id__in=user_ids),
+            User.objects.filter(pk__in=user_ids),
+        ):
+            _raw_delete(queryset)
+
+        bump_data_version(*departments.values(), *[department_id for _, _, department_id in kept])
+        bump_kpi_version(*[departments.get(employee_id) for _, employee_id, _ in kpis])
+        bump_people_version()
+        forget_principals(*user_ids, *[user_id for _, user_id, _ in kept])
+    return [name for _, _, name in kpis] + [picture for _, _, _, picture in profiles] + uploads
+
+
+def _remove_files(names):
+    names = [name for name in names if name]
+    with ThreadPoolExecutor(max_workers=FILE_DELETE_WORKERS) as pool:
+        list(pool.map(default_storage.delete, names))
+    return len(names)
+
+
+def run_job(job_id):
+    """Run a deletion job to completion, recording progress after each batch.
+
+    Safe to rerun: each pass works from what is still left to delete.
+    """
+    close_old_connections()
+    try:
+        job = DeletionJob.objects.get(pk=job_id)
+        if job.status == 'done':
+            return
+        user_ids = _user_ids(job)
+        job.status = 'running'
+        job.total = job.done + len(user_ids)
+        job.save(update_fields=['status', 'total', 'updated_at'])
+
+        for start in range(0, len(user_ids), DELETE_BATCH_SIZE):
+            batch = user_ids[start:start + DELETE_BATCH_SIZE]
+            files = _delete_users(batch)
+            job.files_removed += _remove_files(files)
+            job.done += len(batch)
+            job.save(update_fields=['done', 'files_removed', 'updated_at'])
+
+        if job.kind == 'department':
+            department = Department.objects.filter(pk=job.target_id).first()
+            if department:
+                logo = department.logo.name
+                with transaction.atomic():
+                    department.delete()
+                job.files_removed += _remove_files([logo])
+        job.status = 'done'
+        job.save(update_fields=['status', 'files_removed', 'updated_at'])
+    except Exception as exc:
+        DeletionJob.objects.filter(pk=job_id).update(status='failed', error=str(exc))
+        raise
+    finally:
+        connection.close()
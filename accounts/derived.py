@@ -0,0 +1,114 @@
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.db import connections, transaction
+from django.db.models import Count, Sum
+from django.utils.module_loading import autodiscover_modules
+
+from .caching import bump_data_version, bump_kpi_version, bump_people_version, forget_principals
+from .heatmap import cached_matrix
+from .models import ArchivedKPI, Department, KPIYearSummary
+from .stats import snapshot_closed_quarters
+from .themes import ensure_theme_file
+
+# Everything PulseBoard stores or caches that can be recomputed from the
+# source tables, keyed by name. Per-company providers take a Department and
+# run in the order registered; the others run once, after every company.
+PROVIDERS = {}
+
+
+def provider(name, per_company=True):
+    def register(func):
+        PROVIDERS[name] = (func, per_company)
+        return func
+    return register
+
+
+def discover():
+    """Import every installed app's ``derived`` module so its providers register."""
+    autodiscover_modules('derived')
+    return PROVIDERS
+
+
+@provider('themes')
+def rebuild_theme(department):
+    name = ensure_theme_file(department.brand_primary, department.brand_hover, department.brand_accent)
+    if department.theme_css.name != name:
+        Department.objects.filter(pk=department.pk).update(theme_css=name)
+
+
+@provider('year_summaries')
+def rebuild_year_summaries(department):
+    rows = ArchivedKPI.objects.filter(employee__profile__department=department).values(
+        'employee_id', 'year',
+    ).annotate(file_count=Count('id'), scored_count=Count('kpi_score'), score_total=Sum('kpi_score')).order_by()
+    with transaction.atomic():
+        KPIYearSummary.objects.filter(employee__profile__department=department).delete()
+        KPIYearSummary.objects.bulk_create([KPIYearSummary(
+            employee_id=row['employee_id'],
+            year=row['year'],
+            file_count=row['file_count'],
+            scored_count=row['scored_count'],
+            score_total=row['score_total'] or 0,
+        ) for row in rows])
+
+
+@provider('caches')
+def reset_caches(department):
+    bump_data_version(department.pk)
+    bump_kpi_version(department.pk)
+    forget_principals(*department.members.values_list('user_id', flat=True))
+
+
+@provider('heatmaps')
+def warm_heatmap(department):
+    _, stream = cached_matrix(department)
+    for _ in stream or ():
+        pass
+
+
+@provider('standings', per_company=False)
+def rebuild_standings():
+    snapshot_closed_quarters(full=True)
+
+
+@provider('search', per_company=False)
+def rebuild_search_index():
+    # Every worker rebuilds its in-memory index on its next search
+    bump_people_version()
+
+
+def rebuild_company(department_id, names):
+    """Run the named per-company providers for one company.
+
+    Returns ``(department_id, [(name, seconds), ...])``.
+    """
+    department = Department.objects.get(pk=department_id)
+    timings = []
+    for name in names:
+        started = time.perf_counter()
+        PROVIDERS[name][0](department)
+        timings.append((name, time.perf_counter() - started))
+    return department_id, timings
+
+
+def _init_worker():
+    # Spawned workers start without Django; forked ones are already set up
+    django.setup()
+    discover()
+
+
+def rebuild_companies(department_ids, names, workers):
+    """Yield :func:`rebuild_company` results as each company finishes,
+    across worker processes when there is more than one company."""
+    if workers < 2 or len(department_ids) < 2:
+        for department_id in department_ids:
+            yield rebuild_company(department_id, names)
+        return
+    # Forked workers must open their own database connections
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = [pool.submit(rebuild_company, department_id, names) for department_id in department_ids]
+        for future in as_completed(futures):
+            yield future.result()
@@ -144,6 +144,20 @@ class DepartmentForm(forms.ModelForm):
         }
 
 
+class BulkUserImportForm(forms.Form):
+    MAX_SIZE = 2 * 1024 * 1024
+
+    file = forms.FileField(label='CSV file')
+
+    def clean_file(self):
+        upload = self.cleaned_data['file']
+        if not upload.name.lower().endswith('.csv'):
+            raise forms.ValidationError('Upload a .csv file.')
+        if upload.size > self.MAX_SIZE:
+            raise forms.ValidationError('The file must be smaller than 2 MB.')
+        return upload
+
+
 class KPIFileUploadForm(forms.ModelForm):
     class Meta:
         model = KPIFile
@@ -0,0 +1,90 @@
+import json
+
+from django.core.cache import cache
+from django.db.models import Max, Q
+
+from .caching import data_version, kpi_version
+from .models import ArchivedKPI, KPIFile
+
+QUARTERS = [code for code, _ in KPIFile.QUARTER_CHOICES]
+
+
+def matrix_cache_key(department_id):
+    """Changes whenever a score or a member of the department changes."""
+    return f"kpi-heatmap:{department_id}:{kpi_version(department_id)}:{data_version(department_id)}"
+
+
+def _pivot(queryset):
+    return queryset.values('employee_id', 'year').annotate(
+        **{q.lower(): Max('kpi_score', filter=Q(quarter=q)) for q in QUARTERS}
+    ).order_by()
+
+
+def score_rows(department_id):
+    """One row per employee and year with a column per quarter, live and
+    archived years together, in a single grouped UNION query."""
+    live = _pivot(KPIFile.objects.filter(employee__profile__department_id=department_id))
+    archived = _pivot(ArchivedKPI.objects.filter(employee__profile__department_id=department_id))
+    return live.union(archived, all=True).order_by('employee_id', 'year')
+
+
+def matrix_chunks(department):
+    """Yield the employee x (year, quarter) score matrix as JSON text.
+
+    Rows are written as each employee's scores come off the cursor, so a
+    large company never builds the whole matrix in memory. ``columns``
+    comes last, once every year has been seen.
+    """
+    members = {m['user_id']: m for m in department.members.values(
+        'user_id', 'user__first_name', 'user__last_name', 'job_title',
+    )}
+    columns = set()
+
+    def row(user_id, scores):
+        member = members[user_id]
+        return json.dumps({
+            'user_id': user_id,
+            'name': f"{member['user__first_name']} {member['user__last_name']}".strip(),
+            'job_title': member['job_title'],
+            'scores': scores,
+        }, separators=(',', ':'))
+
+    yield f'{{"department":{json.dumps(department.name)},"rows":['
+    sep = ''
+    current, scores = None, {}
+    for r in score_rows(department.id).iterator(chunk_size=2000):
+        if r['employee_id'] != current:
+            if current is not None:
+                yield sep + row(current, scores)
+                sep = ','
+            current, scores = r['employee_id'], {}
+        for q in QUARTERS:
+            if r[q.lower()] is not None:
+                scores.setdefault(f"{r['year']}-{q}", r[q.lower()])
+                columns.add((r['year'], q))
+        members[current]['scored'] = True
+    if current is not None:
+        yield sep + row(current, scores)
+        sep = ','
+    for user_id, member in members.items():
+        if 'scored' not in member:
+            yield sep + row(user_id, {})
+            sep = ','
+    yield '],"columns":' + json.dumps([f"{year}-{q}" for year, q in sorted(columns)]) + '}'
+
+
+def cached_matrix(department):
+    """The matrix as cached bytes, or ``None`` with a generator that streams
+    it and caches it once complete."""
+    key = matrix_cache_key(department.id)
+    body = cache.get(key)
+    if body is not None:
+        return body, None
+
+    def stream():
+        parts = []
+        for chunk in matrix_chunks(department):
+            parts.append(chunk)
+            yield chunk
+        cache.set(key, ''.join(parts).encode())
+    return None, stream()
@@ -0,0 +1,72 @@
+from django.core.exceptions import PermissionDenied
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .caching import bump_data_version, bump_kpi_version, bump_people_version, forget_principals
+from .changefeed import record_updates
+from .models import UserProfile
+
+
+class HierarchyError(ValueError):
+    """A move that would break the hierarchy or isn't allowed."""
+
+
+def _subtree(root_id, reports_of):
+    ids, stack = [], [root_id]
+    while stack:
+        profile_id = stack.pop()
+        ids.append(profile_id)
+        stack.extend(reports_of.get(profile_id, ()))
+    return ids
+
+
+def move_subtree(profile_id, department_id, parent_id, allowed_department_ids):
+    """Move a person and everyone reporting to them, directly or not, under
+    ``parent_id`` in company ``department_id`` (its top level when None).
+
+    Cycle and permission checks run against one snapshot of both companies'
+    reporting lines; the move itself is two UPDATE statements. Reports in
+    other companies keep pointing at the person. Returns the moved profile ids.
+    """
+    with transaction.atomic():
+        root = UserProfile.objects.select_for_update().filter(pk=profile_id).values(
+            'department_id', 'reports_to_id',
+        ).first()
+        if root is None:
+            raise HierarchyError('Unknown person.')
+        source_id = root['department_id']
+        if source_id not in allowed_department_ids or department_id not in allowed_department_ids:
+            raise PermissionDenied
+
+        snapshot = {pk: (dept_id, reports_to_id) for pk, dept_id, reports_to_id in UserProfile.objects.filter(
+            department_id__in={source_id, department_id},
+        ).values_list('pk', 'department_id', 'reports_to_id')}
+        reports_of = {}
+        for pk, (dept_id, reports_to_id) in snapshot.items():
+            if dept_id == source_id and reports_to_id is not None:
+                reports_of.setdefault(reports_to_id, []).append(pk)
+        moved = _subtree(profile_id, reports_of)
+
+        if parent_id is not None:
+            if parent_id not in snapshot or snapshot[parent_id][0] != department_id:
+                raise HierarchyError('The new manager is not in that company.')
+            if parent_id in moved:
+                raise HierarchyError('Circular reference')
+        order = (UserProfile.objects.filter(department_id=department_id, reports_to_id=parent_id)
+                 .exclude(pk=profile_id).aggregate(last=Max('hierarchy_order'))['last'])
+
+        now = timezone.now()
+        UserProfile.objects.filter(pk__in=moved).update(department_id=department_id, updated_at=now)
+        UserProfile.objects.filter(pk=profile_id).update(
+            reports_to_id=parent_id, hierarchy_order=0 if order is None else order + 1, updated_at=now,
+        )
+
+        # update() sends no signals, so log and invalidate here
+        record_updates(UserProfile.objects.filter(pk__in=moved))
+        bump_data_version(source_id, department_id)
+        if source_id != department_id:
+            bump_kpi_version(source_id, department_id)
+            bump_people_version()
+            forget_principals(*UserProfile.objects.filter(pk__in=moved).values_list('user_id', flat=True))
+    return moved
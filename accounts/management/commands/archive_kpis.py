@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from accounts.archive import archive_year, closed_years
+
+
+class Command(BaseCommand):
+    help = (
+        "Move KPI rows and files from closed years into the archive. Managers "
+        "browsing an archived year in the KPI page restore it automatically."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', type=int, action='append', dest='years',
+                            help='Archive this year (repeatable). Defaults to every closed year.')
+
+    def handle(self, *args, **options):
+        years = options['years'] or closed_years()
+        if not years:
+            self.stdout.write('Nothing to archive.')
+        for year in years:
+            count = archive_year(year)
+            self.stdout.write(f"{year}: archived {count} KPI file{'s' if count != 1 else ''}")
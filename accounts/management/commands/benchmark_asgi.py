@@ -0,0 +1,149 @@
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from wsgiref.util import setup_testing_defaults
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.asgi import get_asgi_application
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.test import Client
+from django.urls import reverse
+
+from accounts.models import UserProfile
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare read-page throughput through the WSGI and ASGI entry points, "
+        "with a delay added to every query to mimic the remote database. "
+        "Run it against local settings, never production."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Staff username to browse as (default: first staff user).')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per run.')
+        parser.add_argument('--workers', type=int, default=4, help='Sync WSGI workers to compare against.')
+        parser.add_argument('--concurrency', type=int, default=50, help='ASGI requests in flight at once.')
+        parser.add_argument('--latency-ms', type=float, default=20, help='Delay added to every query.')
+        parser.add_argument('--path', action='append', dest='paths', help='Page to fetch (repeatable).')
+
+    def handle(self, *args, **options):
+        user = self._user(options['user'])
+        paths = options['paths'] or self._default_paths(user)
+        client = Client()
+        client.force_login(user)
+        cookie = f"{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}"
+        urls = [paths[i % len(paths)] for i in range(options['requests'])]
+
+        latency = options['latency_ms'] / 1000
+
+        def slow_query(execute, sql, params, many, context):
+            time.sleep(latency)
+            return execute(sql, params, many, context)
+
+        def add_latency(connection, **kwargs):
+            if slow_query not in connection.execute_wrappers:
+                connection.execute_wrappers.append(slow_query)
+
+        connection_created.connect(add_latency)
+        for connection in connections.all():
+            add_latency(connection)
+        try:
+            wsgi = self._run_wsgi(get_wsgi_application(), urls, cookie, options['workers'])
+            asgi = asyncio.run(self._run_asgi(get_asgi_application(), urls, cookie, options['concurrency']))
+        finally:
+            connection_created.disconnect(add_latency)
+            for connection in connections.all():
+                if slow_query in connection.execute_wrappers:
+                    connection.execute_wrappers.remove(slow_query)
+
+        self.stdout.write(f"{len(urls)} requests over {len(paths)} pages as {user.username}, "
+                          f"{options['latency_ms']:g} ms per query")
+        self._report(f"WSGI, {options['workers']} sync workers", *wsgi)
+        self._report(f"ASGI, {options['concurrency']} in flight", *asgi)
+
+    def _user(self, username):
+        users = User.objects.filter(is_staff=True, is_active=True)
+        user = users.filter(username=username).first() if username else users.order_by('pk').first()
+        if user is None:
+            raise CommandError('No matching staff user to browse as.')
+        return user
+
+    def _default_paths(self, user):
+        paths = [reverse('admin_center'), reverse('org_chart'),
+                 reverse('user_dashboard'), reverse('department_page')]
+        dept_id = UserProfile.objects.filter(user=user).values_list('department_id', flat=True).first()
+        if dept_id:
+            paths.append(reverse('dept_org_chart', args=[dept_id]))
+        return paths
+
+    def _run_wsgi(self, app, urls, cookie, workers):
+        def fetch(path):
+            environ = {}
+            setup_testing_defaults(environ)
+            environ.update(PATH_INFO=path, HTTP_HOST='localhost', HTTP_COOKIE=cookie)
+            status = []
+            started = time.perf_counter()
+            body = app(environ, lambda s, headers, exc_info=None: status.append(int(s.split()[0])))
+            for _ in body:
+                pass
+            body.close()
+            return status[0], time.perf_counter() - started
+
+        fetch(urls[0])  # warm template and URL caches
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(fetch, urls))
+        return results, time.perf_counter() - started
+
+    async def _run_asgi(self, app, urls, cookie, concurrency):
+        slots = asyncio.Semaphore(concurrency)
+
+        async def fetch(path):
+            scope = {
+                'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+                'method': 'GET', 'scheme': 'http', 'path': path, 'raw_path': path.encode(),
+                'query_string': b'', 'root_path': '',
+                'headers': [(b'host', b'localhost'), (b'cookie', cookie.encode())],
+                'client': ('127.0.0.1', 0), 'server': ('localhost', 80),
+            }
+            requested = False
+            disconnected = asyncio.get_running_loop().create_future()
+
+            async def receive():
+                nonlocal requested
+                if not requested:
+                    requested = True
+                    return {'type': 'http.request', 'body': b'', 'more_body': False}
+                return await disconnected
+
+            status = []
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    status.append(message['status'])
+
+            async with slots:
+                started = time.perf_counter()
+                await app(scope, receive, send)
+                return status[0], time.perf_counter() - started
+
+        await fetch(urls[0])
+        started = time.perf_counter()
+        results = await asyncio.gather(*(fetch(path) for path in urls))
+        return results, time.perf_counter() - started
+
+    def _report(self, label, results, elapsed):
+        timings = sorted(t for _, t in results)
+        errors = sum(1 for status, _ in results if status != 200)
+        p95 = statistics.quantiles(timings, n=20)[-1] if len(timings) > 1 else timings[0]
+        self.stdout.write(
+            f"  {label:<28} {len(results) / elapsed:7.1f} req/s   "
+            f"p50 {statistics.median(timings) * 1000:6.0f} ms   p95 {p95 * 1000:6.0f} ms"
+            + (f"   {errors} non-200" if errors else '')
+        )
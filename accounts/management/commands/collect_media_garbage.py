@@ -0,0 +1,56 @@
+import os
+from collections import Counter
+
+from django.core.management.base import BaseCommand
+
+from accounts.orphans import GRACE_SECONDS, delete_orphans, find_orphans
+from accounts.uploads import discard_stale_uploads
+
+
+def _size(n):
+    for unit in ('B', 'KB', 'MB', 'GB'):
+        if n < 1024:
+            return f"{n:.0f} {unit}"
+        n /= 1024
+    return f"{n:.1f} TB"
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete media files that no KPI file, upload, profile, company or "
+        "archive row references, e.g. left behind by deleted users and "
+        "companies. Files and references are compared as two sorted streams."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Report orphans per directory without deleting (-v 2 lists them).')
+        parser.add_argument('--workers', type=int, default=min(32, (os.cpu_count() or 1) * 4),
+                            help='Threads deleting files.')
+        parser.add_argument('--batch-size', type=int, default=5000,
+                            help='Database references fetched per query.')
+        parser.add_argument('--grace', type=int, default=GRACE_SECONDS,
+                            help='Skip files modified less than this many seconds ago.')
+
+    def handle(self, *args, **options):
+        if not options['dry_run']:
+            # Abandoned chunked uploads go first, so their files count as orphans
+            while discard_stale_uploads():
+                pass
+        orphans = find_orphans(options['batch_size'], options['grace'])
+        if not options['dry_run']:
+            files, freed = delete_orphans(orphans, options['workers'])
+            self.stdout.write(self.style.SUCCESS(f"Deleted {files} orphaned file{'s' if files != 1 else ''} "
+                                                 f"({_size(freed)})."))
+            return
+
+        counts, sizes = Counter(), Counter()
+        for name, size in orphans:
+            directory = name.split('/', 1)[0]
+            counts[directory] += 1
+            sizes[directory] += size
+            if options['verbosity'] > 1:
+                self.stdout.write(f"  {name} ({_size(size)})")
+        for directory in sorted(counts):
+            self.stdout.write(f"{directory}: {counts[directory]} orphaned ({_size(sizes[directory])})")
+        self.stdout.write(f"Would delete {sum(counts.values())} files ({_size(sum(sizes.values()))}).")
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from accounts.deletion import run_job
+from accounts.models import DeletionJob
+
+
+class Command(BaseCommand):
+    help = "Finish company and user deletions left unfinished, e.g. by a server restart."
+
+    def handle(self, *args, **options):
+        jobs = DeletionJob.objects.filter(status__in=('pending', 'running')).order_by('created_at')
+        for job_id, label in jobs.values_list('pk', 'label'):
+            self.stdout.write(f"Deleting {label}...")
+            run_job(job_id)
+            job = DeletionJob.objects.get(pk=job_id)
+            self.stdout.write(f"  {job.done} of {job.total} users, {job.files_removed} files removed")
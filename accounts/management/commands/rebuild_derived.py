@@ -0,0 +1,63 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Q
+
+from accounts.derived import discover, rebuild_companies
+from accounts.models import Department
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild derived data and caches (theme files, archived-year summaries, "
+        "cached pages, heatmaps, KPI standings, search index) after a restore or "
+        "migration. Companies are rebuilt in parallel worker processes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--only', action='append', choices=list(discover()), metavar='NAME',
+                            help=f"Rebuild just this kind of data (repeatable): {', '.join(discover())}.")
+        parser.add_argument('--company', action='append', dest='companies', metavar='ID_OR_NAME',
+                            help='Rebuild just this company (repeatable). Skips data that is not per company '
+                                 'unless named with --only.')
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help='Worker processes (default: one per CPU).')
+
+    def handle(self, *args, **options):
+        providers = discover()
+        names = options['only'] or list(providers)
+        per_company = [name for name in names if providers[name][1]]
+        once = [name for name in names if not providers[name][1]]
+
+        departments = Department.objects.order_by('name')
+        if options['companies']:
+            condition = Q()
+            for value in options['companies']:
+                condition |= Q(pk=value) if value.isdigit() else Q(name__iexact=value)
+            departments = departments.filter(condition)
+            # An id and a name may pick the same company, so match values, not counts
+            matched = set()
+            for pk, name in departments.values_list('pk', 'name'):
+                matched |= {str(pk), name.lower()}
+            unknown = [value for value in options['companies']
+                       if (value if value.isdigit() else value.lower()) not in matched]
+            if unknown:
+                raise CommandError(f"Unknown company in --company: {', '.join(unknown)}.")
+            if not options['only']:
+                once = []
+        labels = dict(departments.values_list('pk', 'name'))
+
+        started = time.perf_counter()
+        if per_company:
+            self.stdout.write(f"Rebuilding {', '.join(per_company)} for {len(labels)} "
+                              f"compan{'y' if len(labels) == 1 else 'ies'}...")
+            results = rebuild_companies(list(labels), per_company, options['workers'])
+            for done, (department_id, timings) in enumerate(results, start=1):
+                steps = ', '.join(f'{name} {seconds:.2f}s' for name, seconds in timings)
+                self.stdout.write(f"  [{done}/{len(labels)}] {labels[department_id]}: {steps}")
+        for name in once:
+            step_started = time.perf_counter()
+            providers[name][0]()
+            self.stdout.write(f"  {name}: {time.perf_counter() - step_started:.2f}s")
+        self.stdout.write(self.style.SUCCESS(f"Done in {time.perf_counter() - started:.2f}s"))
@@ -0,0 +1,126 @@
+import filecmp
+import os
+import posixpath
+import shutil
+
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from accounts.caching import bump_company_list_version, bump_data_version, bump_people_version, forget_principals
+from accounts.changefeed import record_updates
+from accounts.models import Department, KPIFile, UserProfile
+from accounts.storage import hash_shard, kpi_file_path
+
+
+# Names with more than one directory level are sharded already, including
+# ones that got a suffix to avoid a clash, so they are never moved twice
+
+def _kpi_target(kpi):
+    name = kpi.file.name
+    return None if name.count('/') > 1 else kpi_file_path(kpi, posixpath.basename(name))
+
+
+def _hashed_target(field):
+    def target(obj):
+        name = getattr(obj, field).name
+        return None if name.count('/') > 1 else hash_shard(name)
+    return target
+
+
+def _after_kpis(kpis):
+    record_updates(KPIFile.objects.filter(pk__in=[kpi.pk for kpi in kpis]))
+
+
+def _after_profiles(profiles):
+    record_updates(UserProfile.objects.filter(pk__in=[profile.pk for profile in profiles]))
+    bump_data_version(*{profile.department_id for profile in profiles})
+    bump_people_version()
+    forget_principals(*[profile.user_id for profile in profiles])
+
+
+def _after_departments(departments):
+    record_updates(Department.objects.filter(pk__in=[department.pk for department in departments]))
+    bump_data_version(*[department.pk for department in departments])
+    bump_company_list_version()
+
+
+# (label, queryset, file field, new name for a row, bookkeeping after a batch)
+TARGETS = [
+    ('KPI files', KPIFile.objects.select_related('employee__profile'), 'file', _kpi_target, _after_kpis),
+    ('profile pictures', UserProfile.objects.all(), 'profile_picture', _hashed_target('profile_picture'),
+     _after_profiles),
+    ('company logos', Department.objects.all(), 'logo', _hashed_target('logo'), _after_departments),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Move media saved before sharding into the sharded layout (KPI files by "
+        "company/year/quarter, pictures and logos by hash prefix) and rewrite "
+        "the file paths in batches. Safe to stop and run again."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--dry-run', action='store_true', help='Only count the files that would move.')
+
+    def handle(self, *args, **options):
+        for label, queryset, field, target, after in TARGETS:
+            moved = missing = 0
+            last_pk = 0
+            while True:
+                batch = list(queryset.exclude(**{field: ''}).filter(pk__gt=last_pk)
+                             .order_by('pk')[:options['batch_size']])
+                if not batch:
+                    break
+                last_pk = batch[-1].pk
+                pending = [(obj, getattr(obj, field).name, target(obj)) for obj in batch]
+                pending = [(obj, old, new) for obj, old, new in pending if new not in (None, old)]
+                if options['dry_run']:
+                    moved += len(pending)
+                    continue
+                done, old_names = [], []
+                for obj, old, new in pending:
+                    new = self._link(old, new)
+                    if new is None:
+                        missing += 1
+                        continue
+                    setattr(obj, field, new)
+                    done.append(obj)
+                    old_names.append(old)
+                if not done:
+                    continue
+                # Rows switch to the new names together; the old names are
+                # only removed once that has committed
+                with transaction.atomic():
+                    type(done[0]).objects.bulk_update(done, [field])
+                    after(done)
+                for old in old_names:
+                    default_storage.delete(old)
+                moved += len(done)
+                self.stdout.write(f"  {label}: {moved} moved")
+            verb = 'would move' if options['dry_run'] else 'moved'
+            self.stdout.write(f"{label}: {verb} {moved}" + (f", {missing} missing from storage" if missing else ''))
+
+    def _link(self, old, new):
+        """Give ``old``'s file a second name at ``new`` (or a free variant of
+        it) and return that name; None if ``old`` is gone.
+
+        Reuses a file already at ``new`` with the same contents, which is
+        what an interrupted earlier run leaves behind.
+        """
+        old_path = default_storage.path(old)
+        if not os.path.exists(old_path):
+            return None
+        if default_storage.exists(new):
+            if filecmp.cmp(old_path, default_storage.path(new), shallow=False):
+                return new
+            new = default_storage.get_available_name(new)
+        new_path = default_storage.path(new)
+        os.makedirs(os.path.dirname(new_path), exist_ok=True)
+        try:
+            os.link(old_path, new_path)
+        except OSError:
+            shutil.copy2(old_path, new_path)
+        return new
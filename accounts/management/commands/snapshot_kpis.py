@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from accounts.stats import snapshot_closed_quarters
+
+
+class Command(BaseCommand):
+    help = (
+        "Compute employee and company KPI standings for closed quarters. Only "
+        "quarters whose KPI rows changed since the last run are recomputed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true',
+                            help='Recompute every closed quarter, changed or not.')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        quarters, people, firms = snapshot_closed_quarters(full=options['full'])
+        if not quarters:
+            self.stdout.write('Standings are up to date.')
+            return
+        self.stdout.write(f"Recomputed {', '.join(f'{q} {y}' for y, q in quarters)}: "
+                          f"{people} employee and {firms} company standings "
+                          f"in {time.perf_counter() - started:.2f}s")
@@ -0,0 +1,196 @@
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache.backends.filebased import FileBasedCache
+
+# name: (type, help, histogram bucket upper bounds)
+METRICS = {
+    'pulseboard_requests_total': ('counter', 'Requests handled, by view, method and status code.', None),
+    'pulseboard_request_duration_seconds': (
+        'histogram', 'Time to produce a response, by view.',
+        (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    ),
+    'pulseboard_request_db_queries': (
+        'histogram', 'Database queries run per request, by view.',
+        (0, 1, 2, 5, 10, 20, 50, 100, 200, 500),
+    ),
+    'pulseboard_upload_bytes': (
+        'histogram', 'Size of completed KPI uploads, by upload method.',
+        tuple(2 ** n for n in range(16, 31, 2)),  # 64 KB to 1 GB
+    ),
+    'pulseboard_cache_requests_total': ('counter', 'Cache lookups, by kind of key and hit or miss.', None),
+}
+
+# This process's values: {(name, ((label, value), ...)): number or
+# [bucket counts..., +Inf count, sum]}
+_values = {}
+_lock = threading.Lock()
+# One file per process; the start time keeps a reused pid from overwriting it
+_file_name = f"{os.getpid()}-{int(time.time())}.json"
+_last_save = 0.0
+
+
+def _key(name, labels):
+    return name, tuple(sorted((label, str(value)) for label, value in labels.items()))
+
+
+def inc(name, amount=1, **labels):
+    key = _key(name, labels)
+    with _lock:
+        _values[key] = _values.get(key, 0) + amount
+
+
+def observe(name, value, **labels):
+    buckets = METRICS[name][2]
+    key = _key(name, labels)
+    with _lock:
+        entry = _values.get(key)
+        if entry is None:
+            entry = _values[key] = [0] * (len(buckets) + 2)
+        entry[bisect_left(buckets, value)] += 1
+        entry[-1] += value
+
+
+def _snapshot():
+    with _lock:
+        return [[name, list(labels), value if isinstance(value, (int, float)) else list(value)]
+                for (name, labels), value in _values.items()]
+
+
+def save(force=False):
+    """Write this process's values for :func:`collect` in other processes,
+    at most every ``METRICS_SAVE_SECONDS`` unless forced."""
+    global _last_save
+    now = time.monotonic()
+    if not force and now - _last_save < settings.METRICS_SAVE_SECONDS:
+        return
+    _last_save = now
+    directory = settings.METRICS_DIR
+    os.makedirs(directory, exist_ok=True)
+    with tempfile.NamedTemporaryFile('w', dir=directory, suffix='.tmp', delete=False) as f:
+        json.dump(_snapshot(), f)
+    os.replace(f.name, os.path.join(directory, _file_name))
+
+
+def _merge(totals, rows):
+    for name, labels, value in rows:
+        key = (name, tuple(tuple(pair) for pair in labels))
+        if isinstance(value, list):
+            current = totals.setdefault(key, [0] * len(value))
+            for i, v in enumerate(value):
+                current[i] += v
+        else:
+            totals[key] = totals.get(key, 0) + value
+
+
+def _read_all():
+    """Every process's values summed. Files from processes gone quiet for
+    ``METRICS_RETENTION_SECONDS`` are dropped (scrapers see a counter reset)."""
+    totals = {}
+    directory = settings.METRICS_DIR
+    cutoff = time.time() - settings.METRICS_RETENTION_SECONDS
+    try:
+        entries = list(os.scandir(directory))
+    except FileNotFoundError:
+        entries = []
+    for entry in entries:
+        if not entry.name.endswith('.json') or entry.name == _file_name:
+            continue
+        try:
+            if entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                continue
+            with open(entry.path) as f:
+                _merge(totals, json.load(f))
+        except (OSError, ValueError):
+            continue  # removed or replaced under us
+    _merge(totals, _snapshot())
+    return totals
+
+
+def _labels(pairs):
+    if not pairs:
+        return ''
+    escaped = (v.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def collect():
+    """All workers' metrics in the Prometheus text exposition format."""
+    totals = _read_all()
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for (metric, labels), value in sorted(totals.items(), key=lambda item: item[0]):
+            if metric != name:
+                continue
+            if kind == 'counter':
+                lines.append(f'{name}{_labels(labels)} {_number(value)}')
+                continue
+            cumulative = 0
+            for bound, count in zip(list(buckets) + ['+Inf'], value[:-1]):
+                cumulative += count
+                lines.append(f'{name}_bucket{_labels(labels + (("le", _number(bound)),))} {cumulative}')
+            lines.append(f'{name}_sum{_labels(labels)} {_number(value[-1])}')
+            lines.append(f'{name}_count{_labels(labels)} {cumulative}')
+    return '\n'.join(lines) + '\n'
+
+
+atexit.register(save, force=True)
+
+
+# ─── Database queries per request ───────────────────────────
+# Async views run their queries in worker threads; a context variable
+# follows the request there, where a per-connection thread-local would not.
+
+_query_count = ContextVar('query_count', default=None)
+
+
+def count_queries(execute, sql, params, many, context):
+    counter = _query_count.get()
+    if counter is not None:
+        counter[0] += 1
+    return execute(sql, params, many, context)
+
+
+def start_request():
+    """Begin counting this request's queries; returns the counter."""
+    counter = [0]
+    _query_count.set(counter)
+    return counter
+
+
+# ─── Cache hit rates ────────────────────────────────────────
+
+def _cache_kind(key):
+    """A low-cardinality label for a cache key: its prefix up to the first
+    colon, the name of a template fragment, or "session"."""
+    if key.startswith('template.cache.'):
+        return key[len('template.cache.'):].rsplit('.', 1)[0]
+    if key.startswith('django.contrib.sessions.'):
+        return 'session'
+    return key.split(':', 1)[0] if ':' in key else 'other'
+
+
+_MISSING = object()
+
+
+class InstrumentedFileBasedCache(FileBasedCache):
+    """FileBasedCache that counts hits and misses per kind of key."""
+
+    def get(self, key, default=None, version=None):
+        value = super().get(key, _MISSING, version)
+        inc('pulseboard_cache_requests_total', kind=_cache_kind(key), result='miss' if value is _MISSING else 'hit')
+        return default if value is _MISSING else value
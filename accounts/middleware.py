@@ -0,0 +1,72 @@
+import time
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.utils.decorators import sync_and_async_middleware
+
+from . import audit, metrics
+from .routers import PIN_COOKIE, replica_configured
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+
+def _pin(request, response):
+    if request.method not in SAFE_METHODS and response.status_code < 400 and replica_configured():
+        response.set_cookie(PIN_COOKIE, '1', max_age=settings.REPLICA_STICKY_SECONDS, httponly=True, samesite='Lax')
+    return response
+
+
+@sync_and_async_middleware
+def pin_primary_after_write(get_response):
+    """Keep a browser on the primary database for a few seconds after it
+    writes, so the replica-backed pages show its own changes."""
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            return _pin(request, await get_response(request))
+    else:
+        def middleware(request):
+            return _pin(request, get_response(request))
+    return middleware
+
+
+@sync_and_async_middleware
+def flush_audit_log(get_response):
+    """Write the audit events a request queued once it has its response."""
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            response = await get_response(request)
+            if audit.pending():
+                await sync_to_async(audit.flush)()
+            return response
+    else:
+        def middleware(request):
+            response = get_response(request)
+            if audit.pending():
+                audit.flush()
+            return response
+    return middleware
+
+
+def _record(request, response, started, queries):
+    match = request.resolver_match
+    view = match.view_name if match else 'unmatched'
+    metrics.inc('pulseboard_requests_total', view=view, method=request.method, status=response.status_code)
+    metrics.observe('pulseboard_request_duration_seconds', time.perf_counter() - started, view=view)
+    metrics.observe('pulseboard_request_db_queries', queries[0], view=view)
+    metrics.save()
+    return response
+
+
+@sync_and_async_middleware
+def record_request_metrics(get_response):
+    """Time each request and count its database queries, per view."""
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            started, queries = time.perf_counter(), metrics.start_request()
+            response = await get_response(request)
+            return await sync_to_async(_record)(request, response, started, queries)
+    else:
+        def middleware(request):
+            started, queries = time.perf_counter(), metrics.start_request()
+            return _record(request, get_response(request), started, queries)
+    return middleware
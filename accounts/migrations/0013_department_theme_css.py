@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:30
+
+import hashlib
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import migrations, models
+
+# A frozen copy of accounts.themes as of this migration, so later changes
+# there can't alter what it writes
+THEME_CSS = ':root{{--brand:{primary};--brand-hover:{hover};--brand-accent:{accent};}}\n'
+
+
+def generate_theme_files(apps, schema_editor):
+    Department = apps.get_model('accounts', 'Department')
+    for dept in Department.objects.all():
+        css = THEME_CSS.format(primary=dept.brand_primary, hover=dept.brand_hover, accent=dept.brand_accent).encode()
+        name = f'themes/theme.{hashlib.sha256(css).hexdigest()[:12]}.css'
+        if not default_storage.exists(name):
+            default_storage.save(name, ContentFile(css))
+        dept.theme_css = name
+        dept.save(update_fields=['theme_css'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0012_fix_department_description_word'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='department',
+            name='theme_css',
+            field=models.FileField(blank=True, editable=False, upload_to='themes/'),
+        ),
+        migrations.RunPython(generate_theme_files, migrations.RunPython.noop),
+    ]
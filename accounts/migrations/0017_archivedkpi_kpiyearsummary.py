@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-19 19:53
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0016_deletionjob'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedKPI',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=200)),
+                ('quarter', models.CharField(choices=[('Q1', 'Q1 (Jan - Mar)'), ('Q2', 'Q2 (Apr - Jun)'), ('Q3', 'Q3 (Jul - Sep)'), ('Q4', 'Q4 (Oct - Dec)')], max_length=2)),
+                ('year', models.IntegerField()),
+                ('kpi_score', models.IntegerField(blank=True, null=True)),
+                ('uploaded_at', models.DateTimeField()),
+                ('file_name', models.CharField(blank=True, max_length=255)),
+                ('archive', models.CharField(blank=True, max_length=255)),
+                ('member', models.CharField(blank=True, max_length=255)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_kpis', to=settings.AUTH_USER_MODEL)),
+                ('uploaded_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_kpi_uploads', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['year', 'quarter'],
+                'indexes': [models.Index(fields=['employee', 'year'], name='accounts_ar_employe_4df68c_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='KPIYearSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField()),
+                ('file_count', models.PositiveIntegerField(default=0)),
+                ('scored_count', models.PositiveIntegerField(default=0)),
+                ('score_total', models.PositiveIntegerField(default=0)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='kpi_year_summaries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'KPI year summaries',
+                'ordering': ['year'],
+                'unique_together': {('employee', 'year')},
+            },
+        ),
+    ]
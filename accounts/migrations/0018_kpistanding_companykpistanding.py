@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-19 20:01
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0017_archivedkpi_kpiyearsummary'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CompanyKPIStanding',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField()),
+                ('quarter', models.CharField(choices=[('Q1', 'Q1 (Jan - Mar)'), ('Q2', 'Q2 (Apr - Jun)'), ('Q3', 'Q3 (Jul - Sep)'), ('Q4', 'Q4 (Oct - Dec)')], max_length=2)),
+                ('headcount', models.PositiveIntegerField()),
+                ('mean', models.FloatField()),
+                ('median', models.FloatField()),
+                ('p25', models.FloatField()),
+                ('p75', models.FloatField()),
+                ('std', models.FloatField()),
+                ('rank', models.PositiveIntegerField(help_text='1 is the highest mean score that quarter')),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('department', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='company_kpi_standings', to='accounts.department')),
+            ],
+            options={
+                'ordering': ['year', 'quarter'],
+                'unique_together': {('department', 'year', 'quarter')},
+            },
+        ),
+        migrations.CreateModel(
+            name='KPIStanding',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField()),
+                ('quarter', models.CharField(choices=[('Q1', 'Q1 (Jan - Mar)'), ('Q2', 'Q2 (Apr - Jun)'), ('Q3', 'Q3 (Jul - Sep)'), ('Q4', 'Q4 (Oct - Dec)')], max_length=2)),
+                ('score', models.IntegerField()),
+                ('percentile', models.FloatField(help_text='Percentile rank within the company, 0-100')),
+                ('z_score', models.FloatField()),
+                ('rank', models.PositiveIntegerField(help_text='1 is the highest score in the company')),
+                ('trend', models.FloatField(blank=True, help_text='Points per quarter over the last year', null=True)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('department', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='kpi_standings', to='accounts.department')),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='kpi_standings', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['year', 'quarter'],
+                'indexes': [models.Index(fields=['department', 'year', 'quarter'], name='accounts_kp_departm_0b87ac_idx')],
+                'unique_together': {('employee', 'year', 'quarter')},
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 20:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0018_kpistanding_companykpistanding'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KPIQuarterSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.IntegerField()),
+                ('quarter', models.CharField(choices=[('Q1', 'Q1 (Jan - Mar)'), ('Q2', 'Q2 (Apr - Jun)'), ('Q3', 'Q3 (Jul - Sep)'), ('Q4', 'Q4 (Oct - Dec)')], max_length=2)),
+                ('fingerprint', models.CharField(max_length=200)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['year', 'quarter'],
+                'unique_together': {('year', 'quarter')},
+            },
+        ),
+    ]
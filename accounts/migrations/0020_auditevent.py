@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 20:13
+
+import django.core.serializers.json
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0019_kpiquartersnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditEvent',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('actor_id', models.BigIntegerField(blank=True, null=True)),
+                ('actor_name', models.CharField(blank=True, max_length=150)),
+                ('action', models.CharField(choices=[('kpi_upload', 'KPI uploaded'), ('kpi_score', 'KPI score changed'), ('kpi_delete', 'KPI deleted'), ('reports_to', 'Manager changed'), ('reorder', 'Team reordered'), ('move_team', 'Team moved'), ('department', 'Company changed')], max_length=10)),
+                ('employee_id', models.BigIntegerField(blank=True, null=True)),
+                ('department_id', models.BigIntegerField(blank=True, null=True)),
+                ('details', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ['-at', '-id'],
+                'indexes': [models.Index(fields=['employee_id', '-at'], name='accounts_au_employe_5c9c0c_idx'), models.Index(fields=['department_id', '-at'], name='accounts_au_departm_4acbc8_idx')],
+            },
+        ),
+    ]
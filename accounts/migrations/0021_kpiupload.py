@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-19 20:17
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0020_auditevent'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KPIUpload',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('quarter', models.CharField(choices=[('Q1', 'Q1 (Jan - Mar)'), ('Q2', 'Q2 (Apr - Jun)'), ('Q3', 'Q3 (Jul - Sep)'), ('Q4', 'Q4 (Oct - Dec)')], max_length=2)),
+                ('year', models.IntegerField()),
+                ('original_name', models.CharField(max_length=255)),
+                ('file', models.FileField(upload_to='kpi_files/')),
+                ('size', models.BigIntegerField()),
+                ('received', models.BigIntegerField(default=0)),
+                ('digest', models.CharField(blank=True, max_length=64)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('employee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='kpi_upload_sessions', to=settings.AUTH_USER_MODEL)),
+                ('uploaded_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
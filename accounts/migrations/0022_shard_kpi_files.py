@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-19 20:19
+
+import accounts.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0021_kpiupload'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='kpifile',
+            name='file',
+            field=models.FileField(upload_to=accounts.storage.kpi_file_path),
+        ),
+        migrations.AlterField(
+            model_name='kpiupload',
+            name='file',
+            field=models.FileField(upload_to=accounts.storage.kpi_file_path),
+        ),
+    ]
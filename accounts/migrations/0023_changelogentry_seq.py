@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-19 20:33
+
+from django.db import migrations, models
+from django.db.models import F, Max
+
+
+def number_existing_entries(apps, schema_editor):
+    # Existing entries keep their id as seq, so clients' cursors stay valid
+    ChangeLogEntry = apps.get_model('accounts', 'ChangeLogEntry')
+    ChangeFeedSequence = apps.get_model('accounts', 'ChangeFeedSequence')
+    ChangeLogEntry.objects.update(seq=F('id'))
+    last = ChangeLogEntry.objects.aggregate(last=Max('id'))['last'] or 0
+    ChangeFeedSequence.objects.create(pk=1, last=last)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0022_shard_kpi_files'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChangeFeedSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('last', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='changelogentry',
+            name='seq',
+            field=models.BigIntegerField(blank=True, null=True, unique=True),
+        ),
+        migrations.RunPython(number_existing_entries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-19 20:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0023_changelogentry_seq'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='kpiupload',
+            name='writing_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
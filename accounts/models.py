@@ -1,6 +1,13 @@
+import uuid
+
 from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.db import models
+from django.utils import timezone
+
+from .storage import kpi_file_path
+from .themes import ensure_theme_file
 
 
 class Department(models.Model):
@@ -10,7 +17,9 @@ class Department(models.Model):
     brand_primary = models.CharField(max_length=7, default='#054B70')
     brand_hover = models.CharField(max_length=7, default='#043d5c')
     brand_accent = models.CharField(max_length=7, default='#8CB7C4')
+    theme_css = models.FileField(upload_to='themes/', blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['name']
@@ -20,6 +29,10 @@ class Department(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        self.theme_css = ensure_theme_file(self.brand_primary, self.brand_hover, self.brand_accent)
+        super().save(*args, **kwargs)
+
 
 class UserProfile(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='profile')
@@ -42,6 +55,7 @@ class UserProfile(models.Model):
         blank=True,
         related_name='direct_reports',
     )
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         dept_name = self.department.name if self.department else 'No Department'
@@ -58,11 +72,12 @@ class KPIFile(models.Model):
 
     employee = models.ForeignKey(User, on_delete=models.CASCADE, related_name='kpi_files')
     uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='kpi_uploads')
-    file = models.FileField(upload_to='kpi_files/')
+    file = models.FileField(upload_to=kpi_file_path)
     title = models.CharField(max_length=200)
     quarter = models.CharField(max_length=2, choices=QUARTER_CHOICES, default='Q1')
     year = models.IntegerField(default=2026)
     uploaded_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     kpi_score = models.IntegerField(
         null=True, blank=True,
         validators=[MinValueValidator(0), MaxValueValidator(100)],
@@ -74,3 +89,228 @@ class KPIFile(models.Model):
 
     def __str__(self):
         return f"{self.employee.username} - {self.quarter} {self.year}"
+
+
+class KPIUpload(models.Model):
+    """A chunked KPI upload in progress. Chunks are written straight into
+    ``file``; the KPIFile row is created only once all ``size`` bytes arrive."""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    employee = models.ForeignKey(User, on_delete=models.CASCADE, related_name='kpi_upload_sessions')
+    uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    quarter = models.CharField(max_length=2, choices=KPIFile.QUARTER_CHOICES)
+    year = models.IntegerField()
+    original_name = models.CharField(max_length=255)
+    file = models.FileField(upload_to=kpi_file_path)
+    size = models.BigIntegerField()
+    received = models.BigIntegerField(default=0)
+    # SHA-256 chained over each chunk's SHA-256, so it grows with the upload
+    digest = models.CharField(max_length=64, blank=True)
+    # Set while one request streams a chunk in (see uploads.claim_chunk)
+    writing_until = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.original_name} ({self.received}/{self.size})"
+
+
+class ArchivedKPI(models.Model):
+    """A KPI row from a closed year; its file lives in a compressed bundle."""
+    employee = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_kpis')
+    uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_kpi_uploads')
+    title = models.CharField(max_length=200)
+    quarter = models.CharField(max_length=2, choices=KPIFile.QUARTER_CHOICES)
+    year = models.IntegerField()
+    kpi_score = models.IntegerField(null=True, blank=True)
+    uploaded_at = models.DateTimeField()
+    file_name = models.CharField(max_length=255, blank=True)
+    archive = models.CharField(max_length=255, blank=True)
+    member = models.CharField(max_length=255, blank=True)
+
+    class Meta:
+        ordering = ['year', 'quarter']
+        indexes = [models.Index(fields=['employee', 'year'])]
+
+    def __str__(self):
+        return f"{self.employee.username} - {self.quarter} {self.year} (archived)"
+
+
+class KPIYearSummary(models.Model):
+    """Score rollup for an employee's archived year, kept online for averages."""
+    employee = models.ForeignKey(User, on_delete=models.CASCADE, related_name='kpi_year_summaries')
+    year = models.IntegerField()
+    file_count = models.PositiveIntegerField(default=0)
+    scored_count = models.PositiveIntegerField(default=0)
+    score_total = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['year']
+        unique_together = ['employee', 'year']
+        verbose_name_plural = 'KPI year summaries'
+
+    def __str__(self):
+        return f"{self.employee.username} - {self.year}"
+
+class KPIStanding(models.Model):
+    """An employee's score for one quarter, placed against their company."""
+    employee = models.ForeignKey(User, on_delete=models.CASCADE, related_name='kpi_standings')
+    department = models.ForeignKey(Department, on_delete=models.CASCADE, related_name='kpi_standings')
+    year = models.IntegerField()
+    quarter = models.CharField(max_length=2, choices=KPIFile.QUARTER_CHOICES)
+    score = models.IntegerField()
+    percentile = models.FloatField(help_text='Percentile rank within the company, 0-100')
+    z_score = models.FloatField()
+    rank = models.PositiveIntegerField(help_text='1 is the highest score in the company')
+    trend = models.FloatField(null=True, blank=True, help_text='Points per quarter over the last year')
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['year', 'quarter']
+        unique_together = ['employee', 'year', 'quarter']
+        indexes = [models.Index(fields=['department', 'year', 'quarter'])]
+
+    def __str__(self):
+        return f"{self.employee.username} - {self.quarter} {self.year}: P{self.percentile:.0f}"
+
+
+class CompanyKPIStanding(models.Model):
+    """A company's score distribution for one quarter and its rank among companies."""
+    department = models.ForeignKey(Department, on_delete=models.CASCADE, related_name='company_kpi_standings')
+    year = models.IntegerField()
+    quarter = models.CharField(max_length=2, choices=KPIFile.QUARTER_CHOICES)
+    headcount = models.PositiveIntegerField()
+    mean = models.FloatField()
+    median = models.FloatField()
+    p25 = models.FloatField()
+    p75 = models.FloatField()
+    std = models.FloatField()
+    rank = models.PositiveIntegerField(help_text='1 is the highest mean score that quarter')
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['year', 'quarter']
+        unique_together = ['department', 'year', 'quarter']
+
+    def __str__(self):
+        return f"{self.department.name} - {self.quarter} {self.year}: #{self.rank}"
+
+
+class KPIQuarterSnapshot(models.Model):
+    """Fingerprint of a closed quarter's KPI rows when its standings were last
+    computed; a changed fingerprint means the quarter needs recomputing."""
+    year = models.IntegerField()
+    quarter = models.CharField(max_length=2, choices=KPIFile.QUARTER_CHOICES)
+    fingerprint = models.CharField(max_length=200)
+    computed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['year', 'quarter']
+        unique_together = ['year', 'quarter']
+
+    def __str__(self):
+        return f"{self.quarter} {self.year}"
+
+
+class ChangeLogEntry(models.Model):
+    """Append-only record of every change to people, companies and KPIs."""
+    ACTION_CHOICES = [
+        ('create', 'Create'),
+        ('update', 'Update'),
+        ('delete', 'Delete'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    # Position in commit order, assigned once the writing transaction has
+    # committed (see changefeed.sequence_changes); sync cursors use this
+    seq = models.BigIntegerField(null=True, blank=True, unique=True)
+    model = models.CharField(max_length=20)
+    object_id = models.BigIntegerField()
+    action = models.CharField(max_length=6, choices=ACTION_CHOICES)
+    department_id = models.BigIntegerField(null=True, blank=True, db_index=True)
+    data = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    changed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['id']
+        verbose_name_plural = 'change log entries'
+
+    def __str__(self):
+        return f"#{self.id} {self.action} {self.model} {self.object_id}"
+
+
+class ChangeFeedSequence(models.Model):
+    """Single row holding the last ``seq`` handed out; locking it makes
+    sequencers take turns."""
+    last = models.BigIntegerField(default=0)
+
+
+class AuditEvent(models.Model):
+    """Who changed a KPI or the hierarchy, and how. Written in batches by
+    ``accounts.audit``, so ids follow write order rather than event time."""
+    ACTION_CHOICES = [
+        ('kpi_upload', 'KPI uploaded'),
+        ('kpi_score', 'KPI score changed'),
+        ('kpi_delete', 'KPI deleted'),
+        ('reports_to', 'Manager changed'),
+        ('reorder', 'Team reordered'),
+        ('move_team', 'Team moved'),
+        ('department', 'Company changed'),
+    ]
+
+    id = models.BigAutoField(primary_key=True)
+    # Plain ids and a copied name, so history outlives deleted users and companies
+    actor_id = models.BigIntegerField(null=True, blank=True)
+    actor_name = models.CharField(max_length=150, blank=True)
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    employee_id = models.BigIntegerField(null=True, blank=True)
+    department_id = models.BigIntegerField(null=True, blank=True)
+    details = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['-at', '-id']
+        indexes = [
+            models.Index(fields=['employee_id', '-at']),
+            models.Index(fields=['department_id', '-at']),
+        ]
+
+    def __str__(self):
+        return f"{self.get_action_display()} by {self.actor_name or 'system'}"
+
+
+class DeletionJob(models.Model):
+    """A company or user being deleted in the background, with progress."""
+    KIND_CHOICES = [
+        ('user', 'User'),
+        ('department', 'Company'),
+    ]
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    target_id = models.IntegerField()
+    label = models.CharField(max_length=150)
+    requested_by = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, blank=True, related_name='deletion_jobs',
+    )
+    status = models.CharField(max_length=7, choices=STATUS_CHOICES, default='pending')
+    total = models.PositiveIntegerField(default=0)
+    done = models.PositiveIntegerField(default=0)
+    files_removed = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Delete {self.kind} {self.label} ({self.status})"
+
+    @property
+    def percent(self):
+        return round(100 * self.done / self.total) if self.total else (100 if self.status == 'done' else 0)
@@ -0,0 +1,205 @@
+import csv
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from itertools import chain
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+
+from .caching import bump_data_version, bump_people_version
+from .changefeed import batched_changes, record_change
+from .models import UserProfile
+
+REQUIRED_COLUMNS = ('username', 'first_name', 'last_name', 'email', 'company')
+OPTIONAL_COLUMNS = ('job_title', 'is_manager', 'reports_to', 'password')
+TRUE_VALUES = {'1', 'y', 'yes', 'true', 'manager'}
+FALSE_VALUES = {'', '0', 'n', 'no', 'false', 'employee'}
+MAX_ROWS = 5000
+INSERT_BATCH_SIZE = 500
+# Columns stored as-is, checked against their model field's max_length
+STORED_COLUMNS = {
+    'username': User, 'first_name': User, 'last_name': User, 'email': User, 'job_title': UserProfile,
+}
+
+
+def parse_csv(data, departments):
+    """Validate an onboarding CSV against ``departments`` (the companies the
+    importing manager may add people to).
+
+    Returns ``(rows, errors)``; errors are ``(line, message)`` pairs and
+    nothing should be imported while there are any.
+    """
+    try:
+        text = data.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        return [], [(0, 'The file must be UTF-8 encoded CSV.')]
+    reader = csv.DictReader(io.StringIO(text))
+    header = [name.strip().lower() for name in reader.fieldnames or []]
+    missing = [name for name in REQUIRED_COLUMNS if name not in header]
+    if missing:
+        return [], [(1, f"Missing column{'s' if len(missing) > 1 else ''}: {', '.join(missing)}")]
+    reader.fieldnames = header
+
+    rows, errors = [], []
+    for line, raw in enumerate(reader, start=2):
+        if line - 1 > MAX_ROWS:
+            errors.append((line, f'Import at most {MAX_ROWS} people at a time.'))
+            break
+        row = {name: (raw.get(name) or '').strip() for name in REQUIRED_COLUMNS + OPTIONAL_COLUMNS}
+        if not any(row.values()):
+            continue
+        row['line'] = line
+        rows.append(row)
+
+    companies = {d.name.lower(): d for d in departments}
+    usernames = [row['username'] for row in rows]
+    taken = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+    managers = {row['reports_to'] for row in rows if row['reports_to']} - set(usernames)
+    existing_managers = dict(UserProfile.objects.filter(user__username__in=managers).values_list(
+        'user__username', 'department_id',
+    ))
+
+    seen = set()
+    for row in rows:
+        line = row['line']
+        for name in REQUIRED_COLUMNS:
+            if not row[name]:
+                errors.append((line, f'{name} is required.'))
+        for name, model in STORED_COLUMNS.items():
+            limit = model._meta.get_field(name).max_length
+            if len(row[name]) > limit:
+                errors.append((line, f'{name} can be at most {limit} characters.'))
+        username = row['username']
+        if username:
+            try:
+                User.username_validator(username)
+            except ValidationError as e:
+                errors.append((line, e.messages[0]))
+            if username in taken:
+                errors.append((line, f'Username "{username}" already exists.'))
+            elif username in seen:
+                errors.append((line, f'Username "{username}" appears more than once.'))
+            seen.add(username)
+        if row['email']:
+            try:
+                validate_email(row['email'])
+            except ValidationError:
+                errors.append((line, f'"{row["email"]}" is not a valid email address.'))
+        row['department'] = companies.get(row['company'].lower())
+        if row['company'] and row['department'] is None:
+            errors.append((line, f'Unknown company "{row["company"]}".'))
+
+        flag = row['is_manager'].lower()
+        if flag not in TRUE_VALUES | FALSE_VALUES:
+            errors.append((line, f'is_manager must be yes or no, not "{row["is_manager"]}".'))
+        row['is_manager'] = flag in TRUE_VALUES
+        if row['is_manager'] and not row['password']:
+            errors.append((line, 'Password is required for managers.'))
+
+    by_username = {row['username']: row for row in rows}
+    for row in rows:
+        manager = row['reports_to']
+        if not manager or not row['department']:
+            continue
+        if manager == row['username']:
+            errors.append((row['line'], 'Someone cannot report to themselves.'))
+        elif manager in by_username:
+            if by_username[manager]['department'] != row['department']:
+                errors.append((row['line'], f'"{manager}" is in a different company.'))
+        elif manager not in existing_managers:
+            errors.append((row['line'], f'Unknown reports_to user "{manager}".'))
+        elif existing_managers[manager] != row['department'].pk:
+            errors.append((row['line'], f'"{manager}" is in a different company.'))
+    errors.extend(_cycle_errors(rows, by_username))
+
+    errors.sort()
+    return rows, errors
+
+
+def _cycle_errors(rows, by_username):
+    errors = []
+    for row in rows:
+        chain_seen = {row['username']}
+        manager = row['reports_to']
+        while manager in by_username:
+            if manager in chain_seen:
+                errors.append((row['line'], 'Reporting lines form a loop.'))
+                break
+            chain_seen.add(manager)
+            manager = by_username[manager]['reports_to']
+    return errors
+
+
+# Hashing threads run in parallel, as hashlib releases the GIL. The pool is
+# made on first use, so each server process gets its own after forking.
+_hash_pool = None
+_hash_pool_lock = threading.Lock()
+
+
+def _pool():
+    global _hash_pool
+    with _hash_pool_lock:
+        if _hash_pool is None:
+            _hash_pool = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix='password-hash')
+    return _hash_pool
+
+
+def hash_passwords(passwords):
+    """Hash passwords with the configured hasher on a shared thread pool."""
+    if len(passwords) < 2:
+        return [make_password(password) for password in passwords]
+    return list(_pool().map(make_password, passwords))
+
+
+def import_users(rows):
+    """Create the validated ``rows`` with profiles and reporting lines in
+    batched inserts. Returns the new users."""
+    manager_rows = [row for row in rows if row['is_manager']]
+    hashes = dict(zip(
+        (row['username'] for row in manager_rows),
+        hash_passwords([row['password'] for row in manager_rows]),
+    ))
+
+    with transaction.atomic():
+        User.objects.bulk_create([User(
+            username=row['username'],
+            email=row['email'],
+            first_name=row['first_name'],
+            last_name=row['last_name'],
+            is_staff=row['is_manager'],
+            password=hashes.get(row['username']) or make_password(None),
+        ) for row in rows], batch_size=INSERT_BATCH_SIZE)
+        # MySQL doesn't return ids from bulk inserts, so read them back
+        users = {u.username: u for u in User.objects.filter(username__in=[row['username'] for row in rows])}
+
+        UserProfile.objects.bulk_create([UserProfile(
+            user=users[row['username']],
+            department=row['department'],
+            job_title=row['job_title'],
+        ) for row in rows], batch_size=INSERT_BATCH_SIZE)
+        managers = {row['reports_to'] for row in rows if row['reports_to']}
+        profiles = {p.user.username: p for p in UserProfile.objects.select_related('user').filter(
+            user__username__in=list(users) + list(managers),
+        )}
+        reporting = []
+        for row in rows:
+            if row['reports_to']:
+                profile = profiles[row['username']]
+                profile.reports_to = profiles[row['reports_to']]
+                reporting.append(profile)
+        UserProfile.objects.bulk_update(reporting, ['reports_to'], batch_size=INSERT_BATCH_SIZE)
+
+        # Bulk statements send no signals, so log and invalidate here
+        departments = {users[row['username']].pk: row['department'].pk for row in rows}
+        new_profiles = [profiles[username] for username in users]
+        with batched_changes(departments):
+            for obj in chain(users.values(), new_profiles):
+                record_change(obj, 'create')
+        bump_data_version(*departments.values())
+        bump_people_version()
+    return list(users.values())
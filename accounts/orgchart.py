@@ -0,0 +1,169 @@
+from io import BytesIO
+from xml.sax.saxutils import escape
+
+from django.core.cache import cache
+from PIL import Image, ImageDraw, ImageFont
+
+from .caching import data_version
+
+NODE_WIDTH = 180
+NODE_HEIGHT = 52
+H_GAP = 16
+V_GAP = 40
+MARGIN = 24
+MANAGER_COLOUR = '#054B70'
+EMPLOYEE_COLOUR = '#8CB7C4'
+# Bigger charts are only offered as SVG; a PNG that size is mostly empty pixels
+PNG_MAX_PIXELS = 40_000_000
+
+
+def _pack(children):
+    """Place sibling subtrees left to right as close as their contours allow.
+
+    Returns each child's x offset and the combined left and right contours
+    (the outermost x at every depth below the siblings' row).
+    """
+    offsets = []
+    left = right = None
+    for child in children:
+        child_left, child_right = _place(child)
+        if left is None:
+            offsets.append(0)
+            left, right = list(child_left), list(child_right)
+            continue
+        shift = max(r - l for r, l in zip(right, child_left)) + NODE_WIDTH + H_GAP
+        offsets.append(shift)
+        right = [x + shift for x in child_right] + right[len(child_right):]
+        left = left + [x + shift for x in child_left[len(left):]]
+    return offsets, left, right
+
+
+def _place(node):
+    """Tidy-tree layout of ``node``'s subtree, centred on the node.
+
+    Stores each child's offset from its parent in ``node['_dx']`` and
+    returns the subtree's left and right contours, one entry per depth.
+    """
+    if not node['children']:
+        return [0], [0]
+    offsets, left, right = _pack(node['children'])
+    middle = (offsets[0] + offsets[-1]) / 2
+    node['_dx'] = [offset - middle for offset in offsets]
+    return [0] + [x - middle for x in left], [0] + [x - middle for x in right]
+
+
+def layout(tree):
+    """Coordinates for every node of an org tree (the nested dicts built for
+    the org chart page), as ``({id: (x, y)}, width, height)``.
+
+    Subtrees are packed against each other's contours and parents centred
+    over their children, so the chart is as narrow as the hierarchy allows.
+    """
+    if not tree:
+        return {}, 2 * MARGIN, 2 * MARGIN
+    offsets, _, _ = _pack(tree)
+    positions = {}
+    stack = [(node, x, 0) for node, x in zip(tree, offsets)]
+    while stack:
+        node, x, depth = stack.pop()
+        positions[node['id']] = (x, depth * (NODE_HEIGHT + V_GAP))
+        for child, dx in zip(node['children'], node.pop('_dx', [])):
+            stack.append((child, x + dx, depth + 1))
+    min_x = min(x for x, _ in positions.values())
+    positions = {pk: (x - min_x + MARGIN, y + MARGIN) for pk, (x, y) in positions.items()}
+    width = max(x for x, _ in positions.values()) + NODE_WIDTH + MARGIN
+    height = max(y for _, y in positions.values()) + NODE_HEIGHT + MARGIN
+    return positions, round(width), round(height)
+
+
+def _walk(tree):
+    stack = list(tree)
+    while stack:
+        node = stack.pop()
+        yield node
+        stack.extend(node['children'])
+
+
+def _edges(tree, positions):
+    """Elbow connectors from each parent's bottom edge to its children."""
+    for node in _walk(tree):
+        px, py = positions[node['id']]
+        for child in node['children']:
+            cx, cy = positions[child['id']]
+            mid = py + NODE_HEIGHT + V_GAP / 2
+            yield (px + NODE_WIDTH / 2, py + NODE_HEIGHT), (px + NODE_WIDTH / 2, mid), \
+                (cx + NODE_WIDTH / 2, mid), (cx + NODE_WIDTH / 2, cy)
+
+
+def _clip(text, limit):
+    return text if len(text) <= limit else text[:limit - 1] + '…'
+
+
+def render_svg(department, tree, positions, width, height):
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'viewBox="0 0 {width} {height}" font-family="Segoe UI, sans-serif">',
+        f'<title>{escape(department.name)} org chart</title>',
+        '<g fill="none" stroke="#c8c6c4" stroke-width="1.5">',
+    ]
+    for points in _edges(tree, positions):
+        parts.append(f'<polyline points="{" ".join(f"{x:g},{y:g}" for x, y in points)}"/>')
+    parts.append('</g>')
+    for node in _walk(tree):
+        x, y = positions[node['id']]
+        colour = MANAGER_COLOUR if node['is_staff'] else EMPLOYEE_COLOUR
+        name = escape(_clip(f"{node['first_name']} {node['last_name']}", 24))
+        title = escape(_clip(node['job_title'], 28))
+        parts.append(
+            f'<g transform="translate({x:g},{y:g})">'
+            f'<rect width="{NODE_WIDTH}" height="{NODE_HEIGHT}" rx="4" fill="#fff" stroke="#edebe9"/>'
+            f'<rect width="4" height="{NODE_HEIGHT}" fill="{colour}"/>'
+            f'<text x="14" y="22" font-size="13" font-weight="600" fill="#323130">{name}</text>'
+            f'<text x="14" y="40" font-size="11" fill="#605e5c">{title}</text></g>'
+        )
+    parts.append('</svg>')
+    return ''.join(parts)
+
+
+def render_png(tree, positions, width, height):
+    image = Image.new('RGB', (width, height), 'white')
+    draw = ImageDraw.Draw(image)
+    name_font = ImageFont.load_default(size=13)
+    title_font = ImageFont.load_default(size=11)
+    for points in _edges(tree, positions):
+        draw.line(points, fill='#c8c6c4', width=2)
+    for node in _walk(tree):
+        x, y = positions[node['id']]
+        draw.rounded_rectangle((x, y, x + NODE_WIDTH, y + NODE_HEIGHT), radius=4, fill='white', outline='#edebe9')
+        draw.rectangle((x, y, x + 3, y + NODE_HEIGHT), fill=MANAGER_COLOUR if node['is_staff'] else EMPLOYEE_COLOUR)
+        draw.text((x + 14, y + 10), _clip(f"{node['first_name']} {node['last_name']}", 24), fill='#323130', font=name_font)
+        draw.text((x + 14, y + 30), _clip(node['job_title'], 28), fill='#605e5c', font=title_font)
+    out = BytesIO()
+    image.save(out, format='PNG', optimize=True)
+    return out.getvalue()
+
+
+def chart_cache_key(department_id, fmt):
+    """Changes whenever anyone in the company moves, joins, leaves or is renamed."""
+    return f"org-chart-image:{department_id}:{fmt}:{data_version(department_id)}"
+
+
+def chart_image(department, build_tree, fmt='svg'):
+    """The department's org chart as SVG text or PNG bytes, cached until its
+    hierarchy changes. ``build_tree()`` is only called on a cache miss.
+
+    Returns None for a PNG too large to draw.
+    """
+    key = chart_cache_key(department.pk, fmt)
+    image = cache.get(key)
+    if image is None:
+        tree = build_tree()
+        positions, width, height = layout(tree)
+        if fmt == 'png':
+            if width * height > PNG_MAX_PIXELS:
+                return None
+            image = render_png(tree, positions, width, height)
+        else:
+            image = render_svg(department, tree, positions, width, height)
+        cache.set(key, image)
+    return image
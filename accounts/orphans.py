@@ -0,0 +1,131 @@
+import heapq
+import os
+import posixpath
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.files.storage import default_storage
+from django.db import connection
+from django.db.models.functions import Collate
+
+from .models import ArchivedKPI, Department, KPIFile, KPIUpload, UserProfile
+
+# Media directories PulseBoard writes to; anything else under MEDIA_ROOT is left alone
+MEDIA_DIRS = ('kpi_files', 'profile_pics', 'dept_logos', 'themes', 'kpi_archive')
+# Every column holding a media file name
+REFERENCES = [
+    (KPIFile, 'file'),
+    (KPIUpload, 'file'),
+    (UserProfile, 'profile_picture'),
+    (Department, 'logo'),
+    (Department, 'theme_css'),
+    (ArchivedKPI, 'archive'),
+]
+# Files younger than this may belong to a save whose row hasn't committed yet
+GRACE_SECONDS = 3600
+# Code-point ordering, the same order Python sorts strings in
+BINARY_COLLATIONS = {'mysql': 'utf8mb4_bin', 'sqlite': 'BINARY', 'postgresql': 'C'}
+
+
+def _referenced(model, field, batch_size):
+    """Names in one column, sorted, fetched in keyset-paginated batches."""
+    collation = BINARY_COLLATIONS[connection.vendor]
+    names = model.objects.exclude(**{field: ''}).annotate(_name=Collate(field, collation))
+    last = None
+    while True:
+        page = names if last is None else names.filter(_name__gt=last)
+        batch = list(page.order_by('_name').values_list('_name', flat=True).distinct()[:batch_size])
+        if not batch:
+            return
+        yield from batch
+        last = batch[-1]
+
+
+def referenced_names(batch_size=5000):
+    """Every referenced media name in sorted order (with repeats), merged
+    from all the columns in REFERENCES."""
+    return heapq.merge(*(_referenced(model, field, batch_size) for model, field in REFERENCES))
+
+
+def _walk(root, relative):
+    # Sorting directories by "name/" makes the yielded paths come out in
+    # plain string order: "a.txt" < "a/b" because "." sorts before "/"
+    with os.scandir(os.path.join(root, relative)) as it:
+        entries = sorted(it, key=lambda e: e.name + '/' if e.is_dir(follow_symlinks=False) else e.name)
+    for entry in entries:
+        name = posixpath.join(relative, entry.name)
+        if entry.is_dir(follow_symlinks=False):
+            yield from _walk(root, name)
+        elif entry.is_file(follow_symlinks=False):
+            yield name, entry.stat(follow_symlinks=False)
+
+
+def stored_files():
+    """``(name, stat)`` for every file in MEDIA_DIRS, in sorted name order,
+    reading one directory at a time."""
+    root = default_storage.location
+    for directory in sorted(MEDIA_DIRS):
+        if os.path.isdir(os.path.join(root, directory)):
+            yield from _walk(root, directory)
+
+
+def find_orphans(batch_size=5000, grace=GRACE_SECONDS):
+    """Yield ``(name, size)`` for stored files no row references, by walking
+    both sorted streams side by side, so memory stays flat however many
+    files there are."""
+    cutoff = time.time() - grace
+    references = referenced_names(batch_size)
+    reference = next(references, None)
+    for name, stat in stored_files():
+        while reference is not None and reference < name:
+            reference = next(references, None)
+        if reference == name or stat.st_mtime > cutoff:
+            continue
+        yield name, stat.st_size
+
+
+def _still_orphaned(names):
+    """Drop names a row started referencing since the streams were read."""
+    names = set(names)
+    for model, field in REFERENCES:
+        names -= set(model.objects.filter(**{f'{field}__in': names}).values_list(field, flat=True))
+    return names
+
+
+def _delete(names):
+    for name in names:
+        default_storage.delete(name)
+    return len(names)
+
+
+def _batches(orphans, batch_size):
+    batch = {}
+    for name, size in orphans:
+        batch[name] = size
+        if len(batch) == batch_size:
+            yield batch
+            batch = {}
+    if batch:
+        yield batch
+
+
+def delete_orphans(orphans, workers=8, batch_size=1000):
+    """Delete ``(name, size)`` pairs from :func:`find_orphans` on a thread
+    pool, re-checking each batch against the database first.
+
+    Returns ``(files, bytes)`` deleted.
+    """
+    deleted = freed = 0
+    running = deque()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for batch in _batches(orphans, batch_size):
+            names = _still_orphaned(batch)
+            freed += sum(batch[name] for name in names)
+            running.append(pool.submit(_delete, list(names)))
+            # Keep the scan only a little ahead of the deletes
+            if len(running) > 2 * workers:
+                deleted += running.popleft().result()
+        while running:
+            deleted += running.popleft().result()
+    return deleted, freed
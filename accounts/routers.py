@@ -0,0 +1,42 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+REPLICA = 'replica'
+# Set on the response to any write; while present the browser reads from the
+# primary so it sees its own changes before the replica catches up
+PIN_COOKIE = 'pb_primary'
+
+_use_replica = ContextVar('use_replica', default=False)
+
+
+def replica_configured():
+    return REPLICA in settings.DATABASES
+
+
+@contextmanager
+def replica_reads():
+    """Route reads inside the block to the replica, when one is configured."""
+    token = _use_replica.set(replica_configured())
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+class ReplicaRouter:
+    """Reads go to the replica inside :func:`replica_reads`; everything else,
+    and every write, goes to the primary."""
+
+    def db_for_read(self, model, **hints):
+        return REPLICA if _use_replica.get() else None
+
+    def db_for_write(self, model, **hints):
+        # Rows read from the replica must still be saved to the primary
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the primary's rows, so the two mix freely
+        return True
@@ -0,0 +1,105 @@
+import re
+import threading
+from bisect import bisect_left
+
+from .caching import people_version
+from .models import UserProfile
+
+TOKEN_RE = re.compile(r'\w+')
+MAX_RESULTS = 10
+
+_lock = threading.Lock()
+_index = None
+
+
+def _tokens(*values):
+    return {t for value in values if value for t in TOKEN_RE.findall(value.lower())}
+
+
+class PeopleIndex:
+    """In-memory prefix index over username, names, job title and company.
+
+    Every word of every searchable field is kept in one sorted list, so a
+    prefix lookup is a binary search plus a short scan. A query matches a
+    person when each of its words prefixes one of that person's words.
+    """
+
+    def __init__(self, rows, version):
+        self.version = version
+        self.people = {}
+        self._person_tokens = {}
+        entries = []
+        for (profile_id, user_id, username, first_name, last_name, is_staff,
+             job_title, dept_id, dept_name) in rows:
+            self.people[profile_id] = {
+                'user_id': user_id,
+                'username': username,
+                'name': f"{first_name} {last_name}".strip() or username,
+                'job_title': job_title,
+                'company': dept_name or '',
+                'department_id': dept_id,
+                'is_staff': is_staff,
+            }
+            tokens = _tokens(username, first_name, last_name, job_title, dept_name)
+            self._person_tokens[profile_id] = tokens
+            entries.extend((token, profile_id) for token in tokens)
+        entries.sort()
+        self._keys = [token for token, _ in entries]
+        self._ids = [profile_id for _, profile_id in entries]
+
+    @classmethod
+    def build(cls, version):
+        rows = UserProfile.objects.values_list(
+            'id', 'user_id', 'user__username', 'user__first_name', 'user__last_name', 'user__is_staff',
+            'job_title', 'department_id', 'department__name',
+        )
+        return cls(rows, version)
+
+    def _prefix_ids(self, prefix):
+        ids = set()
+        i = bisect_left(self._keys, prefix)
+        while i < len(self._keys) and self._keys[i].startswith(prefix):
+            ids.add(self._ids[i])
+            i += 1
+        return ids
+
+    def search(self, query, department_ids=None, limit=MAX_RESULTS):
+        """People matching every word of ``query``.
+
+        ``department_ids`` limits results to those companies; ``None`` means
+        no restriction (unassigned people included).
+        """
+        words = sorted(_tokens(query), key=len, reverse=True)
+        if not words:
+            return []
+        # The longest word is the most selective; check the rest per candidate
+        matches = self._prefix_ids(words[0])
+        for word in words[1:]:
+            matches = {pid for pid in matches if any(t.startswith(word) for t in self._person_tokens[pid])}
+        people = [self.people[pid] for pid in matches]
+        if department_ids is not None:
+            people = [p for p in people if p['department_id'] in department_ids]
+        first = TOKEN_RE.findall(query.lower())[0]
+        people.sort(key=lambda p: (not p['name'].lower().startswith(first), p['name'].lower()))
+        return people[:limit]
+
+
+def get_index():
+    """The current index, rebuilt when any person or company has changed.
+
+    The version lives in the shared cache, so every worker notices a change
+    made in another one on its next search.
+    """
+    global _index
+    version = people_version()
+    index = _index
+    if index is None or index.version != version:
+        with _lock:
+            if _index is None or _index.version != version:
+                _index = PeopleIndex.build(version)
+            index = _index
+    return index
+
+
+def search_people(query, department_ids=None, limit=MAX_RESULTS):
+    return get_index().search(query, department_ids, limit)
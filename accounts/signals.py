@@ -1,8 +1,14 @@
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_init, post_save, pre_delete
 from django.dispatch import receiver
 
-from .models import UserProfile
+from .caching import (
+    bump_company_list_version, bump_data_version, bump_kpi_version, bump_people_version, forget_principals,
+)
+from .changefeed import FEED_MODELS, record_change
+from .metrics import count_queries
+from .models import Department, KPIFile, UserProfile
 
 
 @receiver(post_save, sender=User)
@@ -11,3 +17,99 @@ def create_or_update_user_profile(sender, instance, created, **kwargs):
         UserProfile.objects.create(user=instance)
     else:
         UserProfile.objects.get_or_create(user=instance)
+
+
+# ─── Fragment cache and search index invalidation ───────────
+
+@receiver(post_init, sender=UserProfile)
+def remember_profile_department(sender, instance, **kwargs):
+    instance._loaded_department_id = instance.department_id
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def bump_profile_department_version(sender, instance, **kwargs):
+    bump_data_version(instance.department_id, instance._loaded_department_id)
+    bump_people_version()
+    instance._loaded_department_id = instance.department_id
+
+
+def _is_login_only(update_fields):
+    return update_fields is not None and set(update_fields) <= {'last_login'}
+
+
+@receiver(post_save, sender=User)
+def bump_user_department_version(sender, instance, update_fields=None, **kwargs):
+    if _is_login_only(update_fields):
+        return
+    dept_ids = UserProfile.objects.filter(user_id=instance.pk).values_list('department_id', flat=True)
+    bump_data_version(*dept_ids)
+    bump_people_version()
+
+
+@receiver(post_delete, sender=User)
+def bump_deleted_user_version(sender, instance, **kwargs):
+    # The profile was deleted first and has already bumped its company
+    bump_people_version()
+
+
+@receiver(post_save, sender=Department)
+@receiver(post_delete, sender=Department)
+def bump_department_version(sender, instance, **kwargs):
+    bump_data_version(instance.pk)
+    bump_company_list_version()
+    bump_people_version()
+
+
+@receiver(post_save, sender=KPIFile)
+@receiver(post_delete, sender=KPIFile)
+def bump_kpi_department_version(sender, instance, **kwargs):
+    dept_ids = UserProfile.objects.filter(user_id=instance.employee_id).values_list('department_id', flat=True)
+    bump_kpi_version(*dept_ids)
+
+
+# ─── Cached logged-in users ─────────────────────────────────
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_cached_user(sender, instance, **kwargs):
+    forget_principals(instance.pk)
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def forget_cached_profile_owner(sender, instance, **kwargs):
+    forget_principals(instance.user_id)
+
+
+@receiver(post_save, sender=Department)
+@receiver(pre_delete, sender=Department)
+def forget_cached_members(sender, instance, **kwargs):
+    forget_principals(*instance.members.values_list('user_id', flat=True))
+
+
+# ─── Change feed ────────────────────────────────────────────
+# Requests run under ATOMIC_REQUESTS and deletes run inside the collector's
+# transaction, so each entry commits or rolls back with the change it logs.
+
+def log_save(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if raw or _is_login_only(update_fields):
+        return
+    record_change(instance, 'create' if created else 'update')
+
+
+def log_delete(sender, instance, **kwargs):
+    # pre_delete, while the user's profile still exists to scope the entry
+    record_change(instance, 'delete')
+
+
+for model in FEED_MODELS.values():
+    post_save.connect(log_save, sender=model, dispatch_uid=f'changefeed_save_{model._meta.label}')
+    pre_delete.connect(log_delete, sender=model, dispatch_uid=f'changefeed_delete_{model._meta.label}')
+
+
+# ─── Metrics ────────────────────────────────────────────────
+
+@receiver(connection_created)
+def count_connection_queries(sender, connection, **kwargs):
+    connection.execute_wrappers.append(count_queries)
@@ -0,0 +1,299 @@
+import hashlib
+from collections import defaultdict
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Count, IntegerField, Max, Q, Sum, Value
+from django.utils import timezone
+
+from .models import ArchivedKPI, CompanyKPIStanding, KPIFile, KPIQuarterSnapshot, KPIStanding
+
+QUARTERS = [code for code, _ in KPIFile.QUARTER_CHOICES]
+# Trend slopes are fitted over an employee's scores from the last four quarters
+TREND_QUARTERS = 4
+# Scores are whole numbers 0-100, so (group, score) packs into one sortable key
+SCORE_SPAN = 101
+
+
+def _period(year, quarter):
+    return year * 4 + QUARTERS.index(quarter)
+
+
+def _year_quarter(period):
+    return int(period) // 4, QUARTERS[int(period) % 4]
+
+
+def load_scores():
+    """Every scored KPI, live and archived, as an ``(n, 4)`` int array of
+    employee id, company id, period (``year * 4 + quarter``) and score.
+
+    One UNION query; people without a company are left out. Where an archived
+    quarter was re-uploaded the live score wins.
+    """
+    fields = ('employee_id', 'employee__profile__department_id', 'year', 'quarter', 'kpi_score')
+    live = KPIFile.objects.filter(kpi_score__isnull=False, employee__profile__department__isnull=False)
+    archived = ArchivedKPI.objects.filter(kpi_score__isnull=False, employee__profile__department__isnull=False)
+    rows = live.annotate(live=Value(1, IntegerField())).values_list(*fields, 'live').order_by().union(
+        archived.annotate(live=Value(0, IntegerField())).values_list(*fields, 'live').order_by(), all=True,
+    )
+    data = np.array([
+        (employee_id, dept_id, _period(year, quarter), score, is_live)
+        for employee_id, dept_id, year, quarter, score, is_live in rows
+    ], dtype=np.int64).reshape(-1, 5)
+    # Live rows sort first within each (employee, period), so unique() keeps them
+    order = np.lexsort((-data[:, 4], data[:, 2], data[:, 0]))
+    data = data[order]
+    _, first = np.unique(data[:, [0, 2]], axis=0, return_index=True)
+    return data[first, :4]
+
+
+def _group_starts(keys, n_groups):
+    return np.searchsorted(keys, np.arange(n_groups) * SCORE_SPAN)
+
+
+def _quantile(sorted_scores, starts, counts, q):
+    """Linear-interpolated quantile of each group in ``sorted_scores``."""
+    pos = starts + (counts - 1) * q
+    lo = np.floor(pos).astype(np.int64)
+    hi = np.ceil(pos).astype(np.int64)
+    return sorted_scores[lo] + (sorted_scores[hi] - sorted_scores[lo]) * (pos - lo)
+
+
+def _trend(employees, periods, scores):
+    """Least-squares slope of each employee's scores over the
+    ``TREND_QUARTERS`` quarters ending at each row; NaN with fewer than two.
+
+    Rows must be sorted by employee then period. Window sums come from
+    cumulative sums, so every row is fitted at once.
+    """
+    if not len(periods):
+        return np.empty(0)
+    x = (periods - periods.min()).astype(np.float64)
+    y = scores.astype(np.float64)
+    keys = employees * (x.max() + TREND_QUARTERS) + x
+    start = np.searchsorted(keys, keys - (TREND_QUARTERS - 1), side='left')
+    end = np.arange(1, len(keys) + 1)
+
+    def window(values):
+        total = np.concatenate(([0.0], np.cumsum(values)))
+        return total[end] - total[start]
+
+    n = (end - start).astype(np.float64)
+    sx, sy, sxx, sxy = window(x), window(y), window(x * x), window(x * y)
+    denom = n * sxx - sx * sx
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(denom > 0, (n * sxy - sx * sy) / denom, np.nan)
+
+
+def compute_standings(data):
+    """Employee and company standings per quarter from :func:`load_scores`.
+
+    Returns ``(employees, companies)``: dicts of equal-length arrays, one
+    entry per employee-quarter and per company-quarter.
+    """
+    employee, dept, period, score = data.T
+    order = np.lexsort((period, employee))
+    employee, dept, period, score = employee[order], dept[order], period[order], score[order]
+    trend = _trend(employee, period, score)
+
+    groups, group_of = np.unique(np.stack([dept, period], axis=1), axis=0, return_inverse=True)
+    group_of = group_of.ravel()
+    n_groups = len(groups)
+    counts = np.bincount(group_of, minlength=n_groups)
+    mean = np.bincount(group_of, weights=score, minlength=n_groups) / np.maximum(counts, 1)
+    sq_mean = np.bincount(group_of, weights=score.astype(np.float64) ** 2, minlength=n_groups) / np.maximum(counts, 1)
+    std = np.sqrt(np.maximum(sq_mean - mean ** 2, 0))
+
+    keys = group_of * SCORE_SPAN + score
+    sorted_keys = np.sort(keys)
+    starts = _group_starts(sorted_keys, n_groups)
+    below = np.searchsorted(sorted_keys, keys, side='left') - starts[group_of]
+    at_or_below = np.searchsorted(sorted_keys, keys, side='right') - starts[group_of]
+    n = counts[group_of]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        z = np.where(std[group_of] > 0, (score - mean[group_of]) / std[group_of], 0.0)
+
+    sorted_scores = (sorted_keys - np.repeat(np.arange(n_groups), counts) * SCORE_SPAN).astype(np.float64)
+
+    # Companies ranked by mean within each quarter; ties share the better rank
+    g_period = groups[:, 1]
+    by_mean = np.lexsort((-mean, g_period))
+    p, m = g_period[by_mean], mean[by_mean]
+    new_value = np.concatenate(([True], (p[1:] != p[:-1]) | (m[1:] != m[:-1])))
+    first_of_value = np.maximum.accumulate(np.where(new_value, np.arange(len(p)), 0))
+    period_start = np.searchsorted(p, p, side='left')
+    company_rank = np.empty(n_groups, dtype=np.int64)
+    company_rank[by_mean] = first_of_value - period_start + 1
+
+    employees = {
+        'employee_id': employee,
+        'department_id': dept,
+        'period': period,
+        'score': score,
+        'percentile': 100.0 * (below + 0.5 * (at_or_below - below)) / n,
+        'z_score': z,
+        'rank': n - at_or_below + 1,
+        'trend': trend,
+    }
+    companies = {
+        'department_id': groups[:, 0],
+        'period': g_period,
+        'headcount': counts,
+        'mean': mean,
+        'median': _quantile(sorted_scores, starts, counts, 0.5),
+        'p25': _quantile(sorted_scores, starts, counts, 0.25),
+        'p75': _quantile(sorted_scores, starts, counts, 0.75),
+        'std': std,
+        'rank': company_rank,
+    }
+    return employees, companies
+
+
+def _period_filter(periods):
+    condition = Q()
+    for year, quarter in periods:
+        condition |= Q(year=year, quarter=quarter)
+    return condition
+
+
+def write_standings(employees, companies, periods=None):
+    """Replace the snapshot rows for ``periods`` ((year, quarter) pairs, or
+    every quarter when None) with the computed standings.
+
+    Returns ``(employee_rows, company_rows)`` written.
+    """
+    wanted = None if periods is None else {_period(year, quarter) for year, quarter in periods}
+
+    def keep(table):
+        if wanted is None:
+            return np.arange(len(table['period']))
+        return np.flatnonzero(np.isin(table['period'], list(wanted)))
+
+    people = [KPIStanding(
+        employee_id=int(employees['employee_id'][i]),
+        department_id=int(employees['department_id'][i]),
+        year=_year_quarter(employees['period'][i])[0],
+        quarter=_year_quarter(employees['period'][i])[1],
+        score=int(employees['score'][i]),
+        percentile=round(float(employees['percentile'][i]), 2),
+        z_score=round(float(employees['z_score'][i]), 3),
+        rank=int(employees['rank'][i]),
+        trend=None if np.isnan(employees['trend'][i]) else round(float(employees['trend'][i]), 2),
+    ) for i in keep(employees)]
+    firms = [CompanyKPIStanding(
+        department_id=int(companies['department_id'][i]),
+        year=_year_quarter(companies['period'][i])[0],
+        quarter=_year_quarter(companies['period'][i])[1],
+        **{field: round(float(companies[field][i]), 2) for field in ('mean', 'median', 'p25', 'p75', 'std')},
+        headcount=int(companies['headcount'][i]),
+        rank=int(companies['rank'][i]),
+    ) for i in keep(companies)]
+
+    with transaction.atomic():
+        if periods is None:
+            KPIStanding.objects.all().delete()
+            CompanyKPIStanding.objects.all().delete()
+        elif periods:
+            KPIStanding.objects.filter(_period_filter(periods)).delete()
+            CompanyKPIStanding.objects.filter(_period_filter(periods)).delete()
+        KPIStanding.objects.bulk_create(people, batch_size=1000)
+        CompanyKPIStanding.objects.bulk_create(firms, batch_size=1000)
+    return len(people), len(firms)
+
+
+def refresh_standings(periods=None):
+    """Recompute standings from every score and store them. Trends look back
+    a year, so all scores are loaded even when only some quarters are written."""
+    return write_standings(*compute_standings(load_scores()), periods=periods)
+
+
+def current_quarter():
+    now = timezone.now()
+    return now.year, QUARTERS[(now.month - 1) // 3]
+
+
+def _company_digests():
+    """``{(year, quarter): digest}`` of which company each employee with KPI
+    rows in the quarter belongs to now. Standings group scores by the
+    current company, so moving someone changes every quarter they scored in.
+    """
+    digests = defaultdict(hashlib.sha1)
+    for model in (KPIFile, ArchivedKPI):
+        rows = model.objects.order_by('year', 'quarter', 'employee_id').values_list(
+            'year', 'quarter', 'employee_id', 'employee__profile__department_id')
+        for year, quarter, employee_id, dept_id in rows.iterator(chunk_size=5000):
+            digests[year, quarter].update(f'{employee_id}:{dept_id or 0},'.encode())
+    return {period: digest.hexdigest()[:16] for period, digest in digests.items()}
+
+
+def quarter_fingerprints():
+    """``{(year, quarter): fingerprint}`` for every quarter with KPI rows.
+
+    Row counts, score totals and the latest edit together change whenever
+    a row in the quarter is added, edited, deleted, archived or restored;
+    the company digest changes when one of its employees changes company.
+    """
+    live = KPIFile.objects.values('year', 'quarter').annotate(
+        count=Count('id'), total=Sum('kpi_score'), latest=Max('updated_at'),
+    ).order_by()
+    archived = ArchivedKPI.objects.values('year', 'quarter').annotate(
+        count=Count('id'), total=Sum('kpi_score'),
+    ).order_by()
+    parts = defaultdict(lambda: ['0:0:', '0:0', ''])
+    for row in live:
+        latest = row['latest'].isoformat() if row['latest'] else ''
+        parts[row['year'], row['quarter']][0] = f"{row['count']}:{row['total'] or 0}:{latest}"
+    for row in archived:
+        parts[row['year'], row['quarter']][1] = f"{row['count']}:{row['total'] or 0}"
+    for period, digest in _company_digests().items():
+        parts[period][2] = digest
+    return {period: '|'.join(values) for period, values in parts.items()}
+
+
+def snapshot_closed_quarters(full=False):
+    """Recompute standings for closed quarters whose KPI rows changed since
+    their last snapshot, or for every closed quarter when ``full``.
+
+    A changed quarter also refreshes the following quarters whose trend
+    window reaches back to it. Every score is loaded and computed in one
+    pass; only the stale quarters are written. Returns ``(quarters,
+    employee_rows, company_rows)``.
+    """
+    cutoff = _period(*current_quarter())
+    fingerprints = {key: value for key, value in quarter_fingerprints().items() if _period(*key) < cutoff}
+    stored = {(year, quarter): fingerprint for year, quarter, fingerprint
+              in KPIQuarterSnapshot.objects.values_list('year', 'quarter', 'fingerprint')}
+
+    changed = {key for key in fingerprints if full or stored.get(key) != fingerprints[key]}
+    changed |= set(stored) - set(fingerprints)
+    stale = set(changed)
+    for year, quarter in changed:
+        for ahead in range(1, TREND_QUARTERS):
+            key = _year_quarter(_period(year, quarter) + ahead)
+            if key in fingerprints:
+                stale.add(key)
+    if not stale:
+        return [], 0, 0
+
+    stale = sorted(stale, key=lambda key: _period(*key))
+    with transaction.atomic():
+        people, firms = write_standings(*compute_standings(load_scores()), periods=stale)
+        KPIQuarterSnapshot.objects.filter(_period_filter(stale)).delete()
+        KPIQuarterSnapshot.objects.bulk_create([
+            KPIQuarterSnapshot(year=year, quarter=quarter, fingerprint=fingerprints[year, quarter])
+            for year, quarter in stale if (year, quarter) in fingerprints
+        ])
+    return stale, people, firms
+
+
+def company_standing(department, user_ids=None):
+    """The company's latest snapshotted quarter and its members' standings in
+    it, as ``(company_standing or None, {user_id: standing})``. ``user_ids``
+    limits which members are loaded."""
+    company = CompanyKPIStanding.objects.filter(department=department).order_by('-year', '-quarter').first()
+    if company is None:
+        return None, {}
+    standings = KPIStanding.objects.filter(department=department, year=company.year, quarter=company.quarter)
+    if user_ids is not None:
+        standings = standings.filter(employee_id__in=user_ids)
+    return company, {s.employee_id: s for s in standings}
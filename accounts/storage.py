@@ -0,0 +1,116 @@
+import gzip
+import hashlib
+import os
+import posixpath
+from fnmatch import fnmatch
+from io import BytesIO
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from PIL import Image, UnidentifiedImageError
+
+try:
+    import brotli
+except ImportError:  # .br siblings are skipped when brotli isn't installed
+    brotli = None
+
+
+# Media directories whose files are spread over hash-prefixed subdirectories
+HASH_SHARDED_DIRS = ('profile_pics', 'dept_logos')
+RESPONSIVE_IMAGES = ('images/*-hero-banner.*', 'images/MOC-Backgrounds-*')
+RESPONSIVE_WIDTHS = (480, 960, 1440)
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.svg', '.json', '.txt', '.map')
+
+
+def variant_name(name, width):
+    """images/banner.jpg -> images/banner.960w.jpg"""
+    root, ext = os.path.splitext(name)
+    return f"{root}.{width}w{ext}"
+
+
+class PulseBoardStaticStorage(ManifestStaticFilesStorage):
+    """Hashed static files plus resized banner variants and .gz/.br siblings.
+
+    Everything is produced once by ``collectstatic`` and recorded in the
+    manifest, so templates resolve variants with a dictionary lookup.
+    """
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+
+        for name in paths:
+            if any(fnmatch(name, pattern) for pattern in RESPONSIVE_IMAGES):
+                for variant, hashed in self._save_variants(name):
+                    yield variant, hashed, True
+        self.save_manifest()
+
+        for hashed in self.hashed_files.values():
+            if hashed.endswith(COMPRESSIBLE_EXTENSIONS):
+                self._save_compressed(hashed)
+
+    def _save_variants(self, name):
+        try:
+            with self.open(name) as f:
+                image = Image.open(f)
+                image.load()
+        except (OSError, UnidentifiedImageError):
+            return
+        image_format = image.format
+        for width in RESPONSIVE_WIDTHS:
+            if width >= image.width:
+                continue
+            height = round(image.height * width / image.width)
+            buf = BytesIO()
+            image.resize((width, height), Image.LANCZOS).save(buf, format=image_format, optimize=True)
+            content = ContentFile(buf.getvalue())
+            variant = variant_name(name, width)
+            hashed = self.hashed_name(variant, content)
+            if self.exists(hashed):
+                self.delete(hashed)
+            self._save(hashed, content)
+            self.hashed_files[self.hash_key(self.clean_name(variant))] = hashed
+            yield variant, hashed
+
+    def _save_compressed(self, hashed):
+        with self.open(hashed) as f:
+            data = f.read()
+        siblings = [(f"{hashed}.gz", gzip.compress(data, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            siblings.append((f"{hashed}.br", brotli.compress(data)))
+        for path, compressed in siblings:
+            if len(compressed) >= len(data):
+                continue
+            if self.exists(path):
+                self.delete(path)
+            self._save(path, ContentFile(compressed))
+
+
+def hash_shard(name):
+    """profile_pics/me.jpg -> profile_pics/3a/7f/me.jpg, for files directly
+    inside a HASH_SHARDED_DIRS directory; other names are returned as is."""
+    directory, base = posixpath.split(name)
+    if directory not in HASH_SHARDED_DIRS:
+        return name
+    digest = hashlib.md5(base.encode(), usedforsecurity=False).hexdigest()
+    return posixpath.join(directory, digest[:2], digest[2:4], base)
+
+
+def kpi_file_path(instance, filename):
+    """kpi_files/<company id>/<year>/<quarter>/<file>, where the company is
+    the employee's at upload time ("none" when unassigned)."""
+    profile = getattr(instance.employee, 'profile', None)
+    company = profile.department_id if profile and profile.department_id else 'none'
+    return f"kpi_files/{company}/{instance.year}/{instance.quarter}/{filename}"
+
+
+class ShardedMediaStorage(FileSystemStorage):
+    """Media storage that keeps directories small: uploads into
+    HASH_SHARDED_DIRS get two levels of hash-prefix subdirectories. KPI
+    files are sharded by company, year and quarter through ``kpi_file_path``.
+    ``manage.py shard_media`` moves files saved before sharding."""
+
+    def generate_filename(self, filename):
+        return hash_shard(super().generate_filename(filename))
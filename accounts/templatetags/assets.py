@@ -0,0 +1,38 @@
+from django import template
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.templatetags.static import static
+
+from ..storage import RESPONSIVE_WIDTHS, variant_name
+
+register = template.Library()
+
+
+def _variants(path):
+    """(width, url) for each resized variant recorded in the static manifest."""
+    if settings.DEBUG:
+        # Variants only exist in STATIC_ROOT after collectstatic
+        return []
+    hashed_files = getattr(staticfiles_storage, 'hashed_files', {})
+    return [
+        (width, staticfiles_storage.url(variant_name(path, width)))
+        for width in RESPONSIVE_WIDTHS
+        if variant_name(path, width) in hashed_files
+    ]
+
+
+@register.simple_tag
+def static_variant(path, width):
+    """URL of the resized variant of ``path`` at ``width``, or of the original."""
+    for w, url in _variants(path):
+        if w == width:
+            return url
+    return static(path)
+
+
+@register.simple_tag
+def static_srcset(path, width):
+    """srcset listing every resized variant plus the original at ``width``."""
+    entries = [f"{url} {w}w" for w, url in _variants(path)]
+    entries.append(f"{static(path)} {width}w")
+    return ', '.join(entries)
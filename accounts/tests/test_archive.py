@@ -0,0 +1,105 @@
+import os
+from datetime import datetime, timezone
+
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase
+from django.urls import reverse
+
+from accounts import audit
+from accounts.archive import archive_year, kpi_averages, restore_year
+from accounts.models import ArchivedKPI, AuditEvent, Department, KPIFile, KPIYearSummary
+from accounts.tests.utils import TemporaryMediaMixin
+
+YEAR = 2020
+
+
+class ArchiveRoundTripTests(TemporaryMediaMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(name='Archive Co')
+        cls.manager = User.objects.create_user('manager', is_staff=True)
+        cls.employee = User.objects.create_user('employee', date_joined=datetime(YEAR, 1, 6, tzinfo=timezone.utc))
+        for user in (cls.manager, cls.employee):
+            user.profile.department = cls.department
+            user.profile.save()
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.manager)
+
+    def _kpi(self, quarter, score, content):
+        return KPIFile.objects.create(
+            employee=self.employee, uploaded_by=self.manager, title=f'{quarter} {YEAR}',
+            quarter=quarter, year=YEAR, kpi_score=score, file=ContentFile(content, name=f'{quarter}.pdf'),
+        )
+
+    def _archive(self):
+        names = [self._kpi('Q1', 70, b'first quarter').file.name, self._kpi('Q2', 90, b'second').file.name]
+        self.assertEqual(archive_year(YEAR), 2)
+        return names
+
+    def _browse(self, method='get', **data):
+        url = reverse('employee_kpi', args=[self.employee.pk]) + f'?year={YEAR}'
+        with self.captureOnCommitCallbacks(execute=True):
+            return getattr(self.client, method)(url, data)
+
+    def test_archive_moves_files_into_bundle(self):
+        for name in self._archive():
+            self.assertFalse(default_storage.exists(name))
+        self.assertFalse(KPIFile.objects.exists())
+        self.assertEqual(ArchivedKPI.objects.count(), 2)
+        # Averages still count the archived scores
+        self.assertEqual(kpi_averages(employee_id=self.employee.pk), {self.employee.pk: 80})
+
+    def test_browsing_the_year_restores_files_and_scores(self):
+        self._archive()
+        response = self._browse()
+        self.assertContains(response, 'Restored 2 archived KPI files')
+
+        restored = {kpi.quarter: kpi for kpi in KPIFile.objects.filter(employee=self.employee, year=YEAR)}
+        self.assertEqual({q: kpi.kpi_score for q, kpi in restored.items()}, {'Q1': 70, 'Q2': 90})
+        with restored['Q1'].file.open('rb') as f:
+            self.assertEqual(f.read(), b'first quarter')
+        self.assertFalse(ArchivedKPI.objects.exists())
+        self.assertFalse(KPIYearSummary.objects.exists())
+        self.assertEqual(kpi_averages(employee_id=self.employee.pk), {self.employee.pk: 80})
+
+        # A second visit finds nothing left to restore
+        self._browse()
+        self.assertEqual(KPIFile.objects.filter(employee=self.employee).count(), 2)
+
+    def test_posts_do_not_restore(self):
+        self._archive()
+        self._browse('post', action='save_score', quarter='Q1', year=YEAR, kpi_score='50')
+        self.assertFalse(KPIFile.objects.exists())
+        self.assertEqual(ArchivedKPI.objects.count(), 2)
+
+    def test_superseded_quarter_is_dropped_and_audited(self):
+        self._archive()
+        self._kpi('Q1', 40, b'newer upload')
+        response = self._browse()
+        self.assertContains(response, 'Dropped 1 archived KPI file')
+
+        scores = dict(KPIFile.objects.filter(employee=self.employee).values_list('quarter', 'kpi_score'))
+        self.assertEqual(scores, {'Q1': 40, 'Q2': 90})
+        audit.flush()
+        event = AuditEvent.objects.get(action='kpi_delete')
+        self.assertEqual(event.details['quarter'], 'Q1')
+        self.assertEqual(event.details['score'], 70)
+        self.assertTrue(event.details['superseded'])
+        self.assertTrue(event.details['member'])
+
+    def test_failed_restore_removes_written_files(self):
+        self._archive()
+        # Q1 restores first, then Q2's bundle member is missing
+        ArchivedKPI.objects.filter(quarter='Q2').update(member='missing.pdf')
+        with self.assertRaises(KeyError):
+            restore_year(self.employee, YEAR)
+
+        self.assertFalse(KPIFile.objects.exists())
+        self.assertEqual(ArchivedKPI.objects.count(), 2)
+        written = [os.path.join(root, f) for root, _, files in os.walk(default_storage.location)
+                   for f in files if not root.endswith('kpi_archive')]
+        self.assertEqual(written, [])
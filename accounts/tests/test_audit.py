@@ -0,0 +1,52 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.test import TestCase, override_settings
+
+from accounts import audit
+from accounts.models import AuditEvent
+
+
+class AuditBufferTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user('mgr', is_staff=True)
+
+    def setUp(self):
+        # The buffer is per process; start each test with it empty
+        audit.flush()
+        AuditEvent.objects.all().delete()
+
+    def _record(self, **details):
+        audit.record(self.manager, 'reorder', None, None, **details)
+
+    def test_rolled_back_changes_are_not_logged(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    self._record(order=[1])
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(audit.pending(), 0)
+        self.assertEqual(audit.flush(), 0)
+        self.assertFalse(AuditEvent.objects.exists())
+
+    def test_committed_changes_wait_in_buffer_until_flushed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self._record(order=[1])
+            self._record(order=[2])
+        self.assertEqual(audit.pending(), 2)
+        self.assertFalse(AuditEvent.objects.exists())
+
+        self.assertEqual(audit.flush(), 2)
+        self.assertEqual(audit.pending(), 0)
+        event = AuditEvent.objects.order_by('id').first()
+        self.assertEqual((event.actor_id, event.action, event.details), (self.manager.pk, 'reorder', {'order': [1]}))
+
+    @override_settings(AUDIT_BUFFER_SIZE=3)
+    def test_full_buffer_is_written_without_waiting(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            for i in range(3):
+                self._record(order=[i])
+        self.assertEqual(audit.pending(), 0)
+        self.assertEqual(AuditEvent.objects.count(), 3)
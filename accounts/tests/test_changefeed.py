@@ -0,0 +1,120 @@
+from asgiref.sync import iscoroutinefunction
+from django.contrib.auth.models import User
+from django.test import Client, TestCase, override_settings
+from django.urls import URLPattern, path, reverse
+
+from accounts import urls as accounts_urls
+from accounts.changefeed import sequence_changes
+from accounts.models import ChangeLogEntry, Department
+from accounts.tests.utils import TemporaryMediaMixin
+
+
+def _half_done(request):
+    Department.objects.create(name='Half Done')
+    raise RuntimeError('failed after the write')
+
+
+urlpatterns = [path('half-done/', _half_done)]
+
+
+class ChangeFeedTests(TemporaryMediaMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user('feed_admin', is_staff=True)
+        cls.admin.profile.department = Department.objects.get(name='Magnum Opus')
+        cls.admin.profile.save()
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.admin)
+        self.start = self._feed()['next_cursor']
+
+    def _feed(self, since=0, **params):
+        response = self.client.get(reverse('change_feed'), {'since': since, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def _all_since(self, since, limit):
+        changes, pages = [], 0
+        while True:
+            page = self._feed(since, limit=limit)
+            changes += page['changes']
+            pages += 1
+            since = page['next_cursor']
+            if not page['has_more']:
+                return changes, pages
+
+    def test_create_update_and_delete_are_logged(self):
+        department = Department.objects.create(name='Feed Co')
+        department.description = 'Now described'
+        department.save()
+        department_id = department.pk
+        department.delete()
+
+        changes = [c for c in self._feed(self.start)['changes'] if c['model'] == 'department']
+        self.assertEqual([c['action'] for c in changes], ['create', 'update', 'delete'])
+        self.assertEqual({c['id'] for c in changes}, {department_id})
+        self.assertEqual(changes[0]['data']['name'], 'Feed Co')
+        self.assertEqual(changes[1]['data']['description'], 'Now described')
+        self.assertEqual(changes[2]['data'], {})
+
+    def test_pages_follow_cursor_without_gaps_or_repeats(self):
+        names = [f'Paged {i}' for i in range(5)]
+        for name in names:
+            Department.objects.create(name=name)
+
+        changes, pages = self._all_since(self.start, limit=2)
+        self.assertEqual(pages, 3)
+        self.assertEqual([c['data']['name'] for c in changes if c['model'] == 'department'], names)
+        cursors = [c['cursor'] for c in changes]
+        self.assertEqual(cursors, sorted(set(cursors)))
+        self.assertEqual(self._feed(cursors[-1])['changes'], [])
+
+    def test_late_commit_with_lower_id_is_not_skipped(self):
+        Department.objects.create(name='First')
+        Department.objects.create(name='Second')
+        seen = self._feed(self.start)['next_cursor']
+        # A transaction that took its id before those two but committed after
+        low_id = ChangeLogEntry.objects.order_by('id').first().id - 1
+        ChangeLogEntry.objects.create(id=low_id, model='department', object_id=0, action='update',
+                                      department_id=None, data={'name': 'Slow writer'})
+
+        changes = self._feed(seen)['changes']
+        self.assertEqual([c['data'].get('name') for c in changes], ['Slow writer'])
+        self.assertGreater(changes[0]['cursor'], seen)
+
+    def test_reading_the_feed_numbers_pending_entries(self):
+        Department.objects.create(name='Unnumbered')
+        entry = ChangeLogEntry.objects.latest('id')
+        self.assertIsNone(entry.seq)
+        self._feed(self.start)
+        entry.refresh_from_db()
+        self.assertIsNotNone(entry.seq)
+        # Numbering again changes nothing
+        sequence_changes()
+        self.assertEqual(ChangeLogEntry.objects.get(pk=entry.pk).seq, entry.seq)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('change_feed'), {'since': 'abc'})
+        self.assertEqual(response.status_code, 400)
+
+
+class AtomicRequestTests(TestCase):
+    @override_settings(ROOT_URLCONF=__name__)
+    def test_failed_request_rolls_back_change_and_its_entry(self):
+        client = Client(raise_request_exception=False)
+        self.assertEqual(client.get('/half-done/').status_code, 500)
+        self.assertFalse(Department.objects.filter(name='Half Done').exists())
+        self.assertFalse(ChangeLogEntry.objects.filter(model='department', data__name='Half Done').exists())
+
+    def test_views_outside_the_request_transaction(self):
+        # Async views can't run inside ATOMIC_REQUESTS; these commit on their own
+        own_transaction = {'change_feed', 'employee_kpi', 'kpi_upload_chunk'}
+        for pattern in accounts_urls.urlpatterns:
+            if not isinstance(pattern, URLPattern):
+                continue
+            view = pattern.callback
+            opted_out = 'default' in getattr(view, '_non_atomic_requests', set())
+            with self.subTest(pattern.name):
+                if iscoroutinefunction(view) or pattern.name in own_transaction:
+                    self.assertTrue(opted_out)
@@ -0,0 +1,76 @@
+import os
+import time
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from accounts.models import Department, KPIFile
+from accounts.tests.utils import TemporaryMediaMixin
+
+
+class CollectMediaGarbageTests(TemporaryMediaMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        employee = User.objects.create_user('emp')
+        self.kept = KPIFile.objects.create(employee=employee, uploaded_by=employee, quarter='Q1', year=2025,
+                                           title='t', file=ContentFile(b'kept', name='kept.pdf')).file.name
+        self.orphan = default_storage.save('kpi_files/none/2024/Q1/orphan.pdf', ContentFile(b'orphan!'))
+        self.fresh = default_storage.save('kpi_files/none/2024/Q1/fresh.pdf', ContentFile(b'fresh'))
+        # Only files older than the grace period count as orphans
+        hour_ago = time.time() - 2 * 60 * 60
+        for name in (self.kept, self.orphan):
+            os.utime(default_storage.path(name), (hour_ago, hour_ago))
+
+    def test_dry_run_reports_orphans_without_deleting(self):
+        out = StringIO()
+        call_command('collect_media_garbage', '--dry-run', '-v', '2', stdout=out)
+        output = out.getvalue()
+        self.assertIn(self.orphan, output)
+        self.assertNotIn(self.kept, output)
+        self.assertNotIn(self.fresh, output)
+        self.assertIn('kpi_files: 1 orphaned (7 B)', output)
+        self.assertIn('Would delete 1 files', output)
+        for name in (self.kept, self.orphan, self.fresh):
+            self.assertTrue(default_storage.exists(name))
+
+    def test_deletes_only_old_unreferenced_files(self):
+        call_command('collect_media_garbage', '--workers', '2', stdout=StringIO())
+        self.assertFalse(default_storage.exists(self.orphan))
+        self.assertTrue(default_storage.exists(self.kept))
+        self.assertTrue(default_storage.exists(self.fresh))
+
+
+class RebuildDerivedTests(TemporaryMediaMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.chosen = Department.objects.create(name='Acme')
+        cls.other = Department.objects.create(name='Other Co')
+
+    def setUp(self):
+        super().setUp()
+        Department.objects.filter(pk__in=[self.chosen.pk, self.other.pk]).update(theme_css='')
+
+    def _rebuild(self, *companies):
+        args = ['rebuild_derived', '--only', 'themes', '--workers', '1']
+        for company in companies:
+            args += ['--company', company]
+        out = StringIO()
+        call_command(*args, stdout=out)
+        return out.getvalue()
+
+    def test_rebuilds_only_named_company(self):
+        # The same company by id and by name counts once
+        output = self._rebuild(str(self.chosen.pk), 'acme')
+        self.assertIn('for 1 company', output)
+        self.chosen.refresh_from_db()
+        self.other.refresh_from_db()
+        self.assertTrue(self.chosen.theme_css.name)
+        self.assertEqual(self.other.theme_css.name, '')
+
+    def test_unknown_company_is_an_error(self):
+        with self.assertRaisesMessage(CommandError, 'Nope'):
+            self._rebuild(str(self.chosen.pk), 'Nope')
@@ -0,0 +1,67 @@
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.urls import reverse
+
+from accounts.models import Department
+from accounts.routers import PIN_COOKIE
+
+
+def _member(username, department):
+    user = User.objects.create_user(username, first_name=username.title())
+    user.profile.department = department
+    user.profile.save()
+    return user
+
+
+class ConditionalPageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.get(name='ISCM')
+        cls.viewer = _member('viewer', cls.department)
+        cls.colleague = _member('colleague', cls.department)
+
+    def setUp(self):
+        self.client.force_login(self.viewer)
+        # Read from the primary; the replica mirror can't see this test's transaction
+        self.client.cookies[PIN_COOKIE] = '1'
+
+    def _etag(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def _rename_colleague(self):
+        # Only the User row changes; the profile is untouched
+        with self.captureOnCommitCallbacks(execute=True):
+            self.colleague.first_name = 'Renamed'
+            self.colleague.save()
+
+    def test_unchanged_page_is_not_modified(self):
+        url = reverse('member_profile', args=[self.colleague.pk])
+        etag = self._etag(url)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_user_edit_changes_member_profile_etag(self):
+        url = reverse('member_profile', args=[self.colleague.pk])
+        etag = self._etag(url)
+        self._rename_colleague()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertContains(response, 'Renamed')
+
+    def test_user_edit_changes_department_page_etag(self):
+        url = reverse('department_page')
+        etag = self._etag(url)
+        self._rename_colleague()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Renamed')
+
+    def test_viewer_edit_changes_dashboard_etag(self):
+        url = reverse('user_dashboard')
+        etag = self._etag(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.viewer.email = 'viewer@example.com'
+            self.viewer.save()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
@@ -0,0 +1,66 @@
+from django.contrib.auth.models import User
+from django.core.exceptions import PermissionDenied
+from django.test import TestCase
+
+from accounts.hierarchy import HierarchyError, move_subtree
+from accounts.models import Department, UserProfile
+
+
+def _person(username, department, reports_to=None):
+    profile = User.objects.create_user(username).profile
+    profile.department = department
+    profile.reports_to = reports_to
+    profile.save()
+    return profile
+
+
+class MoveSubtreeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.source = Department.objects.create(name='Source Co')
+        cls.target = Department.objects.create(name='Target Co')
+        cls.allowed = {cls.source.pk, cls.target.pk}
+        cls.root = _person('root', cls.source)
+        cls.child = _person('child', cls.source, cls.root)
+        cls.grandchild = _person('grandchild', cls.source, cls.child)
+        cls.bystander = _person('bystander', cls.source)
+        cls.new_manager = _person('new_manager', cls.target)
+        cls.existing_report = _person('existing_report', cls.target, cls.new_manager)
+
+    def _refresh(self):
+        return {p.pk: p for p in UserProfile.objects.filter(department__in=self.allowed)}
+
+    def test_moves_whole_branch_under_new_manager_in_other_company(self):
+        moved = move_subtree(self.root.pk, self.target.pk, self.new_manager.pk, self.allowed)
+
+        self.assertCountEqual(moved, [self.root.pk, self.child.pk, self.grandchild.pk])
+        profiles = self._refresh()
+        for pk in moved:
+            self.assertEqual(profiles[pk].department_id, self.target.pk)
+        self.assertEqual(profiles[self.root.pk].reports_to_id, self.new_manager.pk)
+        # Placed after the manager's existing reports
+        self.assertEqual(profiles[self.root.pk].hierarchy_order, self.existing_report.hierarchy_order + 1)
+        # Reporting lines inside the branch are kept
+        self.assertEqual(profiles[self.child.pk].reports_to_id, self.root.pk)
+        self.assertEqual(profiles[self.grandchild.pk].reports_to_id, self.child.pk)
+        self.assertEqual(profiles[self.bystander.pk].department_id, self.source.pk)
+
+    def test_moving_under_own_report_is_a_cycle(self):
+        with self.assertRaisesMessage(HierarchyError, 'Circular reference'):
+            move_subtree(self.root.pk, self.source.pk, self.grandchild.pk, self.allowed)
+        self.assertIsNone(UserProfile.objects.get(pk=self.root.pk).reports_to_id)
+
+    def test_new_manager_must_be_in_target_company(self):
+        with self.assertRaises(HierarchyError):
+            move_subtree(self.root.pk, self.target.pk, self.bystander.pk, self.allowed)
+
+    def test_both_companies_must_be_allowed(self):
+        with self.assertRaises(PermissionDenied):
+            move_subtree(self.root.pk, self.target.pk, None, {self.source.pk})
+        with self.assertRaises(PermissionDenied):
+            move_subtree(self.root.pk, self.target.pk, None, {self.target.pk})
+        self.assertEqual(UserProfile.objects.get(pk=self.root.pk).department_id, self.source.pk)
+
+    def test_unknown_person(self):
+        with self.assertRaises(HierarchyError):
+            move_subtree(0, self.target.pk, None, self.allowed)
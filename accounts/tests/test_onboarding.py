@@ -0,0 +1,124 @@
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase
+from django.urls import reverse
+
+from accounts.models import ChangeLogEntry, Department, UserProfile
+from accounts.onboarding import import_users, parse_csv
+
+HEADER = 'username,first_name,last_name,email,company,job_title,is_manager,reports_to,password\n'
+
+
+def _csv(*lines):
+    return (HEADER + ''.join(line + '\n' for line in lines)).encode()
+
+
+class ParseCsvTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Department.objects.create(name='Onboard Co')
+        cls.other = Department.objects.create(name='Elsewhere')
+        cls.allowed = Department.objects.filter(pk=cls.company.pk)
+        cls.outsider = User.objects.create_user('outsider')
+        cls.outsider.profile.department = cls.other
+        cls.outsider.profile.save()
+        User.objects.create_user('taken')
+
+    def _errors(self, *lines):
+        return parse_csv(_csv(*lines), self.allowed)[1]
+
+    def test_valid_file_has_no_errors(self):
+        rows, errors = parse_csv(_csv(
+            'boss,Big,Boss,boss@example.com,onboard co,Director,yes,,s3cret-Pass',
+            'worker,Wendy,Work,wendy@example.com,Onboard Co,Analyst,no,boss,',
+        ), self.allowed)
+        self.assertEqual(errors, [])
+        self.assertEqual([row['department'] for row in rows], [self.company, self.company])
+        self.assertEqual([row['is_manager'] for row in rows], [True, False])
+
+    def test_row_errors_name_their_line(self):
+        errors = self._errors(
+            'dup,A,B,a@example.com,Onboard Co,,,,',
+            'dup,A,B,b@example.com,Onboard Co,,,,',
+            'taken,A,B,c@example.com,Onboard Co,,,,',
+            'bademail,A,B,not-an-email,Onboard Co,,,,',
+            'nocompany,A,B,d@example.com,Elsewhere,,,,',
+            'nopass,A,B,e@example.com,Onboard Co,,yes,,',
+            f'longname,{"x" * 151},B,f@example.com,Onboard Co,,,,',
+            'crosscompany,A,B,g@example.com,Onboard Co,,,outsider,',
+        )
+        self.assertEqual(errors, [
+            (3, 'Username "dup" appears more than once.'),
+            (4, 'Username "taken" already exists.'),
+            (5, '"not-an-email" is not a valid email address.'),
+            (6, 'Unknown company "Elsewhere".'),
+            (7, 'Password is required for managers.'),
+            (8, 'first_name can be at most 150 characters.'),
+            (9, '"outsider" is in a different company.'),
+        ])
+
+    def test_reporting_loops_are_refused(self):
+        errors = self._errors(
+            'a,A,A,a@example.com,Onboard Co,,,b,',
+            'b,B,B,b@example.com,Onboard Co,,,a,',
+            'c,C,C,c@example.com,Onboard Co,,,c,',
+        )
+        self.assertIn((2, 'Reporting lines form a loop.'), errors)
+        self.assertIn((3, 'Reporting lines form a loop.'), errors)
+        self.assertIn((4, 'Someone cannot report to themselves.'), errors)
+
+    def test_missing_columns_and_encoding(self):
+        self.assertEqual(parse_csv(b'username,email\nx,x@example.com\n', self.allowed)[1],
+                         [(1, 'Missing columns: first_name, last_name, company')])
+        self.assertEqual(parse_csv('username\n\xe9'.encode('latin-1'), self.allowed)[1],
+                         [(0, 'The file must be UTF-8 encoded CSV.')])
+
+
+class ImportUsersTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.company = Department.objects.create(name='Onboard Co')
+        cls.admin = User.objects.create_user('importer', is_staff=True)
+        cls.admin.profile.department = Department.objects.get(name='Magnum Opus')
+        cls.admin.profile.save()
+
+    def test_import_creates_people_reporting_lines_and_feed_entries(self):
+        rows, errors = parse_csv(_csv(
+            'boss,Big,Boss,boss@example.com,Onboard Co,Director,yes,,s3cret-Pass',
+            'worker,Wendy,Work,wendy@example.com,Onboard Co,Analyst,,boss,',
+        ), Department.objects.all())
+        self.assertEqual(errors, [])
+        with self.captureOnCommitCallbacks(execute=True):
+            users = import_users(rows)
+
+        self.assertCountEqual([u.username for u in users], ['boss', 'worker'])
+        boss = User.objects.get(username='boss')
+        worker = User.objects.get(username='worker')
+        self.assertTrue(boss.is_staff)
+        self.assertTrue(boss.check_password('s3cret-Pass'))
+        self.assertFalse(worker.has_usable_password())
+        profile = UserProfile.objects.get(user=worker)
+        self.assertEqual(profile.department, self.company)
+        self.assertEqual(profile.job_title, 'Analyst')
+        self.assertEqual(profile.reports_to, boss.profile)
+
+        logged = set(ChangeLogEntry.objects.filter(action='create').values_list('model', 'object_id'))
+        self.assertLessEqual({('user', boss.pk), ('user', worker.pk), ('userprofile', profile.pk)}, logged)
+
+    def _post(self, data):
+        self.client.force_login(self.admin)
+        return self.client.post(reverse('bulk_import_users'), {'file': SimpleUploadedFile('people.csv', data)})
+
+    def test_view_imports_nothing_while_any_row_is_invalid(self):
+        response = self._post(_csv(
+            'fine,F,F,fine@example.com,Onboard Co,,,,',
+            'broken,B,B,not-an-email,Onboard Co,,,,',
+        ))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'is not a valid email address')
+        self.assertFalse(User.objects.filter(username__in=['fine', 'broken']).exists())
+
+    def test_view_imports_valid_file(self):
+        response = self._post(_csv('fine,F,F,fine@example.com,Onboard Co,,,,'))
+        self.assertRedirects(response, reverse('admin_manage'), fetch_redirect_response=False)
+        self.assertEqual(User.objects.get(username='fine').profile.department, self.company)
@@ -0,0 +1,58 @@
+import json
+
+from django.contrib.auth.models import User
+from django.db import connections, router
+from django.test import TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts.models import Department
+from accounts.routers import PIN_COOKIE, replica_reads
+
+
+class ReplicaRoutingTests(TransactionTestCase):
+    # The replica mirrors the primary's test database, so it only sees
+    # committed rows: these tests commit instead of rolling back
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        self.department, _ = Department.objects.get_or_create(name='ISCM')
+        self.manager = User.objects.create_user('mgr', is_staff=True)
+        self.manager.profile.department = self.department
+        self.manager.profile.save()
+        self.employee = User.objects.create_user('emp')
+        self.employee.profile.department = self.department
+        self.employee.profile.save()
+        self.client.force_login(self.manager)
+
+    def _replica_queries(self, url, **kwargs):
+        with CaptureQueriesContext(connections['replica']) as queries:
+            response = self.client.get(url, **kwargs)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_router_sends_reads_to_replica_only_inside_replica_reads(self):
+        self.assertEqual(Department.objects.all().db, 'default')
+        with replica_reads():
+            self.assertEqual(Department.objects.all().db, 'replica')
+            self.assertEqual(router.db_for_write(Department), 'default')
+
+    def test_read_only_page_reads_from_replica(self):
+        self.assertGreater(self._replica_queries(reverse('admin_users')), 0)
+
+    def test_write_pins_browser_to_primary(self):
+        response = self.client.post(
+            reverse('reorder_hierarchy', args=[self.department.pk]),
+            json.dumps({'action': 'set_parent', 'profile_id': self.employee.profile.pk,
+                        'parent_id': self.manager.profile.pk}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.json()['status'], 'ok')
+        self.assertIn(PIN_COOKIE, response.cookies)
+        self.assertEqual(self._replica_queries(reverse('admin_users')), 0)
+
+    def test_failed_write_does_not_pin(self):
+        response = self.client.post(reverse('reorder_hierarchy', args=[self.department.pk]), 'not json',
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn(PIN_COOKIE, response.cookies)
@@ -0,0 +1,163 @@
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.uploadhandler import StopUpload
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import KPIFile, KPIUpload
+from accounts.tests.utils import TemporaryMediaMixin
+from accounts.uploads import ChunkWriter, UploadError, apply_chunk, claim_chunk, finish_upload, start_upload
+
+
+def _write(upload, data):
+    """Stream ``data`` through a ChunkWriter as the request parser would."""
+    writer = ChunkWriter(upload)
+    try:
+        writer.new_file('file', 'chunk', 'application/octet-stream', len(data))
+    except Exception:  # StopFutureHandlers
+        pass
+    writer.receive_data_chunk(data, 0)
+    writer.file_complete(len(data))
+    return writer
+
+
+@override_settings(KPI_UPLOAD_CHUNK_BYTES=4)
+class ChunkWriterTests(TemporaryMediaMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user('mgr', is_staff=True)
+        cls.employee = User.objects.create_user('emp')
+
+    def _start(self, size=10):
+        return start_upload(self.employee, self.manager, 'Q1', 2025, 'kpi.pdf', size)
+
+    def _contents(self, upload):
+        with open(upload.file.path, 'rb') as f:
+            return f.read()
+
+    def test_resume_continues_from_received_bytes(self):
+        upload = self._start()
+        self.assertFalse(apply_chunk(upload, _write(upload, b'abcd')))
+        # A later start for the same file resumes the same session
+        resumed = self._start()
+        self.assertEqual(resumed.pk, upload.pk)
+        self.assertEqual(resumed.received, 4)
+        self.assertFalse(apply_chunk(resumed, _write(resumed, b'efgh')))
+        self.assertTrue(apply_chunk(resumed, _write(resumed, b'ij')))
+        self.assertEqual(self._contents(resumed), b'abcdefghij')
+
+    def test_bytes_past_received_from_a_failed_attempt_are_truncated(self):
+        upload = self._start()
+        apply_chunk(upload, _write(upload, b'abcd'))
+        # An attempt that died mid-chunk left bytes that were never confirmed
+        with open(upload.file.path, 'ab') as f:
+            f.write(b'XX')
+        apply_chunk(upload, _write(upload, b'efgh'))
+        self.assertEqual(self._contents(upload), b'abcdefgh')
+
+    def test_chunk_over_limit_or_past_declared_size_is_refused(self):
+        upload = self._start(size=6)
+        writer = ChunkWriter(upload)
+        try:
+            writer.new_file('file', 'chunk', 'application/octet-stream', 5)
+        except Exception:
+            pass
+        with self.assertRaises(StopUpload):
+            writer.receive_data_chunk(b'abcde', 0)
+        self.assertTrue(writer.too_large)
+
+    def test_checksum_mismatch_leaves_upload_unchanged(self):
+        upload = self._start()
+        with self.assertRaises(UploadError):
+            apply_chunk(upload, _write(upload, b'abcd'), hashlib.sha256(b'other').hexdigest())
+        upload.refresh_from_db()
+        self.assertEqual(upload.received, 0)
+
+    def test_finish_replaces_quarter_file_and_reports_it(self):
+        old = KPIFile.objects.create(employee=self.employee, uploaded_by=self.manager, quarter='Q1', year=2025,
+                                     title='old', file=SimpleUploadedFile('old.pdf', b'old'))
+        upload = self._start(size=4)
+        apply_chunk(upload, _write(upload, b'abcd'))
+        kpi_file, replaced = finish_upload(upload)
+        self.assertEqual(replaced, [old.file.name])
+        self.assertEqual(list(KPIFile.objects.filter(employee=self.employee)), [kpi_file])
+        self.assertFalse(KPIUpload.objects.exists())
+
+
+@override_settings(KPI_UPLOAD_CHUNK_BYTES=4)
+class ChunkUploadViewTests(TemporaryMediaMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user('mgr', is_staff=True)
+        cls.employee = User.objects.create_user('emp')
+
+    def test_chunks_must_arrive_at_the_stored_offset(self):
+        self.client.force_login(self.manager)
+        upload = start_upload(self.employee, self.manager, 'Q2', 2025, 'kpi.pdf', 6)
+        url = reverse('kpi_upload_chunk', args=[upload.pk])
+
+        response = self.client.post(url, {'file': SimpleUploadedFile('c', b'abcd')}, headers={'Upload-Offset': '0'})
+        self.assertEqual(response.json()['received'], 4)
+        response = self.client.post(url, {'file': SimpleUploadedFile('c', b'ef')}, headers={'Upload-Offset': '0'})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(self.client.get(url).json()['received'], 4)
+        response = self.client.post(url, {'file': SimpleUploadedFile('c', b'ef')}, headers={'Upload-Offset': '4'})
+        self.assertTrue(response.json()['complete'])
+        self.assertEqual(KPIFile.objects.get(employee=self.employee).file.read(), b'abcdef')
+
+    def _chunk_url(self, size=6):
+        upload = start_upload(self.employee, self.manager, 'Q3', 2025, 'kpi.pdf', size)
+        return upload, reverse('kpi_upload_chunk', args=[upload.pk])
+
+    def test_post_without_csrf_token_is_refused(self):
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.manager)
+        upload, url = self._chunk_url()
+        chunk = {'file': SimpleUploadedFile('c', b'abcd')}
+
+        self.assertEqual(client.post(url, chunk, headers={'Upload-Offset': '0'}).status_code, 403)
+        self.assertEqual(client.delete(url).status_code, 403)
+        upload.refresh_from_db()
+        self.assertEqual(upload.received, 0)
+        self.assertIsNone(upload.writing_until)
+
+        token = 'a' * 32
+        client.cookies[settings.CSRF_COOKIE_NAME] = token
+        response = client.post(url, {'file': SimpleUploadedFile('c', b'abcd')},
+                               headers={'Upload-Offset': '0', 'X-CSRFToken': token})
+        self.assertEqual(response.json()['received'], 4)
+
+    def test_chunk_is_refused_while_another_request_writes(self):
+        self.client.force_login(self.manager)
+        upload, url = self._chunk_url()
+        self.assertIsNotNone(claim_chunk(upload, 0))
+        self.assertIsNone(claim_chunk(upload, 0))
+
+        response = self.client.post(url, {'file': SimpleUploadedFile('c', b'abcd')}, headers={'Upload-Offset': '0'})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['msg'], 'Another request is writing this upload')
+        # Status reads don't wait for the writer
+        self.assertEqual(self.client.get(url).json()['received'], 0)
+
+        # A writer that died stops blocking once its claim runs out
+        KPIUpload.objects.filter(pk=upload.pk).update(writing_until=timezone.now() - timedelta(seconds=1))
+        response = self.client.post(url, {'file': SimpleUploadedFile('c', b'abcd')}, headers={'Upload-Offset': '0'})
+        self.assertEqual(response.json()['received'], 4)
+        upload.refresh_from_db()
+        self.assertIsNone(upload.writing_until)
+
+    def test_failed_chunk_releases_its_claim(self):
+        self.client.force_login(self.manager)
+        upload, url = self._chunk_url()
+        response = self.client.post(url, {'file': SimpleUploadedFile('c', b'abcd')},
+                                    headers={'Upload-Offset': '0', 'X-Chunk-SHA256': '0' * 64})
+        self.assertEqual(response.status_code, 400)
+        upload.refresh_from_db()
+        self.assertIsNone(upload.writing_until)
+        response = self.client.post(url, {'file': SimpleUploadedFile('c', b'abcd')}, headers={'Upload-Offset': '0'})
+        self.assertEqual(response.json()['received'], 4)
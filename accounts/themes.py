@@ -0,0 +1,26 @@
+import hashlib
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+
+THEME_DIR = 'themes'
+THEME_CSS = ':root{{--brand:{primary};--brand-hover:{hover};--brand-accent:{accent};}}\n'
+
+
+def theme_css(primary, hover, accent):
+    return THEME_CSS.format(primary=primary, hover=hover, accent=accent)
+
+
+def ensure_theme_file(primary, hover, accent):
+    """Write the stylesheet for these brand colours and return its storage name.
+
+    The file name is a hash of its contents, so it never changes once written
+    and can be served with an immutable cache header. Companies that share a
+    palette share one file.
+    """
+    css = theme_css(primary, hover, accent).encode()
+    digest = hashlib.sha256(css).hexdigest()[:12]
+    name = f'{THEME_DIR}/theme.{digest}.css'
+    if not default_storage.exists(name):
+        default_storage.save(name, ContentFile(css))
+    return name
@@ -0,0 +1,163 @@
+import hashlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler, StopFutureHandlers, StopUpload
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import KPIFile, KPIUpload
+
+# Unfinished uploads untouched this long are discarded with their partial file
+UPLOAD_EXPIRY = timedelta(days=1)
+# How long one request may hold an upload while its chunk streams in; a
+# worker killed mid-chunk stops blocking the client's retry after this
+CHUNK_CLAIM = timedelta(minutes=10)
+
+
+class UploadError(ValueError):
+    pass
+
+
+def start_upload(employee, uploaded_by, quarter, year, name, size):
+    """The upload session for this file, resuming an unfinished one for the
+    same employee, quarter, file name and size if there is one.
+
+    The session's file is created empty at its final name in storage.
+    """
+    if quarter not in dict(KPIFile.QUARTER_CHOICES):
+        raise UploadError('Unknown quarter.')
+    if not 0 < size <= settings.KPI_UPLOAD_MAX_BYTES:
+        raise UploadError(f'Files can be at most {settings.KPI_UPLOAD_MAX_BYTES // (1024 * 1024)} MB.')
+    discard_stale_uploads()
+    upload = KPIUpload.objects.filter(
+        employee=employee, uploaded_by=uploaded_by, quarter=quarter, year=year, original_name=name, size=size,
+    ).order_by('-updated_at').first()
+    if upload is None:
+        upload = KPIUpload(employee=employee, uploaded_by=uploaded_by, quarter=quarter, year=year,
+                           original_name=name, size=size)
+        upload.file.save(name, ContentFile(b''), save=False)
+        upload.save()
+    return upload
+
+
+def discard_stale_uploads():
+    """Delete up to 100 expired uploads and their partial files; returns how many."""
+    stale = list(KPIUpload.objects.filter(updated_at__lt=timezone.now() - UPLOAD_EXPIRY)[:100])
+    for upload in stale:
+        upload.file.delete(save=False)
+        upload.delete()
+    return len(stale)
+
+
+def claim_chunk(upload, offset):
+    """Reserve ``upload`` for one request to write the chunk at ``offset``.
+
+    One conditional UPDATE instead of a row lock held for the whole
+    transfer. Returns the claim, which must still hold when the chunk is
+    recorded, or None when ``offset`` isn't the bytes received so far or
+    another request is writing. Call outside a transaction.
+    """
+    now = timezone.now()
+    claim = now + CHUNK_CLAIM
+    claimed = KPIUpload.objects.filter(pk=upload.pk, received=offset).filter(
+        Q(writing_until__isnull=True) | Q(writing_until__lt=now),
+    ).update(writing_until=claim)
+    return claim if claimed else None
+
+
+def release_chunk(upload, claim):
+    """Give up a claim that didn't end in a recorded chunk."""
+    KPIUpload.objects.filter(pk=upload.pk, writing_until=claim).update(writing_until=None)
+
+
+class ChunkWriter(FileUploadHandler):
+    """Write a request's file part straight into the upload's file, at the
+    offset received so far, hashing and counting bytes as they stream in.
+
+    Nothing is buffered in memory or temp files; the part stops being read
+    as soon as it would run past the declared size or the chunk limit.
+    Needs storage with local paths (FileSystemStorage).
+    """
+
+    def __init__(self, upload, request=None):
+        super().__init__(request)
+        self.upload = upload
+        self.sha256 = hashlib.sha256()
+        self.written = 0
+        self.too_large = False
+        self.out = None
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        if self.out is not None:
+            # One chunk per request; ignore any other file parts
+            raise StopUpload()
+        self.out = open(self.upload.file.path, 'r+b')
+        # Drop whatever a failed earlier attempt left past the confirmed bytes
+        self.out.truncate(self.upload.received)
+        self.out.seek(self.upload.received)
+        raise StopFutureHandlers()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.written += len(raw_data)
+        if (self.upload.received + self.written > self.upload.size
+                or self.written > settings.KPI_UPLOAD_CHUNK_BYTES):
+            self.too_large = True
+            self.out.close()
+            raise StopUpload(connection_reset=True)
+        self.sha256.update(raw_data)
+        self.out.write(raw_data)
+
+    def file_complete(self, file_size):
+        self.out.close()
+        return UploadedFile(name=self.file_name, size=file_size, content_type=self.content_type)
+
+    def upload_interrupted(self):
+        if self.out is not None:
+            self.out.close()
+
+
+def apply_chunk(upload, writer, expected_sha256=''):
+    """Record a chunk the writer stored, after checking it against the
+    client's hash when one was sent, ending the request's claim. Returns
+    True once the file is whole.
+
+    ``upload.digest`` chains the chunks: SHA-256 of the previous digest's
+    bytes followed by this chunk's SHA-256, starting from no bytes. It
+    identifies the exact chunk sequence, not the file's own SHA-256.
+    """
+    digest = writer.sha256.hexdigest()
+    if expected_sha256 and expected_sha256.lower() != digest:
+        raise UploadError('Chunk checksum mismatch.')
+    upload.received += writer.written
+    upload.digest = hashlib.sha256(bytes.fromhex(upload.digest) + bytes.fromhex(digest)).hexdigest()
+    upload.writing_until = None
+    upload.save(update_fields=['received', 'digest', 'writing_until', 'updated_at'])
+    return upload.received == upload.size
+
+
+def finish_upload(upload):
+    """Replace the quarter's KPI file with the completed upload; the file
+    already sits at its final name, so the row just points at it.
+
+    Returns ``(kpi_file, replaced)``, the names of the files it replaced.
+    """
+    replaced = []
+    for old in KPIFile.objects.filter(employee=upload.employee, quarter=upload.quarter, year=upload.year):
+        replaced.append(old.file.name)
+        old.file.delete()
+        old.delete()
+    employee = upload.employee
+    kpi_file = KPIFile.objects.create(
+        employee=employee,
+        uploaded_by=upload.uploaded_by,
+        file=upload.file.name,
+        title=f"{employee.first_name} {employee.last_name} {upload.quarter} {upload.year}",
+        quarter=upload.quarter,
+        year=upload.year,
+    )
+    upload.delete()
+    return kpi_file, replaced
@@ -9,18 +9,35 @@ urlpatterns = [
     # Admin/Manager views
     path('admin-center/', views.admin_center, name='admin_center'),
     path('admin-center/manage/', views.admin_manage, name='admin_manage'),
+    path('admin-center/manage/import/', views.bulk_import_users, name='bulk_import_users'),
     path('admin-center/edit-user/<int:user_id>/', views.admin_edit_user, name='admin_edit_user'),
     path('admin-center/department/<int:dept_id>/', views.admin_department_detail, name='admin_department_detail'),
     path('admin-center/edit-department/<int:dept_id>/', views.admin_edit_department, name='admin_edit_department'),
     path('admin-center/kpi/<int:user_id>/', views.employee_kpi, name='employee_kpi'),
+    path('admin-center/kpi/<int:user_id>/history/', views.employee_audit_log, name='employee_audit_log'),
+    path('admin-center/kpi/<int:user_id>/uploads/', views.start_kpi_upload, name='start_kpi_upload'),
+    path('admin-center/kpi/uploads/<uuid:upload_id>/', views.kpi_upload_chunk, name='kpi_upload_chunk'),
     path('admin-center/kpi/view/<int:file_id>/', views.view_kpi_file, name='view_kpi_file'),
     path('admin-center/kpi/delete/<int:file_id>/', views.delete_kpi_file, name='delete_kpi_file'),
     path('admin-center/org-chart/', views.org_chart, name='org_chart'),
+    path('admin-center/department/<int:dept_id>/history/', views.department_audit_log, name='department_audit_log'),
+    path('admin-center/department/<int:dept_id>/kpi-heatmap/', views.department_kpi_heatmap, name='department_kpi_heatmap'),
+    path('admin-center/department/<int:dept_id>/kpi-heatmap/data/', views.department_kpi_matrix, name='department_kpi_matrix'),
     path('admin-center/department/<int:dept_id>/org-chart/', views.dept_org_chart, name='dept_org_chart'),
+    path('admin-center/department/<int:dept_id>/org-chart/events/', views.org_chart_events, name='org_chart_events'),
+    path('admin-center/department/<int:dept_id>/org-chart/children/', views.org_chart_children, name='org_chart_children'),
+    path('admin-center/department/<int:dept_id>/org-chart.svg', views.dept_org_chart_image, {'fmt': 'svg'},
+         name='dept_org_chart_svg'),
+    path('admin-center/department/<int:dept_id>/org-chart.png', views.dept_org_chart_image, {'fmt': 'png'},
+         name='dept_org_chart_png'),
     path('admin-center/department/<int:dept_id>/reorder/', views.reorder_hierarchy, name='reorder_hierarchy'),
     path('admin-center/users/', views.admin_users, name='admin_users'),
     path('admin-center/delete-user/<int:user_id>/', views.delete_user, name='delete_user'),
     path('admin-center/delete-department/<int:dept_id>/', views.delete_department, name='delete_department'),
+    path('admin-center/deletions/<int:job_id>/', views.deletion_status, name='deletion_status'),
+    path('admin-center/metrics/', views.metrics_endpoint, name='metrics'),
+    path('admin-center/api/changes/', views.change_feed, name='change_feed'),
+    path('admin-center/api/people/', views.people_search, name='people_search'),
 
     # User views
     path('dashboard/', views.user_dashboard, name='user_dashboard'),
@@ -1,20 +1,46 @@
+import asyncio
 import json
+import time
+from datetime import timedelta
 
-from django.db.models import Avg
+from django.db import transaction
+from django.db.models import Count, Max, Q
 
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth import login
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.forms import UserCreationForm
 from django.contrib.auth.models import User
-from django.http import HttpResponseForbidden, JsonResponse
-from django.shortcuts import get_object_or_404, redirect, render
+from django.core.exceptions import PermissionDenied
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from django.middleware.csrf import CsrfViewMiddleware
+from django.shortcuts import aget_object_or_404, get_object_or_404, redirect, render
+from django.urls import reverse
 from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.crypto import constant_time_compare
+from django.utils.text import slugify
+from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.http import require_POST
 
-from .decorators import staff_required
-from .forms import AdminUserCreationForm, DepartmentForm, KPIFileUploadForm, UserProfileForm
-from .models import Department, KPIFile, UserProfile
+from . import audit, metrics
+from .archive import kpi_averages, online_cutoff, restore_year
+from .caching import bump_data_version, company_list_version, data_version, people_version
+from .changefeed import record_updates, sequence_changes
+from .decorators import conditional_page, replica_page, staff_required
+from .deletion import start_deletion
+from .forms import AdminUserCreationForm, BulkUserImportForm, DepartmentForm, KPIFileUploadForm, UserProfileForm
+from .heatmap import cached_matrix
+from .hierarchy import HierarchyError, move_subtree
+from .models import AuditEvent, ChangeLogEntry, CompanyKPIStanding, DeletionJob, Department, KPIFile, KPIUpload, UserProfile
+from .onboarding import OPTIONAL_COLUMNS, REQUIRED_COLUMNS, import_users, parse_csv
+from .orgchart import chart_image
+from .search import search_people
+from .stats import company_standing
+from .uploads import ChunkWriter, UploadError, apply_chunk, claim_chunk, finish_upload, release_chunk, start_upload
 
 # Map department names to template folders
 DEPT_TEMPLATES = {
@@ -90,11 +116,10 @@ def _admin_ctx(request, extra=None, view_dept=None):
         brand_name = 'Magnum Opus Consultants'
     ctx = {
         'sidebar_departments': _visible_departments(request.user),
+        'sidebar_version': company_list_version(),
         'is_super_admin': is_super,
         'brand_name': brand_name,
-        'brand_primary': dept.brand_primary if dept else '#054B70',
-        'brand_hover': dept.brand_hover if dept else '#043d5c',
-        'brand_accent': dept.brand_accent if dept else '#8CB7C4',
+        'theme_css': dept.theme_css if dept and dept.theme_css else None,
         'dept_logo': dept.logo if dept and dept.logo else None,
     }
     if extra:
@@ -102,6 +127,191 @@ def _admin_ctx(request, extra=None, view_dept=None):
     return ctx
 
 
+# ─── Async view helpers ─────────────────────────────────────
+# The read-only pages run as async views so a slow query doesn't hold a
+# worker. Django can't wrap async views in ATOMIC_REQUESTS, so they opt out
+# with non_atomic_requests; they never write.
+
+async def _aload_principal(request):
+    """Resolve the user with profile and department cached on it.
+
+    Sync helpers such as _is_super_admin() then find ``user.profile`` without
+    touching the database from the event loop.
+    """
+    user = await request.auser()
+    if not User.profile.is_cached(user):
+        profile = await UserProfile.objects.select_related('department').filter(user=user).afirst()
+        if profile:
+            user.profile = profile
+    request.user = user
+    return user
+
+
+async def _fetched(queryset):
+    """Evaluate ``queryset`` on the async ORM, filling its result cache so
+    templates can iterate and count it without another query."""
+    async for _ in queryset:
+        pass
+    return queryset
+
+
+async def _avg_kpi_by_user(**filters):
+    """Rounded average KPI score per employee id, archived years included."""
+    return await sync_to_async(kpi_averages)(**filters)
+
+
+async def _arender(request, template_name, context):
+    return await sync_to_async(render)(request, template_name, context)
+
+
+async def _arender_admin(request, template_name, extra, view_dept=None):
+    """Build the admin context and render off the event loop, where the lazy
+    sidebar queryset and template lookups may run sync queries."""
+    def _render():
+        return render(request, template_name, _admin_ctx(request, extra, view_dept=view_dept))
+    return await sync_to_async(_render)()
+
+
+def _org_node(m, avg_kpi_by_user, standings, children):
+    return {
+        'id': m.id,
+        'user_id': m.user.id,
+        'first_name': m.user.first_name,
+        'last_name': m.user.last_name,
+        'job_title': m.job_title or 'No title',
+        'is_staff': m.user.is_staff,
+        'has_picture': bool(m.profile_picture),
+        'picture_url': m.profile_picture.url if m.profile_picture else '',
+        'initials': (m.user.first_name[:1] + m.user.last_name[:1]),
+        'date_joined': m.user.date_joined.strftime('%b %d, %Y'),
+        'avg_kpi': avg_kpi_by_user.get(m.user_id),
+        'percentile': round(standings[m.user_id].percentile) if m.user_id in standings else None,
+        'order': m.hierarchy_order,
+        'children': children,
+    }
+
+
+def _build_org_tree(members, avg_kpi_by_user, standings=None):
+    """Nest department members under their managers for the org chart.
+
+    ``standings`` maps user ids to their latest KPIStanding. Returns
+    ``(tree, unassigned)`` where unassigned members report to someone
+    outside the department.
+    """
+    standings = standings or {}
+    children_of = {}
+    for m in members:
+        children_of.setdefault(m.reports_to_id, []).append(m)
+
+    def build(parent_id):
+        return [_org_node(m, avg_kpi_by_user, standings, build(m.id)) for m in children_of.get(parent_id, [])]
+
+    tree = build(None)
+
+    assigned_ids = set()
+    def collect_ids(nodes):
+        for n in nodes:
+            assigned_ids.add(n['id'])
+            collect_ids(n['children'])
+    collect_ids(tree)
+    unassigned = [m for m in members if m.id not in assigned_ids]
+    for m in unassigned:
+        m.avg_kpi = avg_kpi_by_user.get(m.user_id)
+        m.standing = standings.get(m.user_id)
+    return tree, unassigned
+
+
+def _org_chart_level(department, parent_id):
+    """One level of a large org chart: the members reporting to profile
+    ``parent_id``, or the company's top level when None.
+
+    Each node carries ``child_count``, its direct reports in the company,
+    and no children; the page fetches those when the node is expanded.
+    """
+    members = department.members.select_related('user').annotate(
+        child_count=Count('direct_reports', filter=Q(direct_reports__department=department)),
+    ).filter(reports_to_id=parent_id).order_by('hierarchy_order')
+    members = list(members)
+    user_ids = [m.user_id for m in members]
+    avg_kpi = kpi_averages(employee_id__in=user_ids)
+    _, standings = company_standing(department, user_ids)
+    return [
+        {**_org_node(m, avg_kpi, standings, []), 'child_count': m.child_count}
+        for m in members
+    ]
+
+
+def _org_chart_outsiders(department):
+    """Members reporting to someone in another company, for the unassigned pool."""
+    members = list(department.members.select_related('user').filter(
+        reports_to__isnull=False,
+    ).exclude(reports_to__department=department).order_by('hierarchy_order'))
+    avg_kpi = kpi_averages(employee_id__in=[m.user_id for m in members])
+    _, standings = company_standing(department, [m.user_id for m in members])
+    for m in members:
+        m.avg_kpi = avg_kpi.get(m.user_id)
+        m.standing = standings.get(m.user_id)
+    return members
+
+
+# ─── Conditional GET versions ───────────────────────────────
+
+# Names, emails and join dates live on User, which has no timestamp of its
+# own; saving a User bumps its company's data_version, so that goes in too.
+
+def _profile_version(user_id):
+    updated_at, dept_id, dept_updated_at = UserProfile.objects.filter(user_id=user_id).values_list(
+        'updated_at', 'department_id', 'department__updated_at',
+    ).first() or (None, None, None)
+    return [updated_at, dept_id, dept_updated_at, data_version(dept_id)]
+
+
+def _viewer_version(request):
+    """The viewer's own profile, shown in every page header."""
+    return _profile_version(request.user.pk)
+
+
+def _department_version(dept_id):
+    """Department row plus the latest change and count of its members."""
+    return list(Department.objects.filter(pk=dept_id).annotate(
+        latest_member=Max('members__updated_at'),
+        member_count=Count('members'),
+    ).values_list('updated_at', 'latest_member', 'member_count').first() or []) + [data_version(dept_id)]
+
+
+def _company_list_version():
+    """Departments listed in the admin sidebar."""
+    agg = Department.objects.aggregate(latest=Max('updated_at'), count=Count('id'))
+    return [agg['latest'], agg['count']]
+
+
+def _org_chart_version(request):
+    agg = UserProfile.objects.aggregate(latest=Max('updated_at'), count=Count('id'))
+    return _viewer_version(request) + _company_list_version() + [agg['latest'], agg['count'], people_version()]
+
+
+def _dept_org_chart_version(request, dept_id):
+    kpis = KPIFile.objects.filter(employee__profile__department_id=dept_id).aggregate(
+        latest=Max('updated_at'), count=Count('id'),
+    )
+    standings = CompanyKPIStanding.objects.filter(department_id=dept_id).aggregate(latest=Max('computed_at'))
+    return (_viewer_version(request) + _company_list_version() + _department_version(dept_id)
+            + [kpis['latest'], kpis['count'], standings['latest']])
+
+
+def _user_dashboard_version(request):
+    viewer = _viewer_version(request)
+    return viewer + _department_version(viewer[1])
+
+
+def _department_page_version(request):
+    return _user_dashboard_version(request)
+
+
+def _member_profile_version(request, user_id):
+    return _viewer_version(request) + _profile_version(user_id)
+
+
 @login_required
 def home(request):
     if request.user.is_staff:
@@ -111,20 +321,25 @@ def home(request):
 
 # ─── Admin/Manager Views ────────────────────────────────────
 
+@transaction.non_atomic_requests
 @login_required
 @staff_required
-def admin_center(request):
-    visible_depts = _visible_departments(request.user)
-    departments = visible_depts.prefetch_related('members__user')
-    users = User.objects.select_related('profile__department').filter(
-        profile__department__in=visible_depts
+@replica_page
+async def admin_center(request):
+    user = await _aload_principal(request)
+    visible_depts = _visible_departments(user)
+    departments, users = await asyncio.gather(
+        _fetched(visible_depts.prefetch_related('members__user')),
+        _fetched(User.objects.select_related('profile__department').filter(
+            profile__department__in=visible_depts
+        )),
     )
-    return render(request, 'accounts/admin_center.html', _admin_ctx(request, {
+    return await _arender_admin(request, 'accounts/admin_center.html', {
         'users': users,
         'departments': departments,
-        'total_users': users.count(),
-        'total_departments': departments.count(),
-    }))
+        'total_users': len(users),
+        'total_departments': len(departments),
+    })
 
 
 @login_required
@@ -164,7 +379,11 @@ def admin_manage(request):
     users = User.objects.select_related('profile__department').filter(
         profile__department__in=visible_depts
     )
+    deletion_jobs = DeletionJob.objects.filter(requested_by=request.user).filter(
+        Q(status__in=('pending', 'running', 'failed')) | Q(updated_at__gte=timezone.now() - timedelta(minutes=10)),
+    )[:5]
     return render(request, 'accounts/admin_manage.html', _admin_ctx(request, {
+        'deletion_jobs': deletion_jobs,
         'user_form': user_form,
         'all_departments': departments,
         'all_users': users,
@@ -172,6 +391,28 @@ def admin_manage(request):
     }))
 
 
+@login_required
+@staff_required
+def bulk_import_users(request):
+    """Onboard a whole company from a CSV; nothing is created unless every row is valid."""
+    form = BulkUserImportForm(request.POST or None, request.FILES or None)
+    errors = []
+    if request.method == 'POST' and form.is_valid():
+        rows, errors = parse_csv(form.cleaned_data['file'].read(), _visible_departments(request.user))
+        if not rows and not errors:
+            errors = [(0, 'The file has no people in it.')]
+        if not errors:
+            users = import_users(rows)
+            messages.success(request, f'Imported {len(users)} {"person" if len(users) == 1 else "people"}.')
+            return redirect('admin_manage')
+    return render(request, 'accounts/admin_bulk_import.html', _admin_ctx(request, {
+        'form': form,
+        'errors': errors,
+        'required_columns': REQUIRED_COLUMNS,
+        'optional_columns': OPTIONAL_COLUMNS,
+    }))
+
+
 @login_required
 @staff_required
 def admin_edit_user(request, user_id):
@@ -181,9 +422,14 @@ def admin_edit_user(request, user_id):
     profile, _ = UserProfile.objects.get_or_create(user=target_user)
 
     if request.method == 'POST':
+        old_department_id = profile.department_id
         form = UserProfileForm(request.POST, request.FILES, instance=profile)
         if form.is_valid():
             form.save()
+            if 'department' in form.changed_data:
+                for dept_id in {old_department_id, profile.department_id} - {None}:
+                    audit.record(request.user, 'department', target_user.pk, dept_id,
+                                 old=old_department_id, new=profile.department_id)
             messages.success(request, f'Updated "{target_user.username}".')
             return redirect('admin_users')
     else:
@@ -201,16 +447,44 @@ def admin_department_detail(request, dept_id):
     if not _can_view_department(request.user, department):
         return HttpResponseForbidden("You don't have access to this department.")
     members = department.members.select_related('user').filter(user__is_staff=False)
+    avg_kpi = kpi_averages(employee__profile__department=department)
+    standing, member_standings = company_standing(department)
     for m in members:
-        avg = KPIFile.objects.filter(employee=m.user, kpi_score__isnull=False).aggregate(avg=Avg('kpi_score'))['avg']
-        m.avg_kpi = round(avg) if avg is not None else None
+        m.avg_kpi = avg_kpi.get(m.user_id)
+        m.standing = member_standings.get(m.user_id)
 
     return render(request, 'accounts/admin_department_detail.html', _admin_ctx(request, {
         'department': department,
         'members': members,
+        'standing': standing,
+        'company_count': Department.objects.count(),
     }, view_dept=department))
 
 
+@login_required
+@staff_required
+def department_kpi_heatmap(request, dept_id):
+    department = get_object_or_404(Department, pk=dept_id)
+    if not _can_view_department(request.user, department):
+        return HttpResponseForbidden("You don't have access to this department.")
+    return render(request, 'accounts/admin_kpi_heatmap.html', _admin_ctx(request, {
+        'department': department,
+    }, view_dept=department))
+
+
+@login_required
+@staff_required
+def department_kpi_matrix(request, dept_id):
+    """Employee x quarter KPI scores for a company, streamed on a cache miss."""
+    department = get_object_or_404(Department, pk=dept_id)
+    if not _can_view_department(request.user, department):
+        return JsonResponse({'status': 'error', 'msg': 'Access denied'}, status=403)
+    body, stream = cached_matrix(department)
+    if body is not None:
+        return HttpResponse(body, content_type='application/json')
+    return StreamingHttpResponse(stream, content_type='application/json')
+
+
 @login_required
 @staff_required
 def admin_edit_department(request, dept_id):
@@ -231,6 +505,54 @@ def admin_edit_department(request, dept_id):
     }, view_dept=department))
 
 
+@transaction.atomic
+def _employee_kpi_post(request, employee, employee_profile, view_year):
+    """Save a score or an upload from the KPI page; None if the form was neither."""
+    action = request.POST.get('action', 'upload')
+    quarter = request.POST.get('quarter')
+    upload_year = int(request.POST.get('year', view_year))
+
+    if action == 'save_score' and quarter in ('Q1', 'Q2', 'Q3', 'Q4'):
+        kpi = KPIFile.objects.filter(employee=employee, quarter=quarter, year=upload_year).first()
+        if kpi:
+            old_score = kpi.kpi_score
+            score_val = request.POST.get('kpi_score', '').strip()
+            if score_val == '':
+                kpi.kpi_score = None
+            else:
+                kpi.kpi_score = max(0, min(100, int(score_val)))
+            kpi.save()
+            if kpi.kpi_score != old_score:
+                audit.record(request.user, 'kpi_score', employee.pk, employee_profile.department_id,
+                             quarter=quarter, year=upload_year, old=old_score, new=kpi.kpi_score)
+            messages.success(request, f'KPI score saved for {quarter} {upload_year}.')
+        return redirect(f"{request.path}?year={upload_year}")
+
+    if quarter in ('Q1', 'Q2', 'Q3', 'Q4') and 'file' in request.FILES:
+        # Delete existing file for this quarter if replacing
+        existing = KPIFile.objects.filter(employee=employee, quarter=quarter, year=upload_year)
+        replaced = []
+        for old in existing:
+            replaced.append(old.file.name)
+            old.file.delete()
+            old.delete()
+        kpi_file = KPIFile(
+            employee=employee,
+            uploaded_by=request.user,
+            file=request.FILES['file'],
+            title=f"{employee.first_name} {employee.last_name} {quarter} {upload_year}",
+            quarter=quarter,
+            year=upload_year,
+        )
+        kpi_file.save()
+        metrics.observe('pulseboard_upload_bytes', kpi_file.file.size, method='form')
+        audit.record(request.user, 'kpi_upload', employee.pk, employee_profile.department_id,
+                     quarter=quarter, year=upload_year, file=kpi_file.file.name, replaced=replaced)
+        messages.success(request, f'KPI uploaded for {quarter} {upload_year}.')
+        return redirect(f"{request.path}?year={upload_year}")
+
+
+@transaction.non_atomic_requests
 @login_required
 @staff_required
 def employee_kpi(request, user_id):
@@ -260,40 +582,20 @@ def employee_kpi(request, user_id):
     if view_year < join_year:
         view_year = join_year
 
+    # Closed years are archived; opening one brings this employee's files back.
+    # The view runs outside ATOMIC_REQUESTS so the restore commits on its own.
+    if request.method == 'GET' and view_year < online_cutoff():
+        restored, dropped = restore_year(employee, view_year, actor=request.user)
+        if restored:
+            messages.info(request, f'Restored {restored} archived KPI file{"s" if restored != 1 else ""} for {view_year}.')
+        if dropped:
+            messages.info(request, f'Dropped {dropped} archived KPI file{"s" if dropped != 1 else ""} for {view_year} '
+                                   f'replaced by newer uploads; see the history page.')
+
     if request.method == 'POST':
-        action = request.POST.get('action', 'upload')
-        quarter = request.POST.get('quarter')
-        upload_year = int(request.POST.get('year', view_year))
-
-        if action == 'save_score' and quarter in ('Q1', 'Q2', 'Q3', 'Q4'):
-            kpi = KPIFile.objects.filter(employee=employee, quarter=quarter, year=upload_year).first()
-            if kpi:
-                score_val = request.POST.get('kpi_score', '').strip()
-                if score_val == '':
-                    kpi.kpi_score = None
-                else:
-                    kpi.kpi_score = max(0, min(100, int(score_val)))
-                kpi.save()
-                messages.success(request, f'KPI score saved for {quarter} {upload_year}.')
-            return redirect(f"{request.path}?year={upload_year}")
-
-        if quarter in ('Q1', 'Q2', 'Q3', 'Q4') and 'file' in request.FILES:
-            # Delete existing file for this quarter if replacing
-            existing = KPIFile.objects.filter(employee=employee, quarter=quarter, year=upload_year)
-            for old in existing:
-                old.file.delete()
-                old.delete()
-            kpi_file = KPIFile(
-                employee=employee,
-                uploaded_by=request.user,
-                file=request.FILES['file'],
-                title=f"{employee.first_name} {employee.last_name} {quarter} {upload_year}",
-                quarter=quarter,
-                year=upload_year,
-            )
-            kpi_file.save()
-            messages.success(request, f'KPI uploaded for {quarter} {upload_year}.')
-            return redirect(f"{request.path}?year={upload_year}")
+        response = _employee_kpi_post(request, employee, employee_profile, view_year)
+        if response:
+            return response
 
     # Build quarter data (skip quarters before join date)
     quarter_num = {'Q1': 1, 'Q2': 2, 'Q3': 3, 'Q4': 4}
@@ -359,30 +661,149 @@ def delete_kpi_file(request, file_id):
     employee_id = kpi_file.employee_id
     year = kpi_file.year
     if request.method == 'POST':
+        audit.record(
+            request.user, 'kpi_delete', employee_id,
+            UserProfile.objects.filter(user_id=employee_id).values_list('department_id', flat=True).first(),
+            quarter=kpi_file.quarter, year=year, file=kpi_file.file.name, score=kpi_file.kpi_score,
+        )
         kpi_file.file.delete()
         kpi_file.delete()
         messages.success(request, 'KPI file deleted.')
-    from django.urls import reverse
     return redirect(f"{reverse('employee_kpi', args=[employee_id])}?year={year}")
 
 
+# Large KPI files are sent in chunks to these two views, so a dropped
+# connection resumes from the last stored byte instead of starting over.
+
+@login_required
+@staff_required
+@require_POST
+def start_kpi_upload(request, user_id):
+    employee = get_object_or_404(User, pk=user_id)
+    if not _can_view_user(request.user, employee):
+        return JsonResponse({'status': 'error', 'msg': 'Access denied'}, status=403)
+    try:
+        data = json.loads(request.body)
+        upload = start_upload(employee, request.user, data.get('quarter'), int(data['year']),
+                              str(data['name'])[:255], int(data['size']))
+    except UploadError as e:
+        return JsonResponse({'status': 'error', 'msg': str(e)}, status=400)
+    except (json.JSONDecodeError, KeyError, TypeError, ValueError):
+        return JsonResponse({'status': 'error'}, status=400)
+    return JsonResponse({
+        'status': 'ok',
+        'url': reverse('kpi_upload_chunk', args=[upload.pk]),
+        'received': upload.received,
+        'chunk_size': settings.KPI_UPLOAD_CHUNK_BYTES,
+    })
+
+
+def _csrf_rejection(request):
+    """The CSRF middleware's verdict on ``request``: None, or a 403 response."""
+    return CsrfViewMiddleware(lambda request: None).process_view(request, None, (), {})
+
+
+@csrf_exempt
+@transaction.non_atomic_requests
+@login_required
+@staff_required
+def kpi_upload_chunk(request, upload_id):
+    """GET: bytes stored so far. POST: the next chunk as the one file of a
+    multipart body, starting at the ``Upload-Offset`` header. DELETE: cancel.
+
+    POST answers with ``chain_digest``, SHA-256 chained over the chunks'
+    SHA-256 digests (see ``uploads.apply_chunk``), not the file's SHA-256.
+
+    Runs outside ATOMIC_REQUESTS: a POST claims the upload with one UPDATE,
+    streams the body in with no transaction open, then locks the row only
+    to record the chunk.
+    """
+    upload = get_object_or_404(KPIUpload, pk=upload_id, uploaded_by=request.user)
+    if request.method == 'GET':
+        return JsonResponse({'status': 'ok', 'received': upload.received, 'size': upload.size})
+    if request.method not in ('POST', 'DELETE'):
+        return JsonResponse({'status': 'error', 'msg': 'Method not allowed'}, status=405)
+
+    claim = writer = None
+    if request.method == 'POST':
+        offset = request.headers.get('Upload-Offset', '')
+        claim = claim_chunk(upload, int(offset)) if offset.isdigit() else None
+        if claim is None:
+            upload.refresh_from_db()
+            msg = 'Wrong offset' if offset != str(upload.received) else 'Another request is writing this upload'
+            return JsonResponse({'status': 'error', 'msg': msg, 'received': upload.received}, status=409)
+        writer = ChunkWriter(upload, request)
+        request.upload_handlers = [writer]
+    try:
+        # csrf_exempt only keeps the middleware from reading the body before
+        # the writer is in place; the same check runs here, after it. A POST
+        # without a token is refused with 403 (see test_uploads).
+        rejected = _csrf_rejection(request)
+        if rejected:
+            return rejected
+        return _kpi_upload_write(request, upload, writer, claim)
+    finally:
+        if claim:
+            release_chunk(upload, claim)
+
+
+@transaction.atomic
+def _kpi_upload_write(request, upload, writer, claim):
+    # Locked briefly so a DELETE or an expired claim's successor can't
+    # interleave with recording the chunk
+    uploads = KPIUpload.objects.select_for_update()
+    if request.method == 'DELETE':
+        upload = get_object_or_404(uploads, pk=upload.pk)
+        upload.file.delete(save=False)
+        upload.delete()
+        return JsonResponse({'status': 'ok'})
+    if not request.FILES:
+        if writer.too_large:
+            return JsonResponse({'status': 'error', 'msg': 'Chunk too large', 'received': upload.received}, status=413)
+        return JsonResponse({'status': 'error', 'msg': 'No chunk', 'received': upload.received}, status=400)
+    upload = uploads.filter(pk=upload.pk, writing_until=claim).first()
+    if upload is None:
+        return JsonResponse({'status': 'error', 'msg': 'Upload changed while writing'}, status=409)
+    try:
+        complete = apply_chunk(upload, writer, request.headers.get('X-Chunk-SHA256', ''))
+    except UploadError as e:
+        return JsonResponse({'status': 'error', 'msg': str(e), 'received': upload.received}, status=400)
+    if complete:
+        kpi_file, replaced = finish_upload(upload)
+        metrics.observe('pulseboard_upload_bytes', upload.size, method='chunked')
+        audit.record(
+            request.user, 'kpi_upload', kpi_file.employee_id,
+            UserProfile.objects.filter(user_id=kpi_file.employee_id).values_list('department_id', flat=True).first(),
+            quarter=kpi_file.quarter, year=kpi_file.year, file=kpi_file.file.name, replaced=replaced,
+        )
+    return JsonResponse({'status': 'ok', 'received': upload.received, 'complete': complete,
+                         'chain_digest': upload.digest})
+
+
+@transaction.non_atomic_requests
 @login_required
 @staff_required
-def org_chart(request):
+@replica_page
+@conditional_page(_org_chart_version)
+async def org_chart(request):
+    user = await _aload_principal(request)
     # Only Magnum Opus managers can see the all-departments org chart
-    if not _is_super_admin(request.user):
+    if not _is_super_admin(user):
         # Non-Magnum Opus managers get redirected to their own department org chart
-        profile = getattr(request.user, 'profile', None)
+        profile = getattr(user, 'profile', None)
         if profile and profile.department:
             return redirect('dept_org_chart', dept_id=profile.department_id)
         return HttpResponseForbidden("You don't have access to this page.")
 
-    departments = Department.objects.prefetch_related('members__user').all()
+    departments, unassigned = await asyncio.gather(
+        _fetched(Department.objects.prefetch_related('members__user').all()),
+        _fetched(UserProfile.objects.filter(department__isnull=True).select_related('user')),
+    )
     dept_data = []
     for dept in departments:
         managers = []
         employees = []
-        for member in dept.members.select_related('user').all():
+        for member in dept.members.all():
             entry = {'profile': member, 'user': member.user}
             if member.user.is_staff:
                 managers.append(entry)
@@ -394,72 +815,96 @@ def org_chart(request):
             'employees': employees,
             'total': len(managers) + len(employees),
         })
-    # Unassigned users
-    unassigned = UserProfile.objects.filter(department__isnull=True).select_related('user')
-    return render(request, 'accounts/admin_org_chart.html', _admin_ctx(request, {
+    return await _arender_admin(request, 'accounts/admin_org_chart.html', {
         'dept_data': dept_data,
         'unassigned': unassigned,
-    }))
+    })
+
+
+# Bigger companies get the top of their chart first and the rest on demand
+ORG_CHART_EAGER_MEMBERS = 300
+
+
+@transaction.non_atomic_requests
+@login_required
+@staff_required
+@replica_page
+@conditional_page(_dept_org_chart_version)
+async def dept_org_chart(request, dept_id):
+    user = await _aload_principal(request)
+    department = await aget_object_or_404(Department, pk=dept_id)
+    if not _can_view_department(user, department):
+        return HttpResponseForbidden("You don't have access to this department.")
+    feed_cursor = await _feed_cursor(department.id)
+    member_count = await department.members.acount()
+    lazy = member_count > ORG_CHART_EAGER_MEMBERS
+    if lazy:
+        # Only the top level goes in the page; subtrees load as they open
+        tree, unassigned = await asyncio.gather(
+            sync_to_async(_org_chart_level)(department, None),
+            sync_to_async(_org_chart_outsiders)(department),
+        )
+    else:
+        members, member_avg_kpi, (_, standings) = await asyncio.gather(
+            _fetched(department.members.select_related('user').order_by('hierarchy_order')),
+            _avg_kpi_by_user(employee__profile__department=department),
+            sync_to_async(company_standing)(department),
+        )
+        tree, unassigned = _build_org_tree(members, member_avg_kpi, standings)
+
+    return await _arender_admin(request, 'accounts/admin_dept_org_chart.html', {
+        'department': department,
+        'tree_json': json.dumps(tree),
+        'unassigned': unassigned,
+        'member_count': member_count,
+        'lazy': lazy,
+        'feed_cursor': feed_cursor,
+        'live_stream': isinstance(request, ASGIRequest),
+        'chart_version': await sync_to_async(data_version)(department.id),
+        'transfer_departments': await _fetched(
+            _visible_departments(user).exclude(pk=department.pk).only('name').order_by('name')),
+    }, view_dept=department)
+
+
+@login_required
+@staff_required
+@replica_page
+def org_chart_children(request, dept_id):
+    """Direct reports of ``?parent=<profile id>`` for expanding a large chart."""
+    department = get_object_or_404(Department, pk=dept_id)
+    if not _can_view_department(request.user, department):
+        return JsonResponse({'status': 'error', 'msg': 'Access denied'}, status=403)
+    try:
+        parent_id = int(request.GET['parent'])
+    except (KeyError, ValueError):
+        return JsonResponse({'status': 'error', 'msg': 'parent is required'}, status=400)
+    return JsonResponse({'status': 'ok', 'nodes': _org_chart_level(department, parent_id)})
 
 
 @login_required
 @staff_required
-def dept_org_chart(request, dept_id):
+def dept_org_chart_image(request, dept_id, fmt):
+    """The hierarchy drawn server-side, for export and as the chart page's
+    first paint while its script lays the interactive tree out."""
     department = get_object_or_404(Department, pk=dept_id)
     if not _can_view_department(request.user, department):
         return HttpResponseForbidden("You don't have access to this department.")
-    members = department.members.select_related(
-        'user', 'reports_to__user'
-    ).prefetch_related('direct_reports__user').order_by('hierarchy_order')
 
-    # Pre-compute avg KPI for each member
-    member_avg_kpi = {}
-    for m in members:
-        avg = KPIFile.objects.filter(employee=m.user, kpi_score__isnull=False).aggregate(avg=Avg('kpi_score'))['avg']
-        member_avg_kpi[m.id] = round(avg) if avg is not None else None
-
-    def build_tree(parent_id=None):
-        nodes = []
-        for m in members:
-            parent = m.reports_to_id
-            if parent == parent_id:
-                children = build_tree(m.id)
-                nodes.append({
-                    'id': m.id,
-                    'user_id': m.user.id,
-                    'first_name': m.user.first_name,
-                    'last_name': m.user.last_name,
-                    'job_title': m.job_title or 'No title',
-                    'is_staff': m.user.is_staff,
-                    'has_picture': bool(m.profile_picture),
-                    'picture_url': m.profile_picture.url if m.profile_picture else '',
-                    'initials': (m.user.first_name[:1] + m.user.last_name[:1]),
-                    'date_joined': m.user.date_joined.strftime('%b %d, %Y'),
-                    'avg_kpi': member_avg_kpi.get(m.id),
-                    'children': children,
-                })
-        return nodes
-
-    tree = build_tree(None)
-
-    # Also get unassigned members (those with reports_to pointing outside dept)
-    member_ids = set(m.id for m in members)
-    assigned_ids = set()
-    def collect_ids(nodes):
-        for n in nodes:
-            assigned_ids.add(n['id'])
-            collect_ids(n['children'])
-    collect_ids(tree)
-    unassigned = [m for m in members if m.id not in assigned_ids]
-    for m in unassigned:
-        m.avg_kpi = member_avg_kpi.get(m.id)
+    def build_tree():
+        members = department.members.select_related('user').order_by('hierarchy_order')
+        return _build_org_tree(members, {})[0]
 
-    return render(request, 'accounts/admin_dept_org_chart.html', _admin_ctx(request, {
-        'department': department,
-        'tree_json': json.dumps(tree),
-        'unassigned': unassigned,
-        'member_count': len(list(members)),
-    }, view_dept=department))
+    image = chart_image(department, build_tree, fmt)
+    if image is None:
+        return HttpResponse('This chart is too large for PNG. Download the SVG instead.',
+                            status=413, content_type='text/plain')
+    response = HttpResponse(image, content_type='image/svg+xml' if fmt == 'svg' else 'image/png')
+    if request.GET.get('download'):
+        response['Content-Disposition'] = f'attachment; filename="{slugify(department.name)}-org-chart.{fmt}"'
+    if request.GET.get('v'):
+        # Versioned URLs change with the hierarchy, so browsers may keep them
+        patch_cache_control(response, private=True, max_age=24 * 60 * 60)
+    return response
 
 
 @login_required
@@ -477,6 +922,7 @@ def reorder_hierarchy(request, dept_id):
             profile_id = data.get('profile_id')
             parent_id = data.get('parent_id')  # None = make root
             profile = UserProfile.objects.get(pk=profile_id, department=department)
+            old_parent_id = profile.reports_to_id
             if parent_id:
                 parent = UserProfile.objects.get(pk=parent_id, department=department)
                 # Prevent circular reference
@@ -489,21 +935,50 @@ def reorder_hierarchy(request, dept_id):
             else:
                 profile.reports_to = None
             profile.save()
+            if profile.reports_to_id != old_parent_id:
+                audit.record(request.user, 'reports_to', profile.user_id, department.pk,
+                             old=old_parent_id, new=profile.reports_to_id)
             return JsonResponse({'status': 'ok'})
 
         elif action == 'reorder':
             order = data.get('order', [])
             for i, pid in enumerate(order):
-                UserProfile.objects.filter(pk=pid, department=department).update(hierarchy_order=i)
+                UserProfile.objects.filter(pk=pid, department=department).update(
+                    hierarchy_order=i, updated_at=timezone.now(),
+                )
+            record_updates(UserProfile.objects.filter(pk__in=order, department=department))
+            bump_data_version(department.pk)
+            audit.record(request.user, 'reorder', None, department.pk, order=order)
             return JsonResponse({'status': 'ok'})
 
+        elif action == 'move_subtree':
+            # Moves a whole branch, optionally into another company
+            profile_id = int(data.get('profile_id'))
+            parent_id = int(data['parent_id']) if data.get('parent_id') else None
+            target_id = int(data.get('department_id') or department.pk)
+            if not department.members.filter(pk=profile_id).exists():
+                raise UserProfile.DoesNotExist
+            allowed = set(_visible_departments(request.user).values_list('pk', flat=True))
+            try:
+                moved = move_subtree(profile_id, target_id, parent_id, allowed)
+            except PermissionDenied:
+                return JsonResponse({'status': 'error', 'msg': 'Access denied'}, status=403)
+            except HierarchyError as e:
+                return JsonResponse({'status': 'error', 'msg': str(e)}, status=400)
+            user_id = UserProfile.objects.values_list('user_id', flat=True).get(pk=profile_id)
+            for dept_id in {department.pk, target_id}:
+                audit.record(request.user, 'move_team', user_id, dept_id, moved=len(moved),
+                             from_department=department.pk, to_department=target_id, parent=parent_id)
+            return JsonResponse({'status': 'ok', 'moved': len(moved)})
+
         return JsonResponse({'status': 'error', 'msg': 'Unknown action'}, status=400)
-    except (json.JSONDecodeError, TypeError, UserProfile.DoesNotExist):
+    except (json.JSONDecodeError, TypeError, ValueError, UserProfile.DoesNotExist):
         return JsonResponse({'status': 'error'}, status=400)
 
 
 @login_required
 @staff_required
+@replica_page
 def admin_users(request):
     visible_depts = _visible_departments(request.user)
     users = User.objects.select_related('profile__department').filter(
@@ -547,9 +1022,8 @@ def delete_user(request, user_id):
         return redirect('admin_manage')
     if not _can_view_user(request.user, target_user):
         return HttpResponseForbidden("You don't have access to this user.")
-    username = target_user.username
-    target_user.delete()
-    messages.success(request, f'User "{username}" has been deleted.')
+    start_deletion('user', target_user, request.user)
+    messages.success(request, f'User "{target_user.username}" is being deleted.')
     return redirect('admin_manage')
 
 
@@ -560,45 +1034,273 @@ def delete_department(request, dept_id):
     department = get_object_or_404(Department, pk=dept_id)
     if not _can_view_department(request.user, department):
         return HttpResponseForbidden("You don't have access to this department.")
-    dept_name = department.name
-    # Delete all users belonging to this department (except the current user)
-    User.objects.filter(profile__department=department).exclude(pk=request.user.pk).delete()
-    department.delete()
-    messages.success(request, f'Department "{dept_name}" and all its members have been deleted.')
+    # Members are deleted in batches in the background; progress shows on the manage page
+    start_deletion('department', department, request.user)
+    messages.success(request, f'Department "{department.name}" and all its members are being deleted.')
     return redirect('admin_manage')
 
 
+@login_required
+@staff_required
+def deletion_status(request, job_id):
+    job = get_object_or_404(DeletionJob, pk=job_id, requested_by=request.user)
+    return JsonResponse({
+        'status': job.status,
+        'total': job.total,
+        'done': job.done,
+        'percent': job.percent,
+        'files_removed': job.files_removed,
+    })
+
+
+# ─── Audit log ──────────────────────────────────────────────
+
+AUDIT_PAGE_SIZE = 100
+
+
+def _audit_page(request, events, extra):
+    """Newest-first page of ``events`` after the ``?before=<id>`` cursor."""
+    if not _is_super_admin(request.user):
+        events = events.filter(department_id__in=_visible_departments(request.user).values('id'))
+    before = AuditEvent.objects.filter(pk=request.GET.get('before') or 0).values('at', 'id').first()
+    if before:
+        events = events.filter(Q(at__lt=before['at']) | Q(at=before['at'], id__lt=before['id']))
+    page = list(events.order_by('-at', '-id')[:AUDIT_PAGE_SIZE + 1])
+    employees = dict(User.objects.filter(pk__in={e.employee_id for e in page}).values_list('pk', 'username'))
+    for e in page:
+        e.employee_username = employees.get(e.employee_id)
+    return render(request, 'accounts/admin_audit_log.html', _admin_ctx(request, {
+        'events': audit.describe(page[:AUDIT_PAGE_SIZE]),
+        'older': page[AUDIT_PAGE_SIZE - 1].id if len(page) > AUDIT_PAGE_SIZE else None,
+        **extra,
+    }, view_dept=extra.get('department')))
+
+
+@login_required
+@staff_required
+@replica_page
+def employee_audit_log(request, user_id):
+    employee = get_object_or_404(User.objects.select_related('profile__department'), pk=user_id)
+    if not _can_view_user(request.user, employee):
+        return HttpResponseForbidden("You don't have access to this employee.")
+    return _audit_page(request, AuditEvent.objects.filter(employee_id=employee.pk), {
+        'employee': employee,
+        'department': employee.profile.department,
+    })
+
+
+@login_required
+@staff_required
+@replica_page
+def department_audit_log(request, dept_id):
+    department = get_object_or_404(Department, pk=dept_id)
+    if not _can_view_department(request.user, department):
+        return HttpResponseForbidden("You don't have access to this department.")
+    return _audit_page(request, AuditEvent.objects.filter(department_id=department.pk), {
+        'department': department,
+    })
+
+
+@login_required
+@staff_required
+def people_search(request):
+    """Type-ahead lookup by username, name, job title or company."""
+    query = request.GET.get('q', '').strip()
+    dept_ids = None
+    if not _is_super_admin(request.user):
+        dept_ids = set(_visible_departments(request.user).values_list('id', flat=True))
+    results = search_people(query, dept_ids) if query else []
+    return JsonResponse({'results': [{
+        'user_id': p['user_id'],
+        'username': p['username'],
+        'name': p['name'],
+        'job_title': p['job_title'],
+        'company': p['company'],
+        'is_staff': p['is_staff'],
+    } for p in results]})
+
+
+# ─── Sync API ───────────────────────────────────────────────
+
+CHANGE_FEED_PAGE_SIZE = 200
+CHANGE_FEED_MAX_PAGE_SIZE = 1000
+# Cursors are ChangeLogEntry.seq values, which follow commit order, so a
+# transaction committing late can't land behind a cursor a client has passed
+
+
+@transaction.non_atomic_requests
+@login_required
+@staff_required
+def change_feed(request):
+    """Changes after ``?since=<cursor>``, oldest first, for incremental sync."""
+    try:
+        since = int(request.GET.get('since', 0))
+        limit = max(1, min(int(request.GET.get('limit', CHANGE_FEED_PAGE_SIZE)), CHANGE_FEED_MAX_PAGE_SIZE))
+    except ValueError:
+        return JsonResponse({'status': 'error', 'msg': 'Invalid cursor'}, status=400)
+
+    sequence_changes()
+    entries = ChangeLogEntry.objects.filter(seq__gt=since)
+    if not _is_super_admin(request.user):
+        entries = entries.filter(department_id__in=_visible_departments(request.user).values('id'))
+    page = list(entries.order_by('seq')[:limit + 1])
+    has_more = len(page) > limit
+    page = page[:limit]
+
+    return JsonResponse({
+        'changes': [{
+            'cursor': e.seq,
+            'model': e.model,
+            'id': e.object_id,
+            'action': e.action,
+            'department_id': e.department_id,
+            'data': e.data,
+            'changed_at': e.changed_at,
+        } for e in page],
+        'next_cursor': page[-1].seq if page else since,
+        'has_more': has_more,
+    })
+
+
+# Live org chart updates. Each open chart polls the change feed for its
+# company, so edits made in any worker reach every viewer without a broker:
+# in a server-sent event stream under ASGI, from the browser under WSGI.
+ORG_CHART_POLL_SECONDS = 2
+ORG_CHART_KEEPALIVE_SECONDS = 15
+# Streams end after this long; the browser reconnects from the last event id
+ORG_CHART_STREAM_SECONDS = 300
+
+
+async def _feed_cursor(department_id):
+    """Newest change for a company. Read it before the page's data, so the
+    page can only replay changes it already shows, never miss one."""
+    await sync_to_async(sequence_changes)()
+    agg = await ChangeLogEntry.objects.filter(department_id=department_id).aaggregate(cursor=Max('seq'))
+    return agg['cursor'] or 0
+
+
+def _sse(event, data, cursor):
+    return f"id: {cursor}\nevent: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+def _org_chart_changes(department_id, cursor):
+    """Changes to a company's people after ``cursor``, as ``(moves, stale,
+    cursor)``. Moves are ``[profile_id, reports_to_id, order]`` lists; any
+    other member change sets ``stale``, telling the page to offer a reload.
+    """
+    sequence_changes()
+    entries = ChangeLogEntry.objects.filter(
+        department_id=department_id, seq__gt=cursor, model__in=('user', 'userprofile', 'department'),
+    ).order_by('seq')[:CHANGE_FEED_MAX_PAGE_SIZE]
+    moves, stale = [], False
+    for e in entries:
+        if e.model == 'userprofile' and e.action == 'update':
+            moves.append([e.object_id, e.data.get('reports_to_id'), e.data.get('hierarchy_order')])
+        else:
+            stale = True
+        cursor = e.seq
+    return moves, stale, cursor
+
+
+async def _org_chart_events(department_id, cursor):
+    """Yield :func:`_org_chart_changes` as server-sent events."""
+    deadline = time.monotonic() + ORG_CHART_STREAM_SECONDS
+    last_write = time.monotonic()
+    yield f"retry: {ORG_CHART_POLL_SECONDS * 1000}\n\n"
+    while time.monotonic() < deadline:
+        moves, stale, cursor = await sync_to_async(_org_chart_changes)(department_id, cursor)
+        if moves:
+            yield _sse('hierarchy', moves, cursor)
+        if stale:
+            yield _sse('stale', None, cursor)
+        if moves or stale:
+            last_write = time.monotonic()
+        elif time.monotonic() - last_write >= ORG_CHART_KEEPALIVE_SECONDS:
+            yield ': keepalive\n\n'
+            last_write = time.monotonic()
+        await asyncio.sleep(ORG_CHART_POLL_SECONDS)
+
+
+@transaction.non_atomic_requests
+@login_required
+@staff_required
+async def org_chart_events(request, dept_id):
+    """Server-sent events for an open department org chart under ASGI.
+
+    Under WSGI a stream would hold a worker for its whole life, so each
+    request instead answers one poll with the changes since the cursor.
+    """
+    user = await _aload_principal(request)
+    department = await aget_object_or_404(Department, pk=dept_id)
+    if not _can_view_department(user, department):
+        return JsonResponse({'status': 'error', 'msg': 'Access denied'}, status=403)
+    try:
+        cursor = int(request.headers.get('Last-Event-ID') or request.GET.get('since', 0))
+    except ValueError:
+        return JsonResponse({'status': 'error', 'msg': 'Invalid cursor'}, status=400)
+
+    if not isinstance(request, ASGIRequest):
+        moves, stale, cursor = await sync_to_async(_org_chart_changes)(department.id, cursor)
+        return JsonResponse({'hierarchy': moves, 'stale': stale, 'cursor': cursor})
+    response = StreamingHttpResponse(_org_chart_events(department.id, cursor), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+# ─── Metrics ────────────────────────────────────────────────
+
+def metrics_endpoint(request):
+    """Prometheus metrics for every worker, for staff or a scraper holding
+    ``Authorization: Bearer <METRICS_TOKEN>``."""
+    token = request.headers.get('Authorization', '').removeprefix('Bearer ')
+    if not request.user.is_staff and not (settings.METRICS_TOKEN and constant_time_compare(token, settings.METRICS_TOKEN)):
+        return HttpResponseForbidden('Staff or a metrics token required.')
+    return HttpResponse(metrics.collect(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
 # ─── Regular User Views ─────────────────────────────────────
 
+@transaction.non_atomic_requests
 @login_required
-def user_dashboard(request):
-    profile, _ = UserProfile.objects.get_or_create(user=request.user)
+@replica_page
+@conditional_page(_user_dashboard_version)
+async def user_dashboard(request):
+    user = await _aload_principal(request)
+    profile, _ = await UserProfile.objects.select_related('department').aget_or_create(user=user)
     department = profile.department
     colleagues = []
     if department:
-        colleagues = department.members.select_related('user').exclude(user=request.user)
+        colleagues = await _fetched(department.members.select_related('user').exclude(user=user))
 
-    return render(request, _dept_template(department, 'dashboard.html'), {
+    return await _arender(request, _dept_template(department, 'dashboard.html'), {
         'profile': profile,
         'department': department,
         'colleagues': colleagues,
     })
 
 
+@transaction.non_atomic_requests
 @login_required
-def department_page(request):
-    profile, _ = UserProfile.objects.get_or_create(user=request.user)
+@replica_page
+@conditional_page(_department_page_version)
+async def department_page(request):
+    user = await _aload_principal(request)
+    profile, _ = await UserProfile.objects.select_related('department').aget_or_create(user=user)
     department = profile.department
     if not department:
-        return render(request, 'accounts/department_page.html', {'department': None, 'members': []})
-    members = department.members.select_related('user').all()
-    return render(request, _dept_template(department, 'department_detail.html'), {
+        return await _arender(request, 'accounts/department_page.html', {'department': None, 'members': []})
+    members = await _fetched(department.members.select_related('user').all())
+    return await _arender(request, _dept_template(department, 'department_detail.html'), {
         'department': department,
         'members': members,
+        'data_version': data_version(department.id),
     })
 
 
 @login_required
+@conditional_page(_member_profile_version)
 def member_profile(request, user_id):
     target_user = get_object_or_404(User, pk=user_id)
     target_profile, _ = UserProfile.objects.get_or_create(user=target_user)
@@ -613,4 +1315,5 @@ def member_profile(request, user_id):
     return render(request, _dept_template(target_profile.department, 'member_profile.html'), {
         'target_user': target_user,
         'target_profile': target_profile,
+        'data_version': data_version(target_profile.department_id),
     })
@@ -38,6 +38,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'accounts.middleware.record_request_metrics',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -45,6 +46,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'accounts.middleware.pin_primary_after_write',
+    'accounts.middleware.flush_audit_log',
 ]
 
 ROOT_URLCONF = 'myproject.urls'
@@ -53,13 +56,20 @@ TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [BASE_DIR / 'templates'],
-        'APP_DIRS': True,
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            # Compile each template once per process; the dev autoreloader
+            # resets this cache whenever a template file changes.
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
         },
     },
 ]
@@ -81,9 +91,79 @@ DATABASES = {
         'OPTIONS': {
             'charset': 'utf8mb4',
         },
+        # Each request runs in one transaction, so change-feed entries written
+        # by signals commit or roll back with the change they record. Views
+        # opt out with @transaction.non_atomic_requests when they can't run
+        # inside it (async views) or must commit on their own (change_feed
+        # sequencing, restoring archived KPI years, chunked uploads).
+        # accounts/tests/test_changefeed.py checks both.
+        'ATOMIC_REQUESTS': True,
+    }
+}
+
+# Optional MySQL read replica for the read-only admin and company pages.
+# Leave PULSEBOARD_REPLICA_HOST unset to send everything to the primary.
+if os.environ.get('PULSEBOARD_REPLICA_HOST'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'HOST': os.environ['PULSEBOARD_REPLICA_HOST'],
+        'ATOMIC_REQUESTS': False,
+        'TEST': {'MIRROR': 'default'},
     }
+DATABASE_ROUTERS = ['accounts.routers.ReplicaRouter']
+# After a write, the writer's reads stay on the primary this long
+REPLICA_STICKY_SECONDS = 10
+# Audit events are buffered per process and written in one INSERT at the
+# end of each request, or sooner once this many queue up or the oldest
+# has waited this long
+AUDIT_BUFFER_SIZE = 200
+AUDIT_FLUSH_SECONDS = 5
+
+
+# ────────────────────────────────────────────────────────────────
+# Cache — file based so every Gunicorn worker shares the same
+# fragment cache and data-version counters. Sessions and logged-in
+# users get their own cache so their churn never culls the counters.
+# ────────────────────────────────────────────────────────────────
+CACHE_DIR = Path(os.environ.get('PULSEBOARD_CACHE_DIR', BASE_DIR / 'cache'))
+
+CACHES = {
+    'default': {
+        'BACKEND': 'accounts.metrics.InstrumentedFileBasedCache',
+        'LOCATION': str(CACHE_DIR),
+        'TIMEOUT': 60 * 60 * 24,
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
+    'sessions': {
+        'BACKEND': 'accounts.metrics.InstrumentedFileBasedCache',
+        'LOCATION': str(CACHE_DIR / 'sessions'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 50000,
+        },
+    },
 }
 
+# Each worker saves its metrics here for /accounts/admin-center/metrics/ to add up.
+# Set METRICS_TOKEN to let a Prometheus scraper in with "Bearer <token>".
+METRICS_DIR = CACHE_DIR / 'metrics'
+METRICS_SAVE_SECONDS = 5
+METRICS_RETENTION_SECONDS = 60 * 60 * 24
+METRICS_TOKEN = os.environ.get('PULSEBOARD_METRICS_TOKEN', '')
+
+# Sessions are read from the cache and written through to the database
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+SESSION_CACHE_ALIAS = 'sessions'
+
+# The cached backend serves the logged-in user, profile and company from the
+# sessions cache. ModelBackend stays listed so sessions created before it
+# was added remain valid until they expire.
+AUTHENTICATION_BACKENDS = [
+    'accounts.backends.CachedModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -123,9 +203,24 @@ STATIC_URL = 'static/'
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 STATICFILES_DIRS = [BASE_DIR / 'static']
 
+# collectstatic writes content-hashed files, resized banner variants and
+# .gz/.br siblings, all recorded in staticfiles.json (see accounts/storage.py)
+STORAGES = {
+    'default': {
+        'BACKEND': 'accounts.storage.ShardedMediaStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'accounts.storage.PulseBoardStaticStorage',
+    },
+}
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# KPI files are uploaded in chunks of at most this size, up to the total limit
+KPI_UPLOAD_CHUNK_BYTES = 8 * 1024 * 1024
+KPI_UPLOAD_MAX_BYTES = 500 * 1024 * 1024
+
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/'
 LOGIN_URL = '/accounts/login/'
\ No newline at end of file
@@ -2,6 +2,8 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
+from django.views.decorators.cache import cache_control
+from django.views.static import serve
 
 from accounts import views
 
@@ -12,4 +14,9 @@ urlpatterns = [
 ]
 
 if settings.DEBUG:
+    # Theme stylesheets are content-hashed, so browsers may keep them forever
+    urlpatterns += [
+        path('media/themes/<path:path>', cache_control(max_age=31536000, immutable=True, public=True)(serve),
+             {'document_root': settings.MEDIA_ROOT / 'themes'}),
+    ]
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)